@@ -1,6 +1,20 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class NbaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'NBA'
+
+    def ready(self):
+        '''
+        Keeps the in-memory team index & the cached hidden game preferences up to date with their models.
+        '''
+        from . import services, teams
+        from .models import HiddenGamePreferences, Team
+        post_save.connect(teams.refresh, sender=Team)
+        post_delete.connect(teams.refresh, sender=Team)
+        post_save.connect(services.invalidate_preferences,
+                          sender=HiddenGamePreferences)
+        post_delete.connect(services.invalidate_preferences,
+                            sender=HiddenGamePreferences)
@@ -0,0 +1,110 @@
+import json
+import timeit
+
+from . import responses, services
+from .datasources import SyntheticDataSource
+from .models import HiddenGamePreferences
+
+# Hidden game preferences used when benchmarking check_hide_games, from not hiding any scores
+# to hiding the scores of close games from the first period
+BENCHMARK_PREFERENCES = {
+    'anonymous': None,
+    'not_hidden': HiddenGamePreferences(hide_scores=False),
+    'hidden': HiddenGamePreferences(hide_scores=True, hide_after_period=1, max_score_difference=10),
+}
+
+
+def record_fixture(data_source, path):
+    '''
+    Records the raw scoreboard & detailed game data of the given data source as a benchmark fixture.
+    Params:
+        data_source: Data source from which the data should be recorded, e.g. the live data source.
+        path: String representing the path of the JSON file in which the fixture is stored.
+    '''
+    games = data_source.scoreboard()
+    fixture = {'scoreboard': games, 'games': {}}
+    for game in games:
+        if game['gameStatus'] > 1:
+            actions, boxscore = data_source.game_data(game['gameId'])
+            fixture['games'][game['gameId']] = {
+                'actions': actions, 'boxscore': boxscore}
+    with open(path, 'w') as file:
+        json.dump(fixture, file)
+
+
+def load_fixture(path=None):
+    '''
+    Loads a benchmark fixture recorded by record_fixture. If no path is given, a fixture containing
+    fifteen finished games is generated by the synthetic data source.
+    Params:
+        path: Optional string representing the path of the JSON fixture file.
+    Returns:
+        Dictionary containing the raw games of the scoreboard under 'scoreboard', and the raw
+        actions & boxscore of each game keyed by game id under 'games'.
+    '''
+    if path is not None:
+        with open(path) as file:
+            return json.load(file)
+    data_source = SyntheticDataSource(games=15, speed=1e9)
+    games = data_source.scoreboard()
+    return {
+        'scoreboard': games,
+        'games': {game['gameId']: dict(zip(('actions', 'boxscore'), data_source.game_data(game['gameId'])))
+                  for game in games},
+    }
+
+
+def _time(function, setup=None, repeat=5):
+    '''
+    Times the given function, calling it as many times as fit in roughly 0.2 seconds.
+    Params:
+        function: Callable taking no arguments that should be timed.
+        setup: Optional callable run before each repetition.
+        repeat: Number of repetitions, of which the fastest is reported.
+    Returns:
+        Dictionary containing the number of calls per repetition & the fastest time per call in microseconds.
+    '''
+    timer = timeit.Timer(function, setup or (lambda: None))
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number))
+    return {'calls': number, 'microseconds_per_call': best / number * 1e6}
+
+
+def run_benchmarks(fixture, repeat=5):
+    '''
+    Benchmarks the parsing of game clocks & boxscores, the hiding of scores, and the serialization of the
+    scoreboard by each JSON encoder, using the given fixture.
+    Game clocks are parsed once per action of every game per call, as when serving a game's actions.
+    Params:
+        fixture: Dictionary returned by load_fixture.
+        repeat: Number of repetitions of each benchmark, of which the fastest is reported.
+    Returns:
+        Dictionary containing the size of the fixture under 'fixture', and the timings of each
+        benchmark keyed by name under 'benchmarks'.
+    '''
+    clocks = [action['clock'] for game in fixture['games'].values()
+              for action in game['actions']]
+    boxscores = [game['boxscore'] for game in fixture['games'].values()]
+    games = fixture['scoreboard']
+
+    def parse_clocks(parse):
+        return lambda: [parse(clock) for clock in clocks]
+
+    results = {
+        'parse_game_clock_reference': _time(parse_clocks(services._parse_game_clock), repeat=repeat),
+        'parse_game_clock_cold': _time(parse_clocks(services.parse_game_clock.__wrapped__), repeat=repeat),
+        'parse_game_clock': _time(parse_clocks(services.parse_game_clock),
+                                  setup=services.parse_game_clock.cache_clear, repeat=repeat),
+        'parse_boxscore': _time(lambda: [services.parse_boxscore(dict(boxscore)) for boxscore in boxscores], repeat=repeat),
+    }
+    for name, preferences in BENCHMARK_PREFERENCES.items():
+        results[f'check_hide_games_{name}'] = _time(
+            lambda: services.check_hide_games(games, preferences), repeat=repeat)
+    # Serialization of the compact scoreboard by each of the available JSON encoders
+    compact_games = [services.project_game(game) for game in games]
+    for name, encoder in responses.JSON_ENCODERS.items():
+        results[f'json_encoder_{name}'] = _time(lambda: encoder(compact_games), repeat=repeat)
+    return {
+        'fixture': {'clocks': len(clocks), 'boxscores': len(boxscores), 'games': len(games)},
+        'benchmarks': results,
+    }
@@ -0,0 +1,234 @@
+from collections import OrderedDict
+from concurrent.futures import Future
+import asyncio
+import threading
+import time
+
+# Result shared with the callers waiting for a fetch that was cancelled, which then repeat their lookup
+_CANCELLED = object()
+
+
+class TTLCache:
+    '''
+    Thread-safe, process-local cache whose entries expire after a time to live.
+    Concurrent misses for the same key are coalesced, so that at most one call to the
+    fetch function is in flight per key at any given time. If a maximum size is given,
+    the least recently used entries are evicted once the cached values exceed it.
+    '''
+
+    def __init__(self, ttl, max_size=None, sizeof=None):
+        '''
+        Params:
+            ttl: Number of seconds for which a fetched value is considered fresh, or None if
+                values never expire. May also be a callable taking the fetched value and
+                returning the number of seconds, allowing the time to live to depend on the value.
+            max_size: Optional maximum total size of the cached values.
+            sizeof: Callable returning the size of a value, required if max_size is given.
+        '''
+        self.ttl = ttl
+        self.max_size = max_size
+        self.sizeof = sizeof
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._size = 0
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def get_or_fetch(self, key, fetch):
+        '''
+        Returns the cached value for the given key, calling the given fetch function
+        if the value is missing or has expired. Callers that miss while another thread
+        is already fetching the same key wait for, and share, that thread's result.
+        Params:
+            key: Hashable key identifying the cached value.
+            fetch: Callable taking no arguments that produces a fresh value.
+        Returns:
+            The cached or freshly fetched value.
+        '''
+        while True:
+            state, result = self._begin_fetch(key)
+            if state == 'hit':
+                return result
+            if state == 'wait':
+                value = result.result()
+                if value is _CANCELLED:
+                    continue
+                return value
+            try:
+                value = fetch()
+            except BaseException as error:
+                self._fail_fetch(key, result, error)
+                raise
+            self._complete_fetch(key, result, value)
+            return value
+
+    async def aget_or_fetch(self, key, fetch):
+        '''
+        Asynchronous version of get_or_fetch, for use by coroutines. In-flight fetches are shared with
+        synchronous callers, and waiting for another caller's fetch does not block the event loop. If the
+        fetching coroutine is cancelled, e.g. because its client disconnected, the waiting callers are not
+        cancelled, but repeat their lookup, one of them taking over the fetch.
+        Params:
+            key: Hashable key identifying the cached value.
+            fetch: Coroutine function taking no arguments that produces a fresh value.
+        Returns:
+            The cached or freshly fetched value.
+        '''
+        while True:
+            state, result = self._begin_fetch(key)
+            if state == 'hit':
+                return result
+            if state == 'wait':
+                # Shielded, so that a cancelled waiter does not cancel the shared fetch
+                value = await asyncio.shield(asyncio.wrap_future(result))
+                if value is _CANCELLED:
+                    continue
+                return value
+            try:
+                value = await fetch()
+            except asyncio.CancelledError:
+                self._cancel_fetch(key, result)
+                raise
+            except BaseException as error:
+                self._fail_fetch(key, result, error)
+                raise
+            self._complete_fetch(key, result, value)
+            return value
+
+    def _begin_fetch(self, key):
+        '''
+        Looks up the given key, registering the caller as the fetcher of the key if the value is
+        missing and no other caller is already fetching it.
+        Returns:
+            Tuple containing 'hit' & the fresh cached value, 'wait' & the future of another caller's
+            in-flight fetch, or 'fetch' & the future through which the caller must share its result.
+        '''
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > time.monotonic()):
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return 'hit', entry[0]
+            future = self._inflight.get(key)
+            if future is not None:
+                # Another caller is already fetching this key, share its result
+                self.hits += 1
+                return 'wait', future
+            self.misses += 1
+            future = self._inflight[key] = Future()
+            return 'fetch', future
+
+    def _fail_fetch(self, key, future, error):
+        '''
+        Shares the given exception raised by a fetch with the callers waiting for it.
+        '''
+        with self._lock:
+            del self._inflight[key]
+        future.set_exception(error)
+
+    def _cancel_fetch(self, key, future):
+        '''
+        Releases the given key after its fetch was cancelled, so that the callers waiting for it repeat
+        their lookup.
+        '''
+        with self._lock:
+            del self._inflight[key]
+        future.set_result(_CANCELLED)
+
+    def _complete_fetch(self, key, future, value):
+        '''
+        Stores the given fetched value & shares it with the callers waiting for it. If the value's time to
+        live or size cannot be determined, the exception is shared instead & raised to the fetching caller.
+        '''
+        try:
+            ttl = self.ttl(value) if callable(self.ttl) else self.ttl
+            size = self.sizeof(value) if self.max_size is not None else 0
+        except BaseException as error:
+            self._fail_fetch(key, future, error)
+            raise
+        with self._lock:
+            self._store(key, value, ttl, size)
+            del self._inflight[key]
+        future.set_result(value)
+
+    def get(self, key, default=None):
+        '''
+        Returns the cached value for the given key without fetching it.
+        Params:
+            key: Hashable key identifying the cached value.
+            default: Value returned if the key is missing or has expired.
+        Returns:
+            The cached value, or the given default.
+        '''
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > time.monotonic()):
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry[0]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        '''
+        Stores the given value for the given key.
+        Params:
+            key: Hashable key identifying the value.
+            value: Value that should be cached.
+        '''
+        ttl = self.ttl(value) if callable(self.ttl) else self.ttl
+        size = self.sizeof(value) if self.max_size is not None else 0
+        with self._lock:
+            self._store(key, value, ttl, size)
+
+    def _store(self, key, value, ttl, size):
+        '''
+        Stores the given value, evicting the least recently used entries if the maximum size
+        is exceeded. The cache lock must be held by the caller.
+        '''
+        self._remove(key)
+        self._entries[key] = (
+            value, None if ttl is None else time.monotonic() + ttl, size)
+        self._size += size
+        # Evict least recently used entries, always keeping the newest one
+        while self.max_size is not None and self._size > self.max_size and len(self._entries) > 1:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key):
+        '''
+        Removes the given key from the cache. The cache lock must be held by the caller.
+        Params:
+            key: Key of the entry that should be removed.
+        '''
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry[2]
+
+    def invalidate(self, key=None):
+        '''
+        Removes the given key from the cache, or every key if no key is given.
+        Params:
+            key: Key of the entry that should be removed.
+        '''
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._size = 0
+            else:
+                self._remove(key)
+
+    def stats(self):
+        '''
+        Returns: Dictionary containing the cache counters, the number of cached entries and their total size.
+        '''
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'size': self._size,
+            }
@@ -0,0 +1,768 @@
+from bisect import bisect_right
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from functools import partial
+import asyncio
+import datetime
+import os
+import threading
+import time
+
+from django.conf import settings
+
+from nba_api.live.nba.endpoints import scoreboard as scoreboard_live, boxscore as boxscore_live, playbyplay as playbyplay_live
+from nba_api.stats.endpoints import scoreboard as scoreboard_stats
+
+from . import recorder, upstream
+from .cache import TTLCache
+from .utils import load_pickled_slot
+
+# URL below which the live NBA data is published, which may point to a local server when testing
+LIVE_BASE_URL = getattr(settings, 'NBA_LIVE_BASE_URL',
+                        'https://cdn.nba.com/static/json/liveData')
+# Maximum number of concurrent connections to the live NBA data, per event loop
+LIVE_MAX_CONNECTIONS = getattr(settings, 'NBA_LIVE_MAX_CONNECTIONS', 10)
+
+# Maximum number of seconds a call of the NBA API may take before the last good data is served instead,
+# unless the call gives its own timeout, e.g. the NBA_SCHEDULE_SCOREBOARD_TIMEOUT setting
+UPSTREAM_TIMEOUT = getattr(settings, 'NBA_UPSTREAM_TIMEOUT', 10)
+# Number of consecutive failed calls after which an NBA API server is no longer called, and the
+# number of seconds after which a single trial call is made again
+UPSTREAM_FAILURE_THRESHOLD = getattr(settings, 'NBA_UPSTREAM_FAILURE_THRESHOLD', 5)
+UPSTREAM_RESET_TIMEOUT = getattr(settings, 'NBA_UPSTREAM_RESET_TIMEOUT', 30)
+# Maximum age in seconds of the last good data served while the NBA API is failing, and the maximum
+# number of calls whose last good data is kept
+UPSTREAM_MAX_STALE = getattr(settings, 'NBA_UPSTREAM_MAX_STALE', 900)
+UPSTREAM_MAX_SNAPSHOTS = getattr(settings, 'NBA_UPSTREAM_MAX_SNAPSHOTS', 1000)
+# Maximum number of concurrent calls of the NBA API by each process
+UPSTREAM_MAX_WORKERS = getattr(settings, 'NBA_UPSTREAM_MAX_WORKERS', 16)
+
+
+class LiveDataSource:
+    '''
+    Data source querying the NBA API using the nba_api module.
+    '''
+
+    def scoreboard(self):
+        '''
+        Returns: List containing dictionaries representing the games of the live scoreboard.
+        '''
+        return self._request(scoreboard_live.ScoreBoard(get_request=False)).games.get_dict()
+
+    def game_data(self, gameID):
+        '''
+        Params:
+            gameID: String representing the game id of the game.
+        Returns:
+            List of the game's play by play actions & dictionary containing the game's boxscore.
+        '''
+        actions = self._request(playbyplay_live.PlayByPlay(gameID, get_request=False)).get_dict()[
+            'game']['actions']
+        return actions, self.boxscore(gameID)
+
+    def boxscore(self, gameID, timeout=30):
+        '''
+        Params:
+            gameID: String representing the game id of the game.
+            timeout: Number of seconds to wait for the NBA API.
+        Returns:
+            Dictionary containing the game's boxscore.
+        '''
+        return self._request(boxscore_live.BoxScore(
+            gameID, timeout=timeout, get_request=False)).get_dict()['game']
+
+    def stats_scoreboard(self, date, timeout=30):
+        '''
+        Params:
+            date: Date or string representing the date of the games.
+            timeout: Number of seconds to wait for the NBA API.
+        Returns:
+            Dictionary containing the stats scoreboard response for the given date.
+        '''
+        return self._request(scoreboard_stats.Scoreboard(
+            game_date=str(date), timeout=timeout, get_request=False)).get_dict()
+
+    @staticmethod
+    def _request(endpoint):
+        '''
+        Sends the request of the given nba_api endpoint, which was created without sending it.
+        Params:
+            endpoint: nba_api endpoint created with get_request=False.
+        Returns:
+            The endpoint, whose response has been loaded.
+        Raises:
+            upstream.UpstreamError: If the NBA API responded with a status other than 200, e.g. for an
+                unknown game id, in which case the response usually can not be loaded.
+        '''
+        try:
+            endpoint.get_request()
+        except Exception as error:
+            response = getattr(endpoint, 'nba_response', None)
+            status = getattr(response, '_status_code', None)
+            if status is not None and status != 200:
+                raise upstream.UpstreamError(
+                    f"NBA API responded with status {status}", status=status) from error
+            raise
+        return endpoint
+
+
+class PickledSlot:
+    '''
+    Reader of a time slot recorded by the former pickling utilities, providing the same interface as
+    recorder.RecordedSlot. Pickled time slots can only be loaded entirely.
+    '''
+
+    def __init__(self, path):
+        '''
+        Params:
+            path: String representing the time slot directory from which the data should be retrieved.
+        '''
+        data = load_pickled_slot(path)
+        self.scoreboard = data['scoreboard']
+        self.stats_scoreboard = data['stats_scoreboard']
+        self._boxscores = data['boxscores']
+        self._playbyplays = data['playbyplays']
+
+    def game(self, gameID):
+        '''
+        Params:
+            gameID: String representing the game id of the game.
+        Returns:
+            List of the game's recorded play by play actions & dictionary containing the game's recorded boxscore.
+        Raises:
+            KeyError: If the game was not recorded.
+        '''
+        return self._playbyplays[gameID], self._boxscores[gameID]
+
+
+class ReplayDataSource:
+    '''
+    Data source replaying recorded NBA data on a simulated clock. The recording directory contains
+    one directory per recorded time slot, named using the time of the recording, either as recorded
+    by the record command (e.g. '19_45_00_250000') or by the former pickling utilities (e.g. '07_45_PM').
+    The simulated clock starts at the first time slot when the data source is created, and advances
+    at the given speed. Once the last time slot is reached, its data continues to be served.
+    The data source can be shared between threads.
+    '''
+
+    def __init__(self, path, speed=1):
+        '''
+        Params:
+            path: String representing the directory containing the recorded time slots.
+            speed: Number of simulated seconds that pass per wall-clock second.
+        '''
+        self.speed = speed
+        # Hidden directories are incomplete recordings
+        slots = sorted((self._parse_slot_time(name), os.path.join(path, name))
+                       for name in os.listdir(path) if not name.startswith('.'))
+        if not slots:
+            raise ValueError(f"No recorded time slots found in {path}.")
+        self.offsets = [(slot_time - slots[0][0]).total_seconds()
+                        for slot_time, slot_path in slots]
+        self.paths = [slot_path for slot_time, slot_path in slots]
+        self.start = time.monotonic()
+        self._lock = threading.Lock()
+        self._slot_index = None
+        self._slot = None
+
+    @staticmethod
+    def _parse_slot_time(name):
+        '''
+        Returns: Datetime representing the time at which the time slot with the given directory name was recorded.
+        '''
+        # Time slots recorded at the same time are suffixed with a counter
+        name = name.split('-')[0]
+        for slot_time_format in (recorder.SLOT_TIME_FORMAT, recorder.SECONDS_SLOT_TIME_FORMAT):
+            try:
+                return datetime.datetime.strptime(name, slot_time_format)
+            except ValueError:
+                pass
+        return datetime.datetime.strptime(name, "%I_%M_%p")
+
+    def current_slot(self):
+        '''
+        Returns the recorded data of the time slot corresponding to the simulated clock, loading it if necessary.
+        Returns: Reader of the recorded data, either a recorder.RecordedSlot or a PickledSlot.
+        '''
+        elapsed = (time.monotonic() - self.start) * self.speed
+        index = max(bisect_right(self.offsets, elapsed) - 1, 0)
+        with self._lock:
+            if index != self._slot_index:
+                path = self.paths[index]
+                self._slot = recorder.RecordedSlot(path) if recorder.is_recorded_slot(
+                    path) else PickledSlot(path)
+                self._slot_index = index
+            return self._slot
+
+    def scoreboard(self):
+        '''
+        Returns: List containing dictionaries representing the games of the recorded live scoreboard.
+        '''
+        return self.current_slot().scoreboard
+
+    def game_data(self, gameID):
+        '''
+        Params:
+            gameID: String representing the game id of the game.
+        Returns:
+            List of the game's recorded play by play actions & dictionary containing the game's recorded boxscore.
+        '''
+        return self.current_slot().game(gameID)
+
+    def boxscore(self, gameID, timeout=None):
+        '''
+        Params:
+            gameID: String representing the game id of the game.
+            timeout: Ignored, since recorded data is served without delay.
+        Returns:
+            Dictionary containing the game's recorded boxscore.
+        '''
+        return self.current_slot().game(gameID)[1]
+
+    def stats_scoreboard(self, date, timeout=None):
+        '''
+        Params:
+            date: Date or string representing the date of the games.
+            timeout: Ignored, since recorded data is served without delay.
+        Returns:
+            Dictionary containing the recorded stats scoreboard response if it corresponds to the
+            given date, otherwise a response without any games.
+        '''
+        stats_scoreboard = self.current_slot().stats_scoreboard
+        for result_set in stats_scoreboard['resultSets']:
+            if result_set['name'] == 'GameHeader':
+                if any(row[0].startswith(str(date)) for row in result_set['rowSet']):
+                    return stats_scoreboard
+        return {'resultSets': [{'name': 'GameHeader', 'rowSet': []}, {'name': 'LineScore', 'rowSet': []}]}
+
+
+class SyntheticDataSource:
+    '''
+    Offline data source generating deterministic games in progress, used as a stand-in for the
+    NBA API when measuring the performance of the app. Every game advances on a simulated clock
+    that starts when the data source is created, producing a new play by play action every
+    ACTION_INTERVAL simulated seconds. The number of calls made to each method is counted, and
+    an optional delay emulates the latency of the NBA API. The data source can be shared between threads.
+    '''
+    # Number of simulated seconds between the actions of a game
+    ACTION_INTERVAL = 20
+    # Number of simulated seconds in a period, and number of periods in a game
+    PERIOD_LENGTH = 720
+    PERIODS = 4
+    # Tricodes of the teams playing the generated games
+    TEAMS = ('ATL', 'BOS', 'BKN', 'CHA', 'CHI', 'CLE', 'DAL', 'DEN', 'DET', 'GSW',
+             'HOU', 'IND', 'LAC', 'LAL', 'MEM', 'MIA', 'MIL', 'MIN', 'NOP', 'NYK',
+             'OKC', 'ORL', 'PHI', 'PHX', 'POR', 'SAC', 'SAS', 'TOR', 'UTA', 'WAS')
+
+    def __init__(self, games=10, speed=1, latency=0):
+        '''
+        Params:
+            games: Number of games that are generated, at most 15.
+            speed: Number of simulated seconds that pass per wall-clock second.
+            latency: Number of seconds each call waits before returning, emulating the NBA API.
+        '''
+        self.games = min(games, len(self.TEAMS) // 2)
+        self.speed = speed
+        self.latency = latency
+        self.start = time.monotonic()
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+    def _call(self, name):
+        '''
+        Records a call of the method with the given name & waits for the configured latency.
+        '''
+        with self._lock:
+            self.calls[name] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def game_ids(self):
+        '''
+        Returns: List containing the game ids of the generated games.
+        '''
+        return [f"00221{index:05d}" for index in range(self.games)]
+
+    def _progress(self, index):
+        '''
+        Returns: Number of simulated seconds played in the game with the given index. Games are
+            staggered, so that they reach the end of a period at different times.
+        '''
+        elapsed = (time.monotonic() - self.start) * self.speed
+        return min(elapsed + index * 137, self.PERIOD_LENGTH * self.PERIODS)
+
+    def _game(self, index):
+        '''
+        Returns: Dictionary representing the game with the given index, in the format of the live scoreboard.
+        '''
+        progress = self._progress(index)
+        finished = progress >= self.PERIOD_LENGTH * self.PERIODS
+        period = min(int(progress // self.PERIOD_LENGTH) + 1, self.PERIODS)
+        remaining = 0 if finished else self.PERIOD_LENGTH - progress % self.PERIOD_LENGTH
+        actions = int(progress // self.ACTION_INTERVAL)
+        clock = f"PT{int(remaining // 60):02d}M{int(remaining % 60):02d}.00S"
+        return {
+            'gameId': self.game_ids()[index],
+            'gameStatus': 3 if finished else 2,
+            'gameStatusText': 'Final' if finished else f"Q{period} {int(remaining // 60)}:{int(remaining % 60):02d}",
+            'period': period,
+            'gameClock': clock,
+            'gameTimeUTC': '2022-01-01T00:00:00Z',
+            'homeTeam': self._team(self.TEAMS[2 * index], (actions * 7) // 6, period),
+            'awayTeam': self._team(self.TEAMS[2 * index + 1], (actions * 13) // 12, period),
+        }
+
+    @staticmethod
+    def _team(tricode, score, period):
+        '''
+        Returns: Dictionary representing a team with the given tricode & score.
+        '''
+        return {
+            'teamId': 0,
+            'teamName': tricode.title(),
+            'teamCity': tricode.title(),
+            'teamTricode': tricode,
+            'score': score,
+            'inBonus': '1' if period > 2 else '0',
+            'timeoutsRemaining': max(7 - period, 0),
+            'periods': [{'period': number, 'periodType': 'REGULAR', 'score': score // period}
+                        for number in range(1, period + 1)],
+        }
+
+    def _actions(self, index):
+        '''
+        Returns: List containing dictionaries representing the play by play actions of the game with the given index.
+        '''
+        game = self._game(index)
+        count = int(self._progress(index) // self.ACTION_INTERVAL)
+        actions = []
+        for number in range(1, count + 1):
+            progress = number * self.ACTION_INTERVAL
+            remaining = self.PERIOD_LENGTH - progress % self.PERIOD_LENGTH
+            actions.append({
+                'actionNumber': number,
+                'period': min(progress // self.PERIOD_LENGTH + 1, self.PERIODS),
+                'clock': f"PT{remaining // 60:02d}M{remaining % 60:02d}.00S",
+                'description': f"Action {number}",
+                'teamTricode': (game['homeTeam'] if number % 2 else game['awayTeam'])['teamTricode'],
+                'scoreHome': str((number * 7) // 6),
+                'scoreAway': str((number * 13) // 12),
+            })
+        return actions
+
+    def _index(self, gameID):
+        '''
+        Returns: Index of the game with the given game id.
+        '''
+        try:
+            return self.game_ids().index(gameID)
+        except ValueError:
+            raise KeyError(gameID) from None
+
+    def scoreboard(self):
+        '''
+        Returns: List containing dictionaries representing the generated games.
+        '''
+        self._call('scoreboard')
+        return [self._game(index) for index in range(self.games)]
+
+    def game_data(self, gameID):
+        '''
+        Params:
+            gameID: String representing the game id of the game.
+        Returns:
+            List of the game's generated play by play actions & dictionary containing the game's generated boxscore.
+        '''
+        self._call('game_data')
+        index = self._index(gameID)
+        return self._actions(index), self._game(index)
+
+    def boxscore(self, gameID, timeout=None):
+        '''
+        Params:
+            gameID: String representing the game id of the game.
+            timeout: Ignored, since generated data is served without contacting the NBA API.
+        Returns:
+            Dictionary containing the game's generated boxscore.
+        '''
+        self._call('boxscore')
+        return self._game(self._index(gameID))
+
+    def stats_scoreboard(self, date, timeout=None):
+        '''
+        Params:
+            date: Date or string representing the date of the games.
+            timeout: Ignored, since generated data is served without contacting the NBA API.
+        Returns:
+            Dictionary containing a stats scoreboard response without any games.
+        '''
+        self._call('stats_scoreboard')
+        return {'resultSets': [{'name': 'GameHeader', 'rowSet': []}, {'name': 'LineScore', 'rowSet': []}]}
+
+
+class AsyncLiveDataSource:
+    '''
+    Asynchronous data source querying the live NBA data over a pool of persistent connections, which
+    requires the optional httpx package (see upstream.AsyncHTTPClient). The stats scoreboard requires
+    the request handling of the nba_api module, and is queried in a worker thread.
+    '''
+
+    def __init__(self, base_url=LIVE_BASE_URL, max_connections=LIVE_MAX_CONNECTIONS):
+        '''
+        Params:
+            base_url: String representing the URL below which the live NBA data is published.
+            max_connections: Maximum number of concurrent connections per event loop.
+        '''
+        self.client = upstream.AsyncHTTPClient(
+            base_url, max_connections=max_connections)
+        self.stats = LiveDataSource()
+
+    async def scoreboard(self):
+        '''
+        Returns: List containing dictionaries representing the games of the live scoreboard.
+        '''
+        return (await self.client.get_json('scoreboard/todaysScoreboard_00.json'))['scoreboard']['games']
+
+    async def game_data(self, gameID):
+        '''
+        Params:
+            gameID: String representing the game id of the game.
+        Returns:
+            List of the game's play by play actions & dictionary containing the game's boxscore,
+            which are queried concurrently.
+        '''
+        playbyplay, boxscore = await asyncio.gather(
+            self.client.get_json(f'playbyplay/playbyplay_{gameID}.json'), self.boxscore(gameID))
+        return playbyplay['game']['actions'], boxscore
+
+    async def boxscore(self, gameID, timeout=None):
+        '''
+        Params:
+            gameID: String representing the game id of the game.
+            timeout: Optional number of seconds to wait for the NBA API.
+        Returns:
+            Dictionary containing the game's boxscore.
+        '''
+        return (await self.client.get_json(f'boxscore/boxscore_{gameID}.json', timeout))['game']
+
+    async def stats_scoreboard(self, date, timeout=30):
+        '''
+        Params:
+            date: Date or string representing the date of the games.
+            timeout: Number of seconds to wait for the NBA API.
+        Returns:
+            Dictionary containing the stats scoreboard response for the given date.
+        '''
+        return await asyncio.to_thread(self.stats.stats_scoreboard, date, timeout=timeout)
+
+
+class ThreadedAsyncDataSource:
+    '''
+    Asynchronous interface to a data source, calling each of its methods in a worker thread.
+    '''
+
+    def __init__(self, data_source):
+        '''
+        Params:
+            data_source: Data source whose methods are called.
+        '''
+        self.data_source = data_source
+
+    async def scoreboard(self):
+        return await asyncio.to_thread(self.data_source.scoreboard)
+
+    async def game_data(self, gameID):
+        return await asyncio.to_thread(self.data_source.game_data, gameID)
+
+    async def boxscore(self, gameID, timeout=None):
+        return await asyncio.to_thread(self.data_source.boxscore, gameID, timeout=timeout)
+
+    async def stats_scoreboard(self, date, timeout=None):
+        return await asyncio.to_thread(self.data_source.stats_scoreboard, date, timeout=timeout)
+
+
+class ResilientDataSource:
+    '''
+    Data source guarding the calls of another data source, so that a slow or failing NBA API can not
+    block the workers handling requests. Each call is made in a worker thread, and the caller stops
+    waiting for it once its deadline has passed. The calls of each NBA API endpoint are protected by a
+    circuit breaker, which rejects calls after repeated server failures (see upstream.is_server_failure),
+    while requests for missing data, e.g. unknown game ids, do not count as failures. While a call fails
+    or is rejected, the last good value of the same call is served instead, as long as it is at most
+    max_stale seconds old, and the call is repeated in the background whenever the circuit allows. The
+    data source can be shared between threads.
+    '''
+    # Methods querying the NBA API endpoints, each of which is protected by its own circuit breaker
+    ENDPOINTS = ('scoreboard', 'game_data', 'boxscore', 'stats_scoreboard')
+
+    def __init__(self, data_source, timeout=UPSTREAM_TIMEOUT, failure_threshold=UPSTREAM_FAILURE_THRESHOLD,
+                 reset_timeout=UPSTREAM_RESET_TIMEOUT, max_stale=UPSTREAM_MAX_STALE, max_workers=UPSTREAM_MAX_WORKERS):
+        '''
+        Params:
+            data_source: Data source whose calls are guarded.
+            timeout: Number of seconds after which a call is abandoned, unless the caller gives its own.
+            failure_threshold: Number of consecutive failures after which an endpoint's circuit opens.
+            reset_timeout: Number of seconds after which an open circuit allows a trial call.
+            max_stale: Maximum age in seconds of the last good values served instead of failed calls.
+            max_workers: Maximum number of concurrent calls.
+        '''
+        self.data_source = data_source
+        self.timeout = timeout
+        self.breakers = {endpoint: upstream.CircuitBreaker(failure_threshold, reset_timeout)
+                         for endpoint in self.ENDPOINTS}
+        # Last good value & the monotonic time at which it was retrieved, keyed by call
+        self.last_good = TTLCache(max_stale, max_size=UPSTREAM_MAX_SNAPSHOTS, sizeof=lambda entry: 1)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='nba-upstream')
+        self._failing = set()
+        self._lock = threading.Lock()
+
+    def scoreboard(self):
+        return self._call(('scoreboard',), self.data_source.scoreboard, self.timeout)
+
+    def game_data(self, gameID):
+        return self._call(('game_data', gameID), partial(self.data_source.game_data, gameID), self.timeout)
+
+    def boxscore(self, gameID, timeout=None):
+        timeout = self._deadline(timeout)
+        return self._call(('boxscore', gameID), partial(self.data_source.boxscore, gameID, timeout=timeout), timeout)
+
+    def stats_scoreboard(self, date, timeout=None):
+        timeout = self._deadline(timeout)
+        return self._call(('stats_scoreboard', str(date)),
+                          partial(self.data_source.stats_scoreboard, date, timeout=timeout), timeout)
+
+    def _deadline(self, timeout):
+        '''
+        Returns: Number of seconds after which a call with the given optional timeout is abandoned. A timeout
+            given explicitly by the caller replaces the default deadline, even if it is longer.
+        '''
+        return self.timeout if timeout is None else timeout
+
+    def staleness(self, name, *args):
+        '''
+        Params:
+            name: String representing the name of the called method, e.g. 'scoreboard'.
+            args: Arguments of the call, excluding any timeout.
+        Returns:
+            Number of seconds since the last good value of the given call was retrieved if the latest
+            attempt of the call failed, meaning that the value served is stale, otherwise None.
+        '''
+        key = (name, *(str(arg) for arg in args))
+        with self._lock:
+            if key not in self._failing:
+                return None
+        entry = self.last_good.get(key)
+        return None if entry is None else time.monotonic() - entry[1]
+
+    def _call(self, key, function, timeout):
+        '''
+        Calls the given function in a worker thread, waiting at most the given number of seconds.
+        Params:
+            key: Tuple containing the name of the called method & its arguments, identifying the call.
+            function: Callable taking no arguments that calls the guarded data source.
+            timeout: Number of seconds after which the call is abandoned.
+        Returns:
+            The value returned by the function, or the call's last good value if the call failed.
+        Raises:
+            upstream.CircuitOpenError: If the endpoint's circuit is open & the call has no last good value.
+            upstream.UpstreamTimeout: If the call was abandoned & has no last good value.
+        '''
+        breaker = self._breaker(key)
+        if not breaker.allow():
+            return self._fallback(key, upstream.CircuitOpenError(f"Circuit of {key[0]} is open"))
+        attempt = {'state': 'pending'}
+        future = self.executor.submit(self._attempt, key, breaker, attempt, function)
+        if breaker.state == 'half-open' and self.last_good.get(key) is not None:
+            # Serve the last good value while the trial call refreshes it in the background
+            return self._fallback(key)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            if not self._abandon(key, breaker, attempt):
+                return future.result()
+            return self._fallback(key, upstream.UpstreamTimeout(
+                f"{key[0]} did not complete within {timeout} seconds"))
+        except Exception as error:
+            return self._fallback(key, error)
+
+    def _attempt(self, key, breaker, attempt, function):
+        '''
+        Calls the given function, recording the outcome. A value returned after the call was abandoned is
+        still stored as the call's last good value.
+        '''
+        try:
+            value = function()
+        except Exception as error:
+            self._finish(key, breaker, attempt, error)
+            raise
+        self.last_good.set(key, (value, time.monotonic()))
+        self._finish(key, breaker, attempt)
+        return value
+
+    def _breaker(self, key):
+        '''
+        Returns: Circuit breaker of the endpoint queried by the given call.
+        '''
+        return self.breakers[key[0]]
+
+    def _finish(self, key, breaker, attempt, error=None):
+        '''
+        Records the outcome of the given attempt, unless it was already recorded as a failure when abandoned.
+        An error that is not a server failure, e.g. an unknown game id, shows that the server is responding.
+        '''
+        with self._lock:
+            abandoned = attempt['state'] == 'abandoned'
+            attempt['state'] = 'finished'
+            if error is None:
+                self._failing.discard(key)
+            else:
+                self._failing.add(key)
+        if not abandoned:
+            if error is not None and upstream.is_server_failure(error):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+
+    def _abandon(self, key, breaker, attempt):
+        '''
+        Abandons the given attempt whose deadline passed, recording it as a failure.
+        Returns: True if the attempt was abandoned, or False if it finished in the meantime.
+        '''
+        with self._lock:
+            if attempt['state'] != 'pending':
+                return False
+            attempt['state'] = 'abandoned'
+            self._failing.add(key)
+        breaker.record_failure()
+        return True
+
+    def _fallback(self, key, error=None):
+        '''
+        Returns: The last good value of the given call, which is marked as failing if an error is given.
+        Raises:
+            The given error if the call has no last good value.
+        '''
+        entry = self.last_good.get(key)
+        if error is not None:
+            with self._lock:
+                self._failing.add(key)
+        if entry is None:
+            raise error
+        return entry[0]
+
+
+class AsyncResilientDataSource:
+    '''
+    Asynchronous version of ResilientDataSource, guarding the calls of an asynchronous data source. The
+    circuit breakers & last good values are shared with the given ResilientDataSource. Abandoned calls
+    continue in the background for as long as the event loop runs.
+    '''
+
+    def __init__(self, async_data_source, resilient):
+        '''
+        Params:
+            async_data_source: Asynchronous data source whose calls are guarded.
+            resilient: ResilientDataSource guarding the synchronous version of the same data.
+        '''
+        self.data_source = async_data_source
+        self.resilient = resilient
+        self._tasks = set()
+
+    async def scoreboard(self):
+        return await self._call(('scoreboard',), self.data_source.scoreboard, self.resilient.timeout)
+
+    async def game_data(self, gameID):
+        return await self._call(('game_data', gameID), partial(self.data_source.game_data, gameID),
+                                self.resilient.timeout)
+
+    async def boxscore(self, gameID, timeout=None):
+        timeout = self.resilient._deadline(timeout)
+        return await self._call(('boxscore', gameID), partial(self.data_source.boxscore, gameID, timeout=timeout),
+                                timeout)
+
+    async def stats_scoreboard(self, date, timeout=None):
+        timeout = self.resilient._deadline(timeout)
+        return await self._call(('stats_scoreboard', str(date)),
+                                partial(self.data_source.stats_scoreboard, date, timeout=timeout), timeout)
+
+    async def _call(self, key, function, timeout):
+        '''
+        Asynchronous version of ResilientDataSource._call.
+        Params:
+            key: Tuple containing the name of the called method & its arguments, identifying the call.
+            function: Coroutine function taking no arguments that calls the guarded data source.
+            timeout: Number of seconds after which the call is abandoned.
+        Returns:
+            The value returned by the function, or the call's last good value if the call failed.
+        '''
+        resilient = self.resilient
+        breaker = resilient._breaker(key)
+        if not breaker.allow():
+            return resilient._fallback(key, upstream.CircuitOpenError(f"Circuit of {key[0]} is open"))
+        attempt = {'state': 'pending'}
+        task = asyncio.ensure_future(self._attempt(key, breaker, attempt, function))
+        # Keep a reference to the task until it finishes, and retrieve the exception of abandoned tasks
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        task.add_done_callback(lambda task: task.cancelled() or task.exception())
+        if breaker.state == 'half-open' and resilient.last_good.get(key) is not None:
+            return resilient._fallback(key)
+        try:
+            # Shielded, so that an abandoned call continues & refreshes the last good value
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            if not resilient._abandon(key, breaker, attempt):
+                return await task
+            return resilient._fallback(key, upstream.UpstreamTimeout(
+                f"{key[0]} did not complete within {timeout} seconds"))
+        except Exception as error:
+            return resilient._fallback(key, error)
+
+    async def _attempt(self, key, breaker, attempt, function):
+        '''
+        Asynchronous version of ResilientDataSource._attempt.
+        '''
+        try:
+            value = await function()
+        except Exception as error:
+            self.resilient._finish(key, breaker, attempt, error)
+            raise
+        self.resilient.last_good.set(key, (value, time.monotonic()))
+        self.resilient._finish(key, breaker, attempt)
+        return value
+
+
+def get_async_data_source(data_source):
+    '''
+    Creates the asynchronous data source used by the asynchronous views. The live NBA data is queried
+    natively if the optional httpx package is installed, while any other data source is called in worker
+    threads. The calls of a ResilientDataSource are guarded by an AsyncResilientDataSource sharing its
+    state.
+    Params:
+        data_source: Data source returned by get_data_source.
+    Returns:
+        Asynchronous data source used for retrieving NBA data.
+    '''
+    if isinstance(data_source, ResilientDataSource):
+        return AsyncResilientDataSource(get_async_data_source(data_source.data_source), data_source)
+    if isinstance(data_source, LiveDataSource) and upstream.httpx is not None:
+        return AsyncLiveDataSource()
+    return ThreadedAsyncDataSource(data_source)
+
+
+def get_data_source():
+    '''
+    Creates the data source selected by the NBA_DATA_SOURCE setting, which is either 'live' (default),
+    'replay' or 'synthetic'. The live NBA API is guarded by a ResilientDataSource. The replay data source
+    is configured using the NBA_REPLAY_PATH & NBA_REPLAY_SPEED settings, and the synthetic data source
+    using the NBA_SYNTHETIC_GAMES setting.
+    Returns: Data source used for retrieving NBA data.
+    '''
+    name = getattr(settings, 'NBA_DATA_SOURCE', 'live')
+    if name == 'live':
+        return ResilientDataSource(LiveDataSource())
+    elif name == 'replay':
+        return ReplayDataSource(settings.NBA_REPLAY_PATH, getattr(settings, 'NBA_REPLAY_SPEED', 1))
+    elif name == 'synthetic':
+        return SyntheticDataSource(getattr(settings, 'NBA_SYNTHETIC_GAMES', 10))
+    raise ValueError(f"Unknown NBA data source: {name}")
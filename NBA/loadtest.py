@@ -0,0 +1,280 @@
+from collections import defaultdict
+from contextlib import contextmanager
+import datetime
+import math
+import random
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from . import services
+from .datasources import SyntheticDataSource, ThreadedAsyncDataSource
+from .models import HiddenGamePreferences
+
+
+def percentile(values, percent):
+    '''
+    Returns the given percentile of the given values using the nearest-rank method.
+    Params:
+        values: Sorted list of numbers.
+        percent: Number between 0 & 100 representing the percentile.
+    Returns:
+        The percentile, or None if no values are given.
+    '''
+    if not values:
+        return None
+    return values[max(math.ceil(percent / 100 * len(values)) - 1, 0)]
+
+
+class Recorder:
+    '''
+    Thread-safe collection of the latencies, status codes & database queries of the load test's requests.
+    '''
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.queries = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, status, latency, queries):
+        '''
+        Records a completed request.
+        Params:
+            endpoint: String identifying the queried endpoint.
+            status: Integer representing the response's status code, or 0 if the request failed.
+            latency: Number of seconds the request took.
+            queries: Number of database queries made by the request.
+        '''
+        with self._lock:
+            self.latencies[endpoint].append(latency)
+            self.queries[endpoint] += queries
+            self.statuses[endpoint][status] += 1
+
+    def summary(self, endpoint=None):
+        '''
+        Returns: Dictionary summarizing the requests of the given endpoint, or of every endpoint if none is given.
+        '''
+        with self._lock:
+            endpoints = [endpoint] if endpoint else list(self.latencies)
+            latencies = sorted(latency for name in endpoints for latency in self.latencies[name])
+            queries = sum(self.queries[name] for name in endpoints)
+            statuses = defaultdict(int)
+            for name in endpoints:
+                for status, count in self.statuses[name].items():
+                    statuses[status] += count
+        return {
+            'requests': len(latencies),
+            'statuses': {str(status): count for status, count in sorted(statuses.items())},
+            'errors': sum(count for status, count in statuses.items() if status == 0 or status >= 500),
+            'latency_ms': {
+                'mean': sum(latencies) / len(latencies) * 1000 if latencies else None,
+                'p50': _milliseconds(percentile(latencies, 50)),
+                'p95': _milliseconds(percentile(latencies, 95)),
+                'p99': _milliseconds(percentile(latencies, 99)),
+                'max': _milliseconds(latencies[-1] if latencies else None),
+            },
+            'db_queries_per_request': queries / len(latencies) if latencies else None,
+        }
+
+
+def _milliseconds(seconds):
+    '''
+    Returns: The given number of seconds in milliseconds, or None if no number is given.
+    '''
+    return None if seconds is None else seconds * 1000
+
+
+class PollingClient(threading.Thread):
+    '''
+    Thread emulating a browser that polls one of the update endpoints, sending the same conditional
+    & incremental parameters as the app's JavaScript, and waiting the interval suggested by the server.
+    '''
+
+    def __init__(self, recorder, deadline, interval, gameId=None, user=None, time_scale=1):
+        '''
+        Params:
+            recorder: Recorder collecting the results of the client's requests.
+            deadline: Monotonic time at which the client stops polling.
+            interval: Number of seconds between the client's requests if the server suggests no interval.
+            gameId: String representing the game id polled by the client, or None to poll the scoreboard.
+            user: Optional user that the client is logged in as.
+            time_scale: Factor by which the intervals suggested by the server are shortened.
+        '''
+        super().__init__(daemon=True)
+        self.recorder = recorder
+        self.deadline = deadline
+        self.interval = interval
+        self.time_scale = time_scale
+        self.gameId = gameId
+        self.client = Client(HTTP_ACCEPT_ENCODING='gzip')
+        if user is not None:
+            self.client.force_login(user)
+        self.etag = None
+        self.cursor = {'since': 0, 'version': ''}
+        self.queries = 0
+
+    def _count_query(self, execute, sql, params, many, context):
+        '''
+        Database execute wrapper counting the queries made by this client's requests.
+        '''
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    def run(self):
+        try:
+            with connection.execute_wrapper(self._count_query):
+                # Stagger the clients' first requests across the polling interval
+                next_poll = time.monotonic() + random.uniform(0, self.interval)
+                while True:
+                    time.sleep(max(next_poll - time.monotonic(), 0))
+                    if time.monotonic() >= self.deadline:
+                        break
+                    interval = self.poll()
+                    # The server indicated that polling should stop
+                    if interval is None:
+                        break
+                    next_poll += interval
+        finally:
+            connection.close()
+
+    def poll(self):
+        '''
+        Queries the client's endpoint once, recording the result.
+        Returns: Number of seconds until the next query, or None if the client should stop polling.
+        '''
+        headers = {'HTTP_IF_NONE_MATCH': self.etag} if self.etag else {}
+        if self.gameId is None:
+            endpoint = 'update_games'
+            url, params = reverse('NBA:update_games'), {}
+        else:
+            endpoint = 'update_game'
+            url, params = reverse('NBA:update_game', args=[self.gameId]), self.cursor
+        self.queries = 0
+        start = time.perf_counter()
+        try:
+            response = self.client.get(url, params, **headers)
+        except Exception:
+            self.recorder.record(endpoint, 0, time.perf_counter() - start, self.queries)
+            return self.interval
+        self.recorder.record(endpoint, response.status_code,
+                             time.perf_counter() - start, self.queries)
+        if response.status_code == 200:
+            self.etag = response.get('ETag')
+            if self.gameId is not None:
+                data = response.json()
+                if data['actions']:
+                    self.cursor['since'] = data['actions'][-1]['actionNumber']
+                self.cursor['version'] = data['version']
+        next_poll = response.get('X-Next-Poll')
+        if next_poll == 'none':
+            return None
+        return self.interval if next_poll is None else int(next_poll) / 1000 / self.time_scale
+
+
+@contextmanager
+def use_data_source(data_source):
+    '''
+    Temporarily serves the NBA services from the given data source, starting with empty caches.
+    Params:
+        data_source: Data source that should be queried instead of the configured one.
+    '''
+    previous = services.data_source, services.async_data_source, services.LIVE_INGESTION
+    caches = (services.scoreboard_cache,
+              services.game_data_cache, services.boxscore_history)
+    services.data_source, services.LIVE_INGESTION = data_source, False
+    services.async_data_source = ThreadedAsyncDataSource(data_source)
+    for cache in caches:
+        cache.invalidate()
+    try:
+        yield data_source
+    finally:
+        services.data_source, services.async_data_source, services.LIVE_INGESTION = previous
+        for cache in caches:
+            cache.invalidate()
+
+
+def create_users(count):
+    '''
+    Creates users for the logged in clients, alternating between users that hide the scores of close
+    games & users that do not hide any scores.
+    Params:
+        count: Number of users that should be created.
+    Returns:
+        List containing the created users.
+    '''
+    users = []
+    for number in range(count):
+        user = User.objects.create_user(f"loadtest{number}")
+        HiddenGamePreferences.objects.create(
+            user=user, hide_scores=number % 2 == 0, max_score_difference=10)
+        users.append(user)
+    return users
+
+
+def run_load_test(clients=50, game_clients=0.5, logged_in=0, duration=60, games=10,
+                  time_scale=1, upstream_latency=0.1):
+    '''
+    Runs the app against a synthetic, offline stand-in for the NBA API while the given number of clients
+    poll the update endpoints at the intervals suggested by the server, like the app's JavaScript.
+    Params:
+        clients: Number of concurrent clients.
+        game_clients: Fraction of the clients polling the detailed data of a game rather than the scoreboard.
+        logged_in: Number of clients that are logged in, whose hidden game preferences are applied. The
+            users are created in the current database.
+        duration: Number of wall-clock seconds the clients poll for.
+        games: Number of games in progress.
+        time_scale: Factor by which the polling intervals & the games' progress are sped up. The
+            cache lifetimes are not scaled, so the upstream calls are only realistic when this is 1.
+        upstream_latency: Number of seconds each query of the stand-in for the NBA API takes.
+    Returns:
+        Dictionary containing the results of the load test.
+    '''
+    data_source = SyntheticDataSource(games, speed=time_scale, latency=upstream_latency)
+    recorder = Recorder()
+    users = create_users(logged_in)
+    game_ids = data_source.game_ids()
+    game_client_count = round(clients * game_clients)
+    with use_data_source(data_source):
+        start = time.monotonic()
+        deadline = start + duration
+        threads = []
+        # Users are assigned to the scoreboard clients first, since only the scoreboard depends on the user
+        for number in range(clients):
+            user = users[number] if number < len(users) else None
+            if number < clients - game_client_count:
+                threads.append(PollingClient(recorder, deadline, services.GAMES_UPDATE_INTERVAL / 1000 / time_scale,
+                                             user=user, time_scale=time_scale))
+            else:
+                threads.append(PollingClient(recorder, deadline, services.GAME_UPDATE_INTERVAL / 1000 / time_scale,
+                                             gameId=game_ids[number % len(game_ids)], user=user,
+                                             time_scale=time_scale))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - start
+    summary = recorder.summary()
+    upstream_calls = sum(data_source.calls.values())
+    return {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'options': {
+            'clients': clients,
+            'game_clients': game_client_count,
+            'logged_in': logged_in,
+            'duration': duration,
+            'games': games,
+            'time_scale': time_scale,
+            'upstream_latency': upstream_latency,
+        },
+        'elapsed': elapsed,
+        'requests_per_second': summary['requests'] / elapsed,
+        **summary,
+        'upstream_calls': dict(data_source.calls),
+        'upstream_calls_per_minute': upstream_calls / elapsed * 60,
+        'endpoints': {endpoint: recorder.summary(endpoint) for endpoint in ('update_games', 'update_game')},
+    }
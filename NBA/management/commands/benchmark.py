@@ -0,0 +1,41 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from NBA import benchmarks, services
+
+
+class Command(BaseCommand):
+    '''
+    Management command that benchmarks the parsing of the NBA data & the hiding of scores.
+    '''
+    help = 'Benchmarks parse_game_clock, parse_boxscore & check_hide_games using a recorded fixture.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fixture',
+                            help='Path of a JSON fixture file. Defaults to generated games.')
+        parser.add_argument('--record', action='store_true',
+                            help='Record the current data of the configured data source to --fixture & exit.')
+        parser.add_argument('--output',
+                            help='Path of a JSON file in which the results are stored.')
+
+    def handle(self, *args, **options):
+        if options['record']:
+            if not options['fixture']:
+                self.stderr.write('--record requires --fixture.')
+                return
+            benchmarks.record_fixture(services.data_source, options['fixture'])
+            self.stdout.write(f"Fixture recorded to {options['fixture']}")
+            return
+
+        results = benchmarks.run_benchmarks(
+            benchmarks.load_fixture(options['fixture']))
+        fixture = results['fixture']
+        self.stdout.write(f"{fixture['games']} games, {fixture['boxscores']} boxscores, "
+                          f"{fixture['clocks']} clocks")
+        for name, result in results['benchmarks'].items():
+            self.stdout.write(
+                f"{name}: {result['microseconds_per_call']:.1f} µs per call")
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(results, file, indent=2)
@@ -0,0 +1,78 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from NBA import services, store
+
+
+class Command(BaseCommand):
+    '''
+    Management command that polls the NBA API for live data on its own schedule, and writes
+    normalized snapshots which are read by the NBA views when NBA_LIVE_INGESTION is enabled.
+    '''
+    help = 'Polls the NBA API for live games & stores normalized snapshots for the NBA views.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scoreboard-interval', type=float, default=10,
+                            help='Number of seconds between live scoreboard queries.')
+        parser.add_argument('--game-interval', type=float, default=10,
+                            help='Number of seconds between boxscore & play by play queries of games in progress.')
+        parser.add_argument('--once', action='store_true',
+                            help='Perform a single polling pass and exit.')
+
+    def handle(self, *args, **options):
+        games = []
+        next_scoreboard = next_games = 0
+        while True:
+            now = time.monotonic()
+            if now >= next_scoreboard:
+                next_scoreboard = now + options['scoreboard_interval']
+                games = self.ingest_scoreboard() or games
+            if now >= next_games:
+                next_games = now + options['game_interval']
+                self.ingest_games(games)
+            if options['once']:
+                break
+            time.sleep(max(min(next_scoreboard, next_games) - time.monotonic(), 0))
+
+    def ingest_scoreboard(self):
+        '''
+        Stores a snapshot of the live scoreboard.
+        Returns: List of dictionaries representing the current games, or None if the query failed.
+        '''
+        try:
+            games = services._fetch_scoreboard()
+        except Exception as error:
+            self.stderr.write(f"Failed to query scoreboard: {error!r}")
+            return None
+        # Stale data is not stored, so that the views detect the outdated snapshot
+        if services.get_staleness('scoreboard') is not None:
+            self.stderr.write("Failed to query scoreboard, the last good scoreboard is stale")
+            return games
+        store.write_snapshot('scoreboard', games)
+        return games
+
+    def ingest_games(self, games):
+        '''
+        Stores snapshots of the detailed data for each of the given games that is in progress.
+        Finished games are stored a single time, since their data no longer changes.
+        Params:
+            games: List of dictionaries representing the current games.
+        '''
+        for game in games:
+            gameId = game['gameId']
+            if game['gameStatus'] == 2:
+                name = f'game_{gameId}'
+            elif game['gameStatus'] == 3 and not store.snapshot_exists(f'final_{gameId}'):
+                name = f'final_{gameId}'
+            else:
+                continue
+            try:
+                actions, boxscore = services.fetch_game_data(gameId)
+            except Exception as error:
+                self.stderr.write(f"Failed to query game {gameId}: {error!r}")
+                continue
+            if services.get_staleness('game_data', gameId) is not None:
+                self.stderr.write(f"Failed to query game {gameId}, the last good data is stale")
+                continue
+            store.write_snapshot(name, {'actions': actions, 'boxscore': boxscore})
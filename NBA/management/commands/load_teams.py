@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from NBA import services
+
+
+class Command(BaseCommand):
+    '''
+    Management command that populates the Team models using the static team data of the nba_api module.
+    '''
+    help = 'Creates or updates the Team models using the team data provided by the nba_api module.'
+
+    def handle(self, *args, **options):
+        created, updated = services.update_team_models()
+        self.stdout.write(f"Created {created} teams, updated {updated} teams.")
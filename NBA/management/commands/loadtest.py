@@ -0,0 +1,109 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+
+from NBA.loadtest import run_load_test
+
+# Directory in which the load test results are stored
+LOADTEST_DIR = getattr(settings, 'NBA_LOADTEST_DIR',
+                       settings.BASE_DIR / 'loadtests')
+
+# Metrics compared against a previous run, and whether higher values are better
+COMPARED_METRICS = (
+    (('requests_per_second',), True),
+    (('latency_ms', 'p50'), False),
+    (('latency_ms', 'p95'), False),
+    (('latency_ms', 'p99'), False),
+    (('upstream_calls_per_minute',), False),
+    (('db_queries_per_request',), False),
+)
+
+
+class Command(BaseCommand):
+    '''
+    Management command that measures the throughput of the polling endpoints, by running the app against
+    an offline stand-in for the NBA API in a temporary test database while concurrent clients poll it.
+    '''
+    help = 'Load tests the update_games & update_game endpoints & stores the results as JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=50,
+                            help='Number of concurrent clients.')
+        parser.add_argument('--game-clients', type=float, default=0.5,
+                            help='Fraction of the clients polling a single game rather than the scoreboard.')
+        parser.add_argument('--logged-in', type=int, default=0,
+                            help='Number of clients logged in as users with hidden game preferences.')
+        parser.add_argument('--duration', type=float, default=60,
+                            help='Number of seconds the clients poll for.')
+        parser.add_argument('--games', type=int, default=10,
+                            help='Number of games in progress.')
+        parser.add_argument('--time-scale', type=float, default=1,
+                            help='Factor by which the polling intervals & game progress are sped up.')
+        parser.add_argument('--upstream-latency', type=float, default=0.1,
+                            help='Number of seconds each query of the NBA API stand-in takes.')
+        parser.add_argument('--output',
+                            help='Path of the JSON results file. Defaults to a timestamped file in NBA_LOADTEST_DIR.')
+        parser.add_argument('--compare',
+                            help='Path of a previous JSON results file to compare the results against.')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            results = run_load_test(
+                clients=options['clients'],
+                game_clients=options['game_clients'],
+                logged_in=options['logged_in'],
+                duration=options['duration'],
+                games=options['games'],
+                time_scale=options['time_scale'],
+                upstream_latency=options['upstream_latency'],
+            )
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        if options['output']:
+            output = options['output']
+        else:
+            LOADTEST_DIR.mkdir(parents=True, exist_ok=True)
+            output = LOADTEST_DIR / f"loadtest_{time.strftime('%Y%m%d_%H%M%S')}.json"
+        with open(output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+        self.stdout.write(f"{results['requests']} requests, {results['errors']} errors, "
+                          f"{results['requests_per_second']:.1f} requests/s")
+        for endpoint, summary in results['endpoints'].items():
+            if summary['requests']:
+                latency = summary['latency_ms']
+                self.stdout.write(f"{endpoint}: p50 {latency['p50']:.1f} ms, p95 {latency['p95']:.1f} ms, "
+                                  f"p99 {latency['p99']:.1f} ms, "
+                                  f"{summary['db_queries_per_request']:.2f} queries/request")
+        self.stdout.write(
+            f"{results['upstream_calls_per_minute']:.1f} upstream calls/minute {results['upstream_calls']}")
+        if options['compare']:
+            with open(options['compare']) as file:
+                self.compare(json.load(file), results)
+        self.stdout.write(f"Results stored in {output}")
+
+    def compare(self, previous, results):
+        '''
+        Writes the change of the compared metrics since the given previous results.
+        Params:
+            previous: Dictionary containing the results of a previous run.
+            results: Dictionary containing the results of this run.
+        '''
+        for keys, higher_is_better in COMPARED_METRICS:
+            old, new = previous, results
+            for key in keys:
+                old, new = old.get(key) if old else None, new.get(key) if new else None
+            name = '.'.join(keys)
+            if not old or new is None:
+                self.stdout.write(f"{name}: {new} (no previous value)")
+                continue
+            change = (new - old) / old * 100
+            style = self.style.SUCCESS if (change >= 0) == higher_is_better else self.style.WARNING
+            self.stdout.write(style(f"{name}: {old:.2f} -> {new:.2f} ({change:+.1f}%)"))
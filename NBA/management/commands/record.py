@@ -0,0 +1,41 @@
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+from django.core.management.base import BaseCommand
+
+from NBA import recorder
+from NBA.datasources import LiveDataSource
+
+
+class Command(BaseCommand):
+    '''
+    Management command that records the current NBA data as raw JSON, which can later be replayed
+    by setting NBA_DATA_SOURCE to 'replay' & NBA_REPLAY_PATH to a recorded day's directory.
+    '''
+    help = 'Records the current NBA data into NBA_RECORDING_DIR, once or at a regular interval.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float,
+                            help='Number of seconds between recordings. Records a single time slot if omitted.')
+        parser.add_argument('--workers', type=int, default=8,
+                            help='Maximum number of games queried concurrently.')
+        parser.add_argument('--directory', default=recorder.RECORDING_DIR,
+                            help='Directory in which the recordings are stored.')
+
+    def handle(self, *args, **options):
+        data_source = LiveDataSource()
+        with ThreadPoolExecutor(max_workers=options['workers'], thread_name_prefix='nba-record') as executor:
+            while True:
+                start = time.monotonic()
+                try:
+                    path, errors = recorder.record_slot(
+                        data_source, root=options['directory'], executor=executor)
+                except Exception as error:
+                    self.stderr.write(f"Failed to record: {error!r}")
+                else:
+                    for gameId, error in errors.items():
+                        self.stderr.write(f"Failed to record game {gameId}: {error!r}")
+                    self.stdout.write(f"Recorded {path} in {time.monotonic() - start:.1f}s")
+                if options['interval'] is None:
+                    break
+                time.sleep(max(start + options['interval'] - time.monotonic(), 0))
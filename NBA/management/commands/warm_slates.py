@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from NBA import services, warmer
+
+
+class Command(BaseCommand):
+    '''
+    Management command that prefetches yesterday's, today's & tomorrow's slates ahead of their first
+    requests, rolling the dates over at local midnight in the TIME_ZONE setting's time zone.
+    Today's live data is only prefetched if shared snapshots are enabled, since it would otherwise be cached
+    in the memory of this command's process only, where it is of no use to the web server processes.
+    '''
+    help = "Prefetches yesterday's, today's & tomorrow's games & boxscores, once or at a regular interval."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=warmer.SLATE_WARM_INTERVAL,
+                            help='Number of seconds between prefetches, which also happen after every local midnight.')
+        parser.add_argument('--once', action='store_true',
+                            help='Prefetch the slates a single time and exit.')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            for date, error in warmer.warm_slates(live=services.SHARED_SNAPSHOTS).items():
+                self.stderr.write(f"Failed to prefetch the slate of {date}: {error!r}")
+            return
+        warmer.run_warmer(options['interval'], log=self.stderr.write, live=services.SHARED_SNAPSHOTS)
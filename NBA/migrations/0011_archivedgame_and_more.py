@@ -0,0 +1,27 @@
+# Generated by Django 4.0.10 on 2026-10-17 22:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('NBA', '0010_hiddengamepreferences_hide_scores'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedGame',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('game_id', models.CharField(max_length=10, unique=True)),
+                ('date', models.DateField()),
+                ('sequence', models.IntegerField()),
+                ('data', models.JSONField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedgame',
+            index=models.Index(fields=['date', 'game_id'], name='NBA_archive_date_67cee1_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.0.10 on 2026-10-17 23:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('NBA', '0011_archivedgame_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='hiddengamepreferences',
+            name='max_score_difference',
+            field=models.IntegerField(default=0),
+        ),
+    ]
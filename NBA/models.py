@@ -34,3 +34,24 @@ class HiddenGamePreferences(models.Model):
         Display the user's username for print statements.
         '''
         return self.user.username
+
+
+class ArchivedGame(models.Model):
+    '''
+    Model representing the stored data of a finished NBA game, allowing the games of past dates
+    to be displayed without querying the NBA API.
+    '''
+    game_id = models.CharField(max_length=10, unique=True)
+    date = models.DateField()
+    sequence = models.IntegerField()
+    data = models.JSONField()
+
+    class Meta:
+        # Also serves the lookups of a date's games, since the date is its leading column
+        indexes = [models.Index(fields=['date', 'game_id'])]
+
+    def __str__(self):
+        '''
+        Display the game's id & date for print statements.
+        '''
+        return f"{self.game_id} ({self.date})"
@@ -0,0 +1,181 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import datetime
+import errno
+import itertools
+import json
+import mmap
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+
+# Directory in which recorded NBA data is stored, addressed by date & time of the recording
+RECORDING_DIR = Path(getattr(settings, 'NBA_RECORDING_DIR',
+                             settings.BASE_DIR / 'NBA' / 'recordings'))
+# Format of the names of the time slot directories, which sort chronologically within a day. Slots
+# recorded at the same time are suffixed with a counter, e.g. '19_45_00_000000-1'
+SLOT_TIME_FORMAT = "%H_%M_%S_%f"
+# Format of the names of the time slot directories recorded before sub-second precision was added
+SECONDS_SLOT_TIME_FORMAT = "%H_%M_%S"
+
+# Names of the files of each recorded time slot
+SCOREBOARD_FILE = 'scoreboard_live.json'
+STATS_SCOREBOARD_FILE = 'scoreboard_stats.json'
+GAMES_FILE = 'games.jsonl'
+GAMES_INDEX_FILE = 'games.index.json'
+
+
+def slot_path(when, root=RECORDING_DIR):
+    '''
+    Returns: Path of the time slot directory of a recording made at the given datetime.
+    '''
+    return Path(root) / str(when.year) / str(when.month) / str(when.day) / when.strftime(SLOT_TIME_FORMAT)
+
+
+def is_recorded_slot(path):
+    '''
+    Returns: True if the given directory contains a time slot recorded by record_slot, otherwise False.
+    '''
+    return os.path.exists(os.path.join(path, SCOREBOARD_FILE))
+
+
+def record_slot(data_source, when=None, root=RECORDING_DIR, executor=None):
+    '''
+    Records the current NBA data of the given data source as a new time slot. The detailed data of the
+    games that have started is queried concurrently. Every file is written to a hidden temporary directory
+    which is renamed to the time slot's path once complete, so that a crashed recording never leaves a
+    partial time slot behind. An existing time slot of the same time is never replaced, the new time slot's
+    name is suffixed with a counter instead.
+    Params:
+        data_source: Data source from which the data should be recorded, e.g. the live data source.
+        when: Optional datetime of the recording, defaulting to the current local time.
+        root: Directory in which the time slot is stored.
+        executor: Optional executor used for querying the games concurrently.
+    Returns:
+        Tuple containing the path of the recorded time slot, and a dictionary containing the exception
+        raised for each game whose data could not be recorded, keyed by game id.
+    '''
+    when = when or datetime.datetime.now()
+    games = data_source.scoreboard()
+    stats_scoreboard = data_source.stats_scoreboard(when.date())
+    started = [game['gameId'] for game in games if game['gameStatus'] > 1]
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=max(len(started), 1))
+    try:
+        futures = {gameId: executor.submit(data_source.game_data, gameId) for gameId in started}
+        game_data, errors = {}, {}
+        for gameId, future in futures.items():
+            try:
+                game_data[gameId] = future.result()
+            except Exception as error:
+                errors[gameId] = error
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+    path = slot_path(when, root)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = tempfile.mkdtemp(dir=path.parent, prefix='.', suffix='.tmp')
+    try:
+        _write_json(os.path.join(temp_path, SCOREBOARD_FILE), games)
+        _write_json(os.path.join(temp_path, STATS_SCOREBOARD_FILE), stats_scoreboard)
+        # Each game is stored on its own line, and its offset & length are indexed by game id
+        index = {}
+        with open(os.path.join(temp_path, GAMES_FILE), 'wb') as file:
+            for gameId, (actions, boxscore) in game_data.items():
+                line = json.dumps({'gameId': gameId, 'actions': actions, 'boxscore': boxscore}).encode() + b'\n'
+                index[gameId] = (file.tell(), len(line))
+                file.write(line)
+            file.flush()
+            os.fsync(file.fileno())
+        _write_json(os.path.join(temp_path, GAMES_INDEX_FILE), index)
+        path = _rename_slot(temp_path, path)
+    except BaseException:
+        shutil.rmtree(temp_path, ignore_errors=True)
+        raise
+    return path, errors
+
+
+def _rename_slot(temp_path, path):
+    '''
+    Renames the given complete temporary directory to the given time slot path, or to the first free path
+    suffixed with a counter if a time slot was already recorded at the same time.
+    Returns: Path of the time slot.
+    '''
+    for count in itertools.count():
+        target = path if count == 0 else path.with_name(f"{path.name}-{count}")
+        try:
+            # Renaming fails if the target is a non-empty directory, i.e. a recorded time slot
+            os.rename(temp_path, target)
+            return target
+        except OSError as error:
+            if error.errno not in (errno.EEXIST, errno.ENOTEMPTY):
+                raise
+
+
+def _write_json(path, data):
+    '''
+    Writes the given data to the given path as JSON, flushing it to disk.
+    '''
+    with open(path, 'w') as file:
+        json.dump(data, file)
+        file.flush()
+        os.fsync(file.fileno())
+
+
+class RecordedSlot:
+    '''
+    Lazy reader of a time slot recorded by record_slot. The scoreboards are loaded immediately, while
+    the games file is memory-mapped and only the bytes of a requested game are read & parsed, located
+    using the slot's index of game ids. The reader can be shared between threads.
+    '''
+
+    def __init__(self, path):
+        '''
+        Params:
+            path: String representing the time slot directory from which the data should be retrieved.
+        '''
+        with open(os.path.join(path, SCOREBOARD_FILE)) as file:
+            self.scoreboard = json.load(file)
+        with open(os.path.join(path, STATS_SCOREBOARD_FILE)) as file:
+            self.stats_scoreboard = json.load(file)
+        with open(os.path.join(path, GAMES_FILE), 'rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            # Empty files cannot be memory-mapped
+            self._games = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        try:
+            with open(os.path.join(path, GAMES_INDEX_FILE)) as file:
+                self.index = {gameId: tuple(entry) for gameId, entry in json.load(file).items()}
+        except FileNotFoundError:
+            self.index = self._build_index()
+
+    def _build_index(self):
+        '''
+        Builds the index of a time slot recorded without one by scanning the games file once.
+        Returns: Dictionary containing the offset & length of each game's line, keyed by game id.
+        '''
+        index = {}
+        offset = 0
+        while offset < len(self._games):
+            end = self._games.find(b'\n', offset)
+            end = len(self._games) if end == -1 else end + 1
+            index[json.loads(self._games[offset:end])['gameId']] = (offset, end - offset)
+            offset = end
+        return index
+
+    def game(self, gameID):
+        '''
+        Params:
+            gameID: String representing the game id of the game.
+        Returns:
+            List of the game's recorded play by play actions & dictionary containing the game's recorded boxscore.
+        Raises:
+            KeyError: If the game was not recorded.
+        '''
+        offset, length = self.index[gameID]
+        game = json.loads(self._games[offset:offset + length])
+        return game['actions'], game['boxscore']
@@ -0,0 +1,131 @@
+from functools import lru_cache
+import gzip
+import json
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.module_loading import import_string
+
+# Brotli compression is used if the optional brotli package is installed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# The orjson package is used for serializing JSON if it is installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Content encodings in order of preference
+if brotli is not None:
+    ENCODINGS = ('br', 'gzip')
+else:
+    ENCODINGS = ('gzip',)
+
+# Compress the response bodies that are shared between requests ahead of time, with every supported encoding
+PRECOMPRESS_RESPONSES = getattr(settings, 'NBA_PRECOMPRESS_RESPONSES', True)
+
+
+def _json_dumps(data):
+    '''
+    Returns: Bytes containing the given data serialized as compact JSON by the standard library.
+    '''
+    return json.dumps(data, separators=(',', ':')).encode()
+
+
+# Available JSON serializers, each taking the data & returning bytes, keyed by name
+JSON_ENCODERS = {'json': _json_dumps}
+if orjson is not None:
+    JSON_ENCODERS['orjson'] = orjson.dumps
+
+
+def get_json_encoder(name=None):
+    '''
+    Returns the JSON serializer selected by the NBA_JSON_ENCODER setting.
+    Params:
+        name: Name of one of the JSON_ENCODERS, or the dotted path of a function taking the data &
+            returning bytes. Defaults to 'orjson' if it is installed, otherwise 'json'.
+    Returns:
+        Function serializing the given data into bytes containing JSON.
+    '''
+    if name is None:
+        name = 'orjson' if orjson is not None else 'json'
+    if name in JSON_ENCODERS:
+        return JSON_ENCODERS[name]
+    if name == 'orjson':
+        raise ImproperlyConfigured("The orjson JSON encoder requires the orjson package.")
+    return import_string(name)
+
+
+# Serializer of the JSON response bodies
+dumps = get_json_encoder(getattr(settings, 'NBA_JSON_ENCODER', None))
+
+
+def encode_body(body):
+    '''
+    Compresses the given response body with each of the supported content encodings, unless
+    precompression is disabled.
+    Params:
+        body: Bytes representing the uncompressed response body.
+    Returns:
+        Dictionary containing the body keyed by content encoding, with the uncompressed
+        body keyed by 'identity'.
+    '''
+    bodies = {'identity': body}
+    if PRECOMPRESS_RESPONSES:
+        bodies['gzip'] = gzip.compress(body, mtime=0)
+        if brotli is not None:
+            bodies['br'] = brotli.compress(body)
+    return bodies
+
+
+@lru_cache(maxsize=256)
+def preferred_encoding(accepted):
+    '''
+    Params:
+        accepted: String containing a request's Accept-Encoding header.
+    Returns:
+        The supported content encoding with the highest quality value, preferring encodings listed first
+        in ENCODINGS, or None if none is accepted. Encodings with a quality value of 0 are refused.
+        The results are memoized, since clients send the same few headers.
+    '''
+    qualities = {}
+    for coding in accepted.split(','):
+        name, *params = (part.strip() for part in coding.split(';'))
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name:
+            qualities[name.lower()] = quality
+    best = max(ENCODINGS, key=lambda encoding: qualities.get(encoding, qualities.get('*', 0.0)))
+    return best if qualities.get(best, qualities.get('*', 0.0)) > 0 else None
+
+
+def encoded_response(request, bodies, content_type='application/json'):
+    '''
+    Creates a response using the body whose content encoding is preferred by the given request.
+    Params:
+        request: Instance representing the HTTP request that is being responded to.
+        bodies: Dictionary containing the response body keyed by content encoding, as returned by encode_body.
+        content_type: String representing the content type of the response body.
+    Returns:
+        HTTP response containing the encoded body.
+    '''
+    encoding = preferred_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    if encoding not in bodies:
+        encoding = None
+    response = HttpResponse(
+        bodies[encoding or 'identity'], content_type=content_type)
+    if encoding is not None:
+        response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
@@ -1,104 +1,896 @@
-from random import randint
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import lru_cache
+import asyncio
 import datetime
-from .utils import get_data
+import hashlib
+import json
+import threading
+import time
+import uuid
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.template.loader import render_to_string
 
-from .models import HiddenGamePreferences, Team
+from . import datasources, responses, store, teams
+from .cache import TTLCache
 
-from nba_api.live.nba.endpoints import scoreboard as scoreboard_live, boxscore as boxscore_live, playbyplay as playbyplay_live
-from nba_api.stats.endpoints import scoreboard as scoreboard_stats
+from .models import ArchivedGame, HiddenGamePreferences, Team
 
 GAMES_UPDATE_INTERVAL = 60000
 GAME_UPDATE_INTERVAL = 30000
 
-# Choose to simulate games using pickled data
-SIMULATE = False
-SIMULATE_PROGRESS = False
+# Number of milliseconds between polls suggested to clients during crunch time, i.e. the final
+# CRUNCH_TIME_SECONDS of the fourth period & any overtime
+CRUNCH_TIME_UPDATE_INTERVAL = getattr(
+    settings, 'NBA_CRUNCH_TIME_UPDATE_INTERVAL', 10000)
+CRUNCH_TIME_SECONDS = getattr(settings, 'NBA_CRUNCH_TIME_SECONDS', 300)
+# Maximum number of milliseconds between polls suggested to clients before tip-off
+PREGAME_MAX_UPDATE_INTERVAL = getattr(
+    settings, 'NBA_PREGAME_MAX_UPDATE_INTERVAL', 15 * 60000)
 
-# If simulate is chosen, obtain the data from the pickled files
-if SIMULATE:
-    month = 2
-    day = 15
-    year = 2022
-    time_slot = 10
+# Version of the compact scoreboard schema returned to clients, incremented whenever its fields change
+SCOREBOARD_SCHEMA_VERSION = 2
+# Fields of each team included in the compact scoreboard schema
+SCOREBOARD_TEAM_FIELDS = ('teamName', 'teamTricode',
+                          'score', 'timeoutsRemaining', 'inBonus')
 
-    data_sim = get_data(month, day, year, time_slot)
-    games_sim = data_sim['scoreboard_live'].games.get_dict()
-    pbps_sim = data_sim['playbyplays_stats']
+# Number of seconds the live scoreboard is shared between requests before it is fetched again
+SCOREBOARD_CACHE_TTL = getattr(settings, 'NBA_SCOREBOARD_CACHE_TTL', 5)
 
-    if SIMULATE_PROGRESS:
-        for game in games_sim:
-            game['gameStatus'] = 1
-            game['period'] = 1
-            game['gameClockTime'] = datetime.timedelta(
-                days=0, minutes=12, seconds=0)
+# Share the live scoreboard & game data between the workers of a deployment through the snapshot
+# store (see store.get_store). Whenever a shared snapshot is outdated, a single worker queries the
+# NBA API & publishes a new version, which every worker then reads instead of querying the NBA API.
+SHARED_SNAPSHOTS = getattr(settings, 'NBA_SHARED_SNAPSHOTS', False)
+# Number of seconds a worker may take to refresh a shared snapshot before another worker takes over
+SHARED_REFRESH_TIMEOUT = getattr(settings, 'NBA_SHARED_REFRESH_TIMEOUT', 15)
+
+
+def _scoreboard_ttl(scoreboard):
+    '''
+    Returns: Number of seconds for which the given scoreboard snapshot is shared between requests,
+        until it is SCOREBOARD_CACHE_TTL seconds old, but at least one second.
+    '''
+    return max(SCOREBOARD_CACHE_TTL - (time.time() - scoreboard['updated']), 1)
+
+
+# Process-wide cache of the live scoreboard
+scoreboard_cache = TTLCache(_scoreboard_ttl)
+
+# Maximum number of client snapshot tokens whose response bodies are remembered by each scoreboard snapshot
+SCOREBOARD_MAX_ENCODED_TOKENS = getattr(
+    settings, 'NBA_SCOREBOARD_MAX_ENCODED_TOKENS', 256)
+
+# Versions of the games of the scoreboard snapshots built by this process (see _version_games)
+scoreboard_versions = {'epoch': uuid.uuid4().hex[:8],
+                       'sequence': 0, 'games': {}}
+scoreboard_versions_lock = threading.Lock()
+
+# Number of seconds the detailed data of an unfinished game is shared between requests.
+# The data of finished games no longer changes, and is kept until it is evicted.
+GAME_DATA_CACHE_TTL = getattr(settings, 'NBA_GAME_DATA_CACHE_TTL', 10)
+# Approximate maximum number of bytes used by the cached detailed game data
+GAME_DATA_CACHE_MAX_BYTES = getattr(
+    settings, 'NBA_GAME_DATA_CACHE_MAX_BYTES', 64 * 1024 * 1024)
+
+# Number of seconds previously served boxscores are kept, so that clients polling for
+# changes only receive the boxscore fields that changed since their last update
+BOXSCORE_HISTORY_TTL = getattr(settings, 'NBA_BOXSCORE_HISTORY_TTL', 300)
+BOXSCORE_HISTORY_MAX_BYTES = getattr(
+    settings, 'NBA_BOXSCORE_HISTORY_MAX_BYTES', 16 * 1024 * 1024)
+
+# Number of seconds to wait for each boxscore of a scheduled date before the game is displayed
+# using the summary data from the scoreboard instead
+SCHEDULE_BOXSCORE_TIMEOUT = getattr(
+    settings, 'NBA_SCHEDULE_BOXSCORE_TIMEOUT', 5)
+# Number of seconds to wait for the stats scoreboard of a scheduled date, which is required to display
+# the date, unlike its boxscores
+SCHEDULE_SCOREBOARD_TIMEOUT = getattr(
+    settings, 'NBA_SCHEDULE_SCOREBOARD_TIMEOUT', 30)
+# Maximum number of boxscores queried concurrently by this process
+SCHEDULE_MAX_WORKERS = getattr(settings, 'NBA_SCHEDULE_MAX_WORKERS', 8)
+
+# Thread pool used for querying the boxscores of scheduled dates
+schedule_executor = ThreadPoolExecutor(
+    max_workers=SCHEDULE_MAX_WORKERS, thread_name_prefix='nba-schedule')
+
+# Number of dates whose games have all finished, whose schedules & rendered pages are kept by each process
+FINAL_SCHEDULE_CACHE_MAX_ENTRIES = getattr(
+    settings, 'NBA_FINAL_SCHEDULE_CACHE_MAX_ENTRIES', 64)
+# Number of seconds browsers & shared caches may reuse the schedule page of a date whose games have all finished
+FINAL_SCHEDULE_MAX_AGE = getattr(
+    settings, 'NBA_FINAL_SCHEDULE_MAX_AGE', 365 * 24 * 60 * 60)
+
+# Number of seconds after which a schedule published by the slate warmer (see warm_schedule) is no longer used
+SCHEDULE_SNAPSHOT_MAX_AGE = getattr(
+    settings, 'NBA_SCHEDULE_SNAPSHOT_MAX_AGE', 15 * 60)
+
+# Process-wide cache of the schedules of dates whose games have all finished, keyed by date.
+# Their games no longer change, so that the schedules never expire & are only evicted.
+final_schedules = TTLCache(None, max_size=FINAL_SCHEDULE_CACHE_MAX_ENTRIES,
+                           sizeof=lambda schedule: 1)
+
+# Number of seconds the hidden game preferences of a user are cached by each process. Changes
+# are visible immediately to the session that made them, and to other sessions after this time.
+PREFERENCES_CACHE_TTL = getattr(settings, 'NBA_PREFERENCES_CACHE_TTL', 300)
+PREFERENCES_CACHE_MAX_ENTRIES = getattr(
+    settings, 'NBA_PREFERENCES_CACHE_MAX_ENTRIES', 10000)
+# Session key storing a token that identifies the latest preferences change made by the session
+PREFERENCES_REVISION_SESSION_KEY = 'hidden_game_preferences_revision'
+
+# Process-wide cache of the users' hidden game preferences, keyed by user id
+preferences_cache = TTLCache(PREFERENCES_CACHE_TTL, max_size=PREFERENCES_CACHE_MAX_ENTRIES,
+                             sizeof=lambda entry: 1)
+
+# Read live data from the snapshots written by the ingest_live management command
+# instead of querying the NBA API while handling requests
+LIVE_INGESTION = getattr(settings, 'NBA_LIVE_INGESTION', False)
+# Number of seconds after which a live snapshot is considered outdated, e.g. because
+# the ingestion command has stopped, causing the NBA API to be queried directly again
+SNAPSHOT_MAX_AGE = getattr(settings, 'NBA_SNAPSHOT_MAX_AGE', 120)
+
+# Maximum number of distinct game clocks whose standardized form is memoized
+GAME_CLOCK_CACHE_SIZE = getattr(settings, 'NBA_GAME_CLOCK_CACHE_SIZE', 8192)
+
+# Source of the NBA data, either the NBA API or a replay of recorded data (see datasources.get_data_source)
+data_source = datasources.get_data_source()
+# Asynchronous interface to the same data, used by the asynchronous views
+async_data_source = datasources.get_async_data_source(data_source)
+
+
+def get_staleness(name, *args):
+    '''
+    Determines whether the data of the given data source call is currently served from the last good
+    data, because the NBA API is failing (see datasources.ResilientDataSource).
+    Params:
+        name: String representing the name of the data source method, e.g. 'scoreboard'.
+        args: Arguments of the call, e.g. the game id.
+    Returns:
+        Number of seconds since the data served was retrieved if it is stale, otherwise None.
+    '''
+    staleness = getattr(data_source, 'staleness', None)
+    return staleness(name, *args) if staleness is not None else None
 
 
 def update_games():
     '''
     Queries the NBA API for data about any current NBA games using the nba_api module, 
-    and returns the data as a list of dictionaries.
+    and returns the data as a list of dictionaries. The scoreboard is shared between 
+    requests for SCOREBOARD_CACHE_TTL seconds, and concurrent requests that miss the
+    cache wait for a single upstream query.
     Returns: List containing dictionaries representing any current NBA games.
     '''
-    if SIMULATE:
-        games = games_sim
-        if SIMULATE_PROGRESS:
-            simulate_progress(games_sim)
-    else:
-        games = scoreboard_live.ScoreBoard().games.get_dict()
-    return games
-
-
-def simulate_progress(games_sim):
-    '''
-    Used for simulating the given list of games. 
-    Mostly deprecated since pickled data has been stored.
-    '''
-    for game in games_sim:
-        if game['gameStatus'] == 1:
-            if randint(0, 100) <= 5:
-                game['gameStatus'] = 2
-        elif game['gameStatus'] == 2:
-            game['awayTeam']['score'] += randint(0, 4)
-            game['homeTeam']['score'] += randint(0, 4)
-            game['gameClockTime'] -= datetime.timedelta(minutes=randint(
-                0, 1), seconds=randint(1, 59), microseconds=randint(0, 99))
-            minutes, seconds, microseconds = game['gameClockTime'].seconds//60, game['gameClockTime'].seconds % 60, int(
-                game['gameClockTime'].seconds % 60 % 60)
-            game['gameStatusText'] = f"Q{game['period']}<br>{(str(minutes)+':') if minutes > 0 else ''}{seconds:02g}{('.'+str(microseconds)) if minutes <= 0 else ''}"
-            if game['gameClockTime'] <= datetime.timedelta(minutes=0, seconds=0):
-                if game['period'] >= 4 and game['homeTeam']['score'] != game['awayTeam']['score']:
-                    game['gameStatus'] = 3
-                    game['gameStatusText'] = 'Final'
-                else:
-                    game['gameClockTime'] = datetime.timedelta(
-                        minutes=12, seconds=0)
-                    game['period'] += 1
+    # Copy each game so that per-request keys (e.g. 'hidden') do not leak into the shared cache
+    return [dict(game) for game in get_scoreboard()['games']]
+
+
+def get_scoreboard():
+    '''
+    Returns the current scoreboard snapshot, which is shared between requests and must not be modified.
+    Returns: Dictionary containing the list of current games under 'games', and a string under
+        'version' that changes whenever the games change.
+    '''
+    return scoreboard_cache.get_or_fetch('scoreboard', _fetch_scoreboard_snapshot)
+
+
+async def aget_scoreboard():
+    '''
+    Asynchronous version of get_scoreboard, querying the NBA API without blocking the event loop.
+    The snapshot is shared with synchronous callers.
+    Returns: Scoreboard snapshot, as returned by get_scoreboard.
+    '''
+    async def fetch():
+        if SHARED_SNAPSHOTS:
+            return _load_shared_scoreboard(await _aread_shared(
+                'shared_scoreboard', lambda snapshot: SCOREBOARD_CACHE_TTL, _arefresh_shared_scoreboard))
+        return _build_scoreboard(await _aread_scoreboard())
+    return await scoreboard_cache.aget_or_fetch('scoreboard', fetch)
+
+
+def _fetch_scoreboard_snapshot():
+    '''
+    Returns: New scoreboard snapshot, read from the shared snapshot store if shared snapshots are enabled.
+    '''
+    if SHARED_SNAPSHOTS:
+        return _load_shared_scoreboard(_read_shared(
+            'shared_scoreboard', lambda snapshot: SCOREBOARD_CACHE_TTL, _refresh_shared_scoreboard))
+    return _build_scoreboard(_read_scoreboard())
+
+
+def _build_scoreboard(games, version=None, versions=None, updated=None):
+    '''
+    Creates a scoreboard snapshot from the given games.
+    Params:
+        games: List containing dictionaries representing the current games.
+        version: Optional string identifying the games, computed from the games if not given.
+        versions: Optional dictionary containing the versions of the games, as returned by _version_games.
+            If not given, the games are versioned against the previous snapshot built by this process.
+        updated: Optional time at which the games were retrieved, defaulting to the current time.
+    Returns:
+        Dictionary containing the given games, their version, the games projected onto the
+        compact scoreboard schema, the snapshot's sequence number & the version of each game,
+        and the table used for deciding which scores are hidden.
+    '''
+    if version is None:
+        version = _games_version(json.dumps(games, sort_keys=True, default=str).encode())
+    compact_games = [project_game(game) for game in games]
+    if versions is None:
+        with scoreboard_versions_lock:
+            versions = _version_games(games, compact_games, scoreboard_versions)
+            scoreboard_versions.update(versions)
+    return {
+        'games': games,
+        'version': version,
+        'updated': time.time() if updated is None else updated,
+        'compact_games': compact_games,
+        'epoch': versions['epoch'],
+        'sequence': versions['sequence'],
+        'game_versions': tuple(versions['games'][game['gameId']][1] for game in games),
+        'hide_table': _hide_table(games),
+        'next_poll': next_poll_interval(games, GAMES_UPDATE_INTERVAL),
+        'overlays': {},
+        'etags': {},
+        'encoded': {},
+        'encoded_tokens': {},
+    }
+
+
+def _games_version(body):
+    '''
+    Returns: String identifying the games serialized in the given bytes.
+    '''
+    return hashlib.sha1(body).hexdigest()[:16]
+
+
+def _version_games(games, compact_games, previous):
+    '''
+    Assigns the next sequence number to a new scoreboard snapshot, and determines the version of each
+    of its games, which is the sequence number of the snapshot in which the game's displayed data, clock
+    or period last changed. The epoch identifies the sequence, so that clients' snapshot tokens are only
+    compared against snapshots of the same sequence.
+    Params:
+        games: List containing dictionaries representing the snapshot's games.
+        compact_games: List containing the games projected onto the compact scoreboard schema.
+        previous: Dictionary containing the versions of the previous snapshot, or None if there is none.
+    Returns:
+        Dictionary containing the epoch under 'epoch', the snapshot's sequence number under 'sequence', and
+        a list containing the fingerprint & version of each game keyed by game id under 'games'.
+    '''
+    if previous is None:
+        previous = {'epoch': uuid.uuid4().hex[:8], 'sequence': 0, 'games': {}}
+    sequence = previous['sequence'] + 1
+    current = {}
+    for game, compact_game in zip(games, compact_games):
+        fingerprint = hashlib.sha1(json.dumps(
+            [compact_game, game.get('period'), game.get('gameClock')], sort_keys=True).encode()).hexdigest()[:16]
+        entry = previous['games'].get(game['gameId'])
+        # Games that are no longer on the scoreboard are forgotten
+        current[game['gameId']] = entry if entry is not None and entry[0] == fingerprint else [
+            fingerprint, sequence]
+    return {'epoch': previous['epoch'], 'sequence': sequence, 'games': current}
+
+
+def _read_shared(name, ttl, refresh):
+    '''
+    Reads the shared snapshot with the given name, refreshing it once it is outdated. Only one worker
+    refreshes a snapshot at a time, while the other workers keep reading the previous version, or wait
+    for the first version to be published.
+    Params:
+        name: String identifying the snapshot.
+        ttl: Callable taking a snapshot & returning the number of seconds after which it is outdated,
+            or None if it never becomes outdated.
+        refresh: Callable taking the outdated snapshot, or None, that publishes & returns a new version.
+    Returns:
+        The current store.Snapshot.
+    '''
+    deadline = time.monotonic() + SHARED_REFRESH_TIMEOUT
+    while True:
+        snapshot = store.snapshot_store.read(name)
+        if not _is_outdated(snapshot, ttl):
+            return snapshot
+        if store.snapshot_store.acquire(name, SHARED_REFRESH_TIMEOUT):
+            try:
+                # Another worker may have published a new version in the meantime
+                snapshot = store.snapshot_store.read(name)
+                return snapshot if not _is_outdated(snapshot, ttl) else refresh(snapshot)
+            finally:
+                store.snapshot_store.release(name)
+        if snapshot is not None:
+            # Another worker is refreshing the snapshot
+            return snapshot
+        if time.monotonic() >= deadline:
+            return refresh(None)
+        time.sleep(0.05)
+
+
+async def _aread_shared(name, ttl, refresh):
+    '''
+    Asynchronous version of _read_shared, where the given refresh function is a coroutine function.
+    Returns: The current store.Snapshot.
+    '''
+    deadline = time.monotonic() + SHARED_REFRESH_TIMEOUT
+    while True:
+        snapshot = await asyncio.to_thread(store.snapshot_store.read, name)
+        if not _is_outdated(snapshot, ttl):
+            return snapshot
+        if await asyncio.to_thread(store.snapshot_store.acquire, name, SHARED_REFRESH_TIMEOUT):
+            try:
+                snapshot = await asyncio.to_thread(store.snapshot_store.read, name)
+                return snapshot if not _is_outdated(snapshot, ttl) else await refresh(snapshot)
+            finally:
+                await asyncio.to_thread(store.snapshot_store.release, name)
+        if snapshot is not None:
+            return snapshot
+        if time.monotonic() >= deadline:
+            return await refresh(None)
+        await asyncio.sleep(0.05)
+
+
+def _is_outdated(snapshot, ttl):
+    '''
+    Returns: True if the given shared snapshot is missing or outdated according to the given ttl function.
+    '''
+    if snapshot is None:
+        return True
+    max_age = ttl(snapshot)
+    return max_age is not None and snapshot.age() > max_age
+
+
+def _refresh_shared_scoreboard(previous):
+    '''
+    Queries the live scoreboard & publishes it as a new version of the shared scoreboard.
+    Params:
+        previous: The outdated shared scoreboard, or None.
+    Returns:
+        The published store.Snapshot.
+    '''
+    return _publish_shared_scoreboard(_read_scoreboard(), previous)
+
+
+async def _arefresh_shared_scoreboard(previous):
+    '''
+    Asynchronous version of _refresh_shared_scoreboard.
+    Returns: The published store.Snapshot.
+    '''
+    return await asyncio.to_thread(_publish_shared_scoreboard, await _aread_scoreboard(), previous)
+
+
+def _publish_shared_scoreboard(games, previous):
+    '''
+    Publishes the given games as a new version of the shared scoreboard. The games are versioned against
+    the previous version, so that the snapshot tokens of clients are valid for every worker.
+    Params:
+        games: List containing dictionaries representing the current games.
+        previous: The outdated shared scoreboard, or None.
+    Returns:
+        The published store.Snapshot.
+    '''
+    body = json.dumps(games, sort_keys=True, default=str).encode()
+    versions = _version_games(games, [project_game(game) for game in games],
+                              previous.metadata['versions'] if previous is not None else None)
+    return store.snapshot_store.publish(
+        'shared_scoreboard', body, {'version': _games_version(body), 'versions': versions})
+
+
+# Version of the shared scoreboard last read by this process & the scoreboard snapshot built from it
+shared_scoreboard = {'latest': (None, None)}
+
+
+def _load_shared_scoreboard(snapshot):
+    '''
+    Creates a scoreboard snapshot from the given version of the shared scoreboard, reusing the scoreboard
+    snapshot built from the same version, and its encoded responses.
+    Returns: Scoreboard snapshot, as returned by get_scoreboard.
+    '''
+    version, scoreboard = shared_scoreboard['latest']
+    if version != snapshot.version:
+        scoreboard = _build_scoreboard(
+            snapshot.data, snapshot.metadata['version'], snapshot.metadata['versions'], snapshot.updated)
+        shared_scoreboard['latest'] = (snapshot.version, scoreboard)
+    return scoreboard
+
+
+def project_game(game):
+    '''
+    Projects the given game onto the compact scoreboard schema, which only contains the fields
+    that are displayed by the scoreboard.
+    Params:
+        game: Dictionary representing a game of the live scoreboard.
+    Returns:
+        Dictionary containing the displayed fields of the game.
+    '''
+    compact_game = {
+        'gameId': game['gameId'],
+        'gameStatus': game['gameStatus'],
+        'gameStatusText': game['gameStatusText'],
+    }
+    for team in ('homeTeam', 'awayTeam'):
+        compact_game[team] = {field: game[team][field]
+                              for field in SCOREBOARD_TEAM_FIELDS if field in game[team]}
+    return compact_game
+
+
+def encode_scoreboard(scoreboard, hidden, since=None):
+    '''
+    Returns the serialized & compressed compact scoreboard, which is computed once per scoreboard
+    snapshot for each combination of hidden games & changed games. If the client's last snapshot
+    token is given, only the games that changed since that snapshot are included. Once computed,
+    the body for a given token's sequence number is retrieved with a single dictionary lookup, so
+    that polling clients, e.g. every anonymous client, share the same bytes.
+    Params:
+        scoreboard: Scoreboard snapshot returned by get_scoreboard.
+        hidden: Tuple of booleans indicating whether the score of each game is hidden.
+        since: Optional snapshot token of the last response received by the client.
+    Returns:
+        Dictionary containing the JSON response body keyed by content encoding. The body contains
+        the snapshot's token under 'snapshot', the ids of all of the snapshot's games in order under
+        'gameIds', the included games under 'games', and whether every game is included under 'full'.
+    '''
+    sequence = _since_sequence(scoreboard, hidden, since)
+    bodies = scoreboard['encoded_tokens'].get((hidden, sequence))
+    if bodies is not None:
+        return bodies
+    changed = _changed_games(scoreboard, sequence)
+    bodies = scoreboard['encoded'].get((hidden, changed))
+    if bodies is None:
+        indices = range(len(scoreboard['compact_games'])) if changed is None else changed
+        games = [dict(scoreboard['compact_games'][index], hidden=hidden[index])
+                 for index in indices]
+        body = responses.dumps({
+            'schema': SCOREBOARD_SCHEMA_VERSION,
+            'snapshot': snapshot_token(scoreboard, hidden),
+            'full': changed is None,
+            'gameIds': [game['gameId'] for game in scoreboard['compact_games']],
+            'games': games,
+        })
+        bodies = scoreboard['encoded'][(hidden, changed)] = responses.encode_body(body)
+    # Bodies are remembered by the validated sequence number, of which a limited number is kept
+    if len(scoreboard['encoded_tokens']) < SCOREBOARD_MAX_ENCODED_TOKENS:
+        scoreboard['encoded_tokens'][(hidden, sequence)] = bodies
+    return bodies
+
+
+def scoreboard_etag(scoreboard, hidden):
+    '''
+    Returns: Weak ETag identifying the response for the given scoreboard snapshot & hidden games, which is
+        computed once per snapshot for each combination of hidden games. The validator is weak, since the
+        response body may be compressed differently.
+    '''
+    etag = scoreboard['etags'].get(hidden)
+    if etag is None:
+        bits = ''.join('1' if game_hidden else '0' for game_hidden in hidden)
+        etag = scoreboard['etags'][hidden] = f'W/"{scoreboard["version"]}-{bits}"'
+    return etag
+
+
+def snapshot_token(scoreboard, hidden):
+    '''
+    Returns: String identifying the given scoreboard snapshot & hidden games, which clients send back
+        to receive only the games that changed since.
+    '''
+    bits = ''.join('1' if game_hidden else '0' for game_hidden in hidden)
+    return f"{scoreboard['epoch']}.{scoreboard['sequence']}.{bits}"
+
+
+def _since_sequence(scoreboard, hidden, since):
+    '''
+    Validates the given snapshot token of a client against the given scoreboard snapshot.
+    Returns: Sequence number of the snapshot identified by the token, or None if every game must be sent,
+        because no token was given, or the token is malformed, from another process or other hidden games.
+    '''
+    try:
+        epoch, token_sequence, bits = since.split('.')
+        sequence = int(token_sequence)
+    except (AttributeError, ValueError):
+        return None
+    # Only canonical sequence numbers that were issued are accepted, e.g. not ' 7', '+7', '07' or '-1'
+    if str(sequence) != token_sequence or not 0 <= sequence <= scoreboard['sequence']:
+        return None
+    if epoch != scoreboard['epoch'] or bits != snapshot_token(scoreboard, hidden).rsplit('.', 1)[1]:
+        return None
+    return sequence
+
+
+def _changed_games(scoreboard, sequence):
+    '''
+    Determines which games of the given scoreboard snapshot changed since the snapshot with the given
+    sequence number.
+    Returns: Tuple containing the indices of the changed games, or None if every game must be sent.
+    '''
+    if sequence is None:
+        return None
+    return tuple(index for index, version in enumerate(scoreboard['game_versions']) if version > sequence)
+
+
+def _read_scoreboard():
+    '''
+    Reads the live scoreboard from the ingested snapshot if live ingestion is enabled
+    and the snapshot is up to date, otherwise queries the NBA API.
+    Returns: List containing dictionaries representing any current NBA games.
+    '''
+    if LIVE_INGESTION:
+        games = store.read_snapshot('scoreboard', max_age=SNAPSHOT_MAX_AGE)
+        if games is not None:
+            return games
+    return _fetch_scoreboard()
+
+
+async def _aread_scoreboard():
+    '''
+    Asynchronous version of _read_scoreboard.
+    Returns: List containing dictionaries representing any current NBA games.
+    '''
+    if LIVE_INGESTION:
+        games = await asyncio.to_thread(store.read_snapshot, 'scoreboard', max_age=SNAPSHOT_MAX_AGE)
+        if games is not None:
+            return games
+    return await async_data_source.scoreboard()
+
+
+def _fetch_scoreboard():
+    '''
+    Queries the data source for the live scoreboard.
+    Returns: List containing dictionaries representing any current NBA games.
+    '''
+    return data_source.scoreboard()
 
 
 def get_game_data(gameID):
     '''
     Queries the NBA API for detailed data corresponding to the specific given game id using the nba_api module, 
-    and returns the data sets as dictionaries.
+    and returns the data sets as dictionaries. If live ingestion is enabled, the ingested snapshot is used instead.
     Returns: Dictionaries containing information about the specific NBA games.
     '''
-    if not SIMULATE:
-        # Obtain current data
-        actions = playbyplay_live.PlayByPlay(gameID).get_dict()[
-            'game']['actions']
-        boxscore = boxscore_live.BoxScore(gameID).get_dict()['game']
+    actions, boxscore, version = _get_versioned_game_data(gameID)
+    return actions, boxscore
+
+
+def get_game_changes(gameID, since=None, version=None):
+    '''
+    Returns the detailed data of the given game that has changed since a client's last update.
+    Params:
+        gameID: String representing the game id of the game for which the data should be retrieved.
+        since: Optional integer representing the actionNumber of the last action known to the client.
+        version: Optional string representing the version of the boxscore known to the client.
+    Returns:
+        Dictionary containing the actions following the given actionNumber & the current boxscore
+        version. Contains either the boxscore fields that changed since the given version under
+        'boxscore_changes', or the complete boxscore under 'boxscore' if the version is unknown.
+    '''
+    return game_changes(gameID, _get_versioned_game_data(gameID), since, version)
+
+
+async def aget_game_snapshot(gameID):
+    '''
+    Returns the current detailed data of the given game. A response derives its version, changes & poll
+    interval from a single snapshot (see game_version, game_changes & game_poll_interval), so that they
+    always belong to the same data, even if the data is refreshed while the response is created.
+    Params:
+        gameID: String representing the game id of the game.
+    Returns:
+        Tuple containing the game's actions, boxscore & boxscore version, which are shared between requests
+        and must not be modified.
+    '''
+    return await _aget_versioned_game_data(gameID)
+
+
+def game_changes(gameID, game_data, since, version):
+    '''
+    Returns: Dictionary containing the parts of the given versioned game data that changed since
+        the given actionNumber & boxscore version, as returned by get_game_changes.
+    '''
+    actions, boxscore, current_version = game_data
+    changes = {'version': current_version}
+
+    # Actions are ordered by their actionNumber
+    if since is not None:
+        actions = actions[bisect_right(
+            actions, since, key=lambda action: action['actionNumber']):]
+    changes['actions'] = actions
+
+    previous_boxscore = boxscore_history.get(
+        (gameID, version)) if version is not None else None
+    if previous_boxscore is None:
+        changes['boxscore'] = boxscore
+    elif version == current_version:
+        changes['boxscore_changes'] = {}
+    else:
+        changes['boxscore_changes'] = diff_values(previous_boxscore, boxscore)
+    return changes
+
+
+def get_game_version(gameID):
+    '''
+    Returns the current version of the detailed data of the given game.
+    Params:
+        gameID: String representing the game id of the game.
+    Returns:
+        Tuple containing the boxscore version & the actionNumber of the last action, or None if
+        the game has no actions.
+    '''
+    return game_version(_get_versioned_game_data(gameID))
+
+
+def game_version(game_data):
+    '''
+    Returns: Tuple containing the boxscore version & the actionNumber of the last action of the given versioned game data.
+    '''
+    actions, boxscore, version = game_data
+    return version, actions[-1]['actionNumber'] if actions else None
+
+
+def get_game_poll_interval(gameID):
+    '''
+    Returns: Number of milliseconds after which clients should next poll the detailed data of the given
+        game, or None if the game has finished, as returned by next_poll_interval.
+    '''
+    return game_poll_interval(_get_versioned_game_data(gameID))
+
+
+def game_poll_interval(game_data):
+    '''
+    Returns: Number of milliseconds after which clients should next poll the given detailed game data, or
+        None if the game has finished, as returned by next_poll_interval.
+    '''
+    return next_poll_interval([game_data[1]], GAME_UPDATE_INTERVAL)
+
+
+def next_poll_interval(games, interval, now=None):
+    '''
+    Suggests when clients should next poll for changes of the given games, based on their states.
+    Clients poll quickly while any game is in crunch time, at the given interval while games are in
+    progress, less often the longer it is until the next tip-off, and stop once every game has finished.
+    Params:
+        games: List of dictionaries representing games of the live scoreboard, or boxscores.
+        interval: Number of milliseconds between polls while games are in progress.
+        now: Optional aware datetime representing the current time.
+    Returns:
+        Number of milliseconds until the next poll, or None if every game has finished.
+    '''
+    if games and all(game['gameStatus'] == 3 for game in games):
+        return None
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    intervals = []
+    for game in games:
+        if game['gameStatus'] == 2:
+            intervals.append(min(CRUNCH_TIME_UPDATE_INTERVAL, interval)
+                             if _is_crunch_time(game) else interval)
+        elif game['gameStatus'] == 1:
+            intervals.append(_pregame_interval(game, interval, now))
+    # Games may be added to an empty scoreboard at any time
+    return min(intervals, default=PREGAME_MAX_UPDATE_INTERVAL)
+
+
+def _is_crunch_time(game):
+    '''
+    Returns: True if the given game in progress is in overtime, or in the final CRUNCH_TIME_SECONDS of
+        the fourth period, otherwise False.
+    '''
+    period = game.get('period') or 0
+    if period > 4:
+        return True
+    seconds = game_clock_seconds(game.get('gameClock') or '')
+    return period == 4 and seconds is not None and seconds <= CRUNCH_TIME_SECONDS
+
+
+def _pregame_interval(game, interval, now):
+    '''
+    Returns: Number of milliseconds until the tip-off of the given game that has not started, limited
+        to between the given interval & PREGAME_MAX_UPDATE_INTERVAL.
+    '''
+    try:
+        tip_off = datetime.datetime.fromisoformat(game['gameTimeUTC'].replace('Z', '+00:00'))
+        until_tip_off = (tip_off - now).total_seconds() * 1000
+    except (KeyError, TypeError, ValueError):
+        return interval
+    return int(min(max(until_tip_off, interval), PREGAME_MAX_UPDATE_INTERVAL))
+
+
+def game_clock_seconds(gameClock):
+    '''
+    Converts the given game clock into the number of seconds remaining in the period.
+    Params:
+        gameClock: String containing the game clock, either as presented by the NBA API, e.g.
+            'PT05M10.00S', or as standardized by parse_game_clock, e.g. '5:10'.
+    Returns:
+        Float representing the number of seconds remaining, or None if the clock is empty or malformed.
+    '''
+    minutes, _, seconds = gameClock.replace('PT', '').replace('M', ':').replace('S', '').rpartition(':')
+    try:
+        return int(minutes or 0) * 60 + float(seconds)
+    except ValueError:
+        return None
+
+
+def diff_values(old, new):
+    '''
+    Compares the given values, and returns the parts of the new value that differ from the old value.
+    Dictionaries, and lists of equal length, are compared recursively, with changed list items keyed
+    by their index. Keys that were removed from a dictionary are not reported.
+    Params:
+        old: Value previously known to the client.
+        new: Current value.
+    Returns:
+        Dictionary containing the changed parts of the new value, or the new value itself if the 
+        values can not be compared recursively.
+    '''
+    if isinstance(old, dict) and isinstance(new, dict):
+        pairs = ((key, old.get(key), value) for key, value in new.items())
+    elif isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        pairs = ((str(index), old_value, new_value)
+                 for index, (old_value, new_value) in enumerate(zip(old, new)))
     else:
-        # Obtain pickled data
-        actions = [pbp for pbp in data_sim['playbyplays_live'] if pbp.get_dict(
-        )['game']['gameId'] == gameID][0].get_dict()['game']['actions']
-        boxscore = [box for box in data_sim['boxscore_live'] if box.get_dict(
-        )['game']['gameId'] == gameID][0].get_dict()['game']
+        return new
+    return {key: diff_values(old_value, new_value) for key, old_value, new_value in pairs if old_value != new_value}
 
+
+def _get_versioned_game_data(gameID):
+    '''
+    Returns: Normalized list of game actions, boxscore dictionary & boxscore version for the given game id,
+        read from the shared snapshot store if shared snapshots are enabled.
+    '''
+    def fetch():
+        if SHARED_SNAPSHOTS:
+            return _load_shared_game_data(gameID, _read_shared(
+                f'shared_game_{gameID}', _shared_game_data_ttl,
+                lambda previous: _publish_shared_game_data(gameID, *_read_game_data(gameID))))
+        return _version_game_data(gameID, *_read_game_data(gameID))
+    return game_data_cache.get_or_fetch(gameID, fetch)
+
+
+async def _aget_versioned_game_data(gameID):
+    '''
+    Asynchronous version of _get_versioned_game_data, sharing the cached data with synchronous callers.
+    Returns: Normalized list of game actions, boxscore dictionary & boxscore version for the given game id.
+    '''
+    async def refresh(previous):
+        return await asyncio.to_thread(_publish_shared_game_data, gameID, *await _aread_game_data(gameID))
+
+    async def fetch():
+        if SHARED_SNAPSHOTS:
+            return _load_shared_game_data(gameID, await _aread_shared(
+                f'shared_game_{gameID}', _shared_game_data_ttl, refresh))
+        return _version_game_data(gameID, *await _aread_game_data(gameID))
+    return await game_data_cache.aget_or_fetch(gameID, fetch)
+
+
+def _version_game_data(gameID, actions, boxscore):
+    '''
+    Computes the version of the given boxscore, and records the boxscore so that later changes can be
+    computed against it.
+    Returns: Normalized list of game actions, boxscore dictionary & boxscore version.
+    '''
+    version = _boxscore_version(boxscore)
+    boxscore_history.set((gameID, version), boxscore)
+    return actions, boxscore, version
+
+
+def _boxscore_version(boxscore):
+    '''
+    Returns: String identifying the given boxscore.
+    '''
+    return hashlib.sha1(json.dumps(boxscore, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _publish_shared_game_data(gameID, actions, boxscore):
+    '''
+    Publishes the given normalized game data as a new version of the game's shared snapshot.
+    Returns: The published store.Snapshot.
+    '''
+    body = json.dumps({'actions': actions, 'boxscore': boxscore}).encode()
+    return store.snapshot_store.publish(f'shared_game_{gameID}', body, {
+        'version': _boxscore_version(boxscore),
+        'final': boxscore['gameStatus'] == 3,
+    })
+
+
+def _shared_game_data_ttl(snapshot):
+    '''
+    Returns: Number of seconds after which the given shared game snapshot is outdated, or None if the
+        game is finished.
+    '''
+    return None if snapshot.metadata['final'] else GAME_DATA_CACHE_TTL
+
+
+def _load_shared_game_data(gameID, snapshot):
+    '''
+    Returns: Normalized list of game actions, boxscore dictionary & boxscore version contained in the given
+        shared game snapshot, recording the boxscore so that later changes can be computed against it.
+    '''
+    data = snapshot.data
+    boxscore_history.set((gameID, snapshot.metadata['version']), data['boxscore'])
+    return data['actions'], data['boxscore'], snapshot.metadata['version']
+
+
+def _read_game_data(gameID):
+    '''
+    Reads the detailed data of the given game from the ingested snapshots if live ingestion
+    is enabled and a current snapshot exists, otherwise queries the NBA API.
+    Params:
+        gameID: String representing the game id of the game for which the data should be retrieved.
+    Returns:
+        Normalized list of game actions & boxscore dictionary.
+    '''
+    if LIVE_INGESTION:
+        snapshot = _read_game_snapshot(gameID)
+        if snapshot is not None:
+            return snapshot['actions'], snapshot['boxscore']
+    return fetch_game_data(gameID)
+
+
+async def _aread_game_data(gameID):
+    '''
+    Asynchronous version of _read_game_data.
+    Returns: Normalized list of game actions & boxscore dictionary.
+    '''
+    if LIVE_INGESTION:
+        snapshot = await asyncio.to_thread(_read_game_snapshot, gameID)
+        if snapshot is not None:
+            return snapshot['actions'], snapshot['boxscore']
+    return normalize_game_data(*await async_data_source.game_data(gameID))
+
+
+def _read_game_snapshot(gameID):
+    '''
+    Returns: Dictionary containing the ingested actions & boxscore of the given game, or None if no
+        current snapshot exists.
+    '''
+    # Live snapshots may become outdated, final snapshots never change
+    return store.read_snapshot(
+        f'game_{gameID}', max_age=SNAPSHOT_MAX_AGE) or store.read_snapshot(f'final_{gameID}')
+
+
+def _game_data_ttl(game_data):
+    '''
+    Returns: Number of seconds for which the given game data should be cached, or None if the game is finished.
+    '''
+    return None if game_data[1]['gameStatus'] == 3 else GAME_DATA_CACHE_TTL
+
+
+def _game_data_size(game_data):
+    '''
+    Returns: Approximate number of bytes used by the given game data.
+    '''
+    return len(json.dumps(game_data))
+
+
+# Process-wide cache of the normalized detailed data of each game, keyed by game id
+game_data_cache = TTLCache(_game_data_ttl, max_size=GAME_DATA_CACHE_MAX_BYTES,
+                           sizeof=_game_data_size)
+
+# Previously served boxscores, keyed by game id & boxscore version
+boxscore_history = TTLCache(BOXSCORE_HISTORY_TTL, max_size=BOXSCORE_HISTORY_MAX_BYTES,
+                            sizeof=lambda boxscore: len(json.dumps(boxscore)))
+
+
+def fetch_game_data(gameID):
+    '''
+    Queries the data source for the play by play & boxscore data corresponding to the given game id.
+    Params:
+        gameID: String representing the game id of the game for which the data should be retrieved.
+    Returns:
+        Normalized list of game actions & boxscore dictionary.
+    '''
+    return normalize_game_data(*data_source.game_data(gameID))
+
+
+def normalize_game_data(actions, boxscore):
+    '''
+    Standardizes the given play by play actions & boxscore for displaying. The given data is not
+    modified, since it may be shared by the data source.
+    Params:
+        actions: List of dictionaries representing the actions of a game.
+        boxscore: Dictionary containing the boxscore data of the same game.
+    Returns:
+        Normalized list of game actions & boxscore dictionary.
+    '''
     # Format boxscore data
-    boxscore = parse_boxscore(boxscore)
+    boxscore = parse_boxscore(dict(boxscore))
 
     # Format actions data
-    for action in actions:
-        action['clock'] = parse_game_clock(action['clock'])
+    actions = [dict(action, clock=parse_game_clock(action['clock']))
+               for action in actions]
 
     return actions, boxscore
 
@@ -106,68 +898,433 @@ def get_game_data(gameID):
 def get_scheduled_games(date):
     '''
     Queries the NBA API for data corresponding to the given date's games using the nba_api module, 
-    and returns the data as a list of dictionaries.
+    and returns the data as a list of dictionaries. Once every game of a date has finished, the
+    games are archived, and later requests for that date are served from the archive.
+    Returns: List of dictionaries containing information about the NBA games from the given date.
+    '''
+    return _get_scheduled_games(date)[0]
+
+
+async def aget_scheduled_games(date):
+    '''
+    Asynchronous version of get_scheduled_games, querying the boxscores of the date's games concurrently
+    on the event loop.
     Returns: List of dictionaries containing information about the NBA games from the given date.
     '''
+    return (await _aget_scheduled_games(date))[0]
+
+
+def _get_scheduled_games(date):
+    '''
+    Retrieves the given date's games from the archive, from the schedule published by the slate warmer,
+    or otherwise from the NBA API, archiving them if they have all finished.
+    Returns: List of dictionaries containing information about the games, and a boolean indicating
+        whether every game has finished & was retrieved completely.
+    '''
+    games = _get_archived_games(date)
+    if games:
+        return games, True
+    games = store.read_snapshot(f'schedule_{date}', max_age=SCHEDULE_SNAPSHOT_MAX_AGE)
+    if games is not None:
+        return games, False
+
+    games, rows, complete = _fetch_scheduled_games(date)
+    final = _is_archivable(games, complete)
+    if final:
+        archive_games(date, games, rows)
+    return games, final
+
+
+async def _aget_scheduled_games(date):
+    '''
+    Asynchronous version of _get_scheduled_games.
+    Returns: List of games & whether they have all finished, as returned by _get_scheduled_games.
+    '''
+    games = await sync_to_async(_get_archived_games)(date)
+    if games:
+        return games, True
+    games = await asyncio.to_thread(store.read_snapshot, f'schedule_{date}', max_age=SCHEDULE_SNAPSHOT_MAX_AGE)
+    if games is not None:
+        return games, False
+
+    games, rows, complete = await _afetch_scheduled_games(date)
+    final = _is_archivable(games, complete)
+    if final:
+        await sync_to_async(archive_games)(date, games, rows)
+    return games, final
+
+
+def warm_schedule(date):
+    '''
+    Queries the NBA API for the given date's games & their boxscores ahead of the date's first request.
+    Games that have all finished are archived, while the other schedules are published to the snapshot
+    store, from which every worker serves them for SCHEDULE_SNAPSHOT_MAX_AGE seconds.
+    Params:
+        date: Date or string representing the date whose schedule should be prefetched.
+    Returns:
+        Dictionary containing the date's schedule, as returned by get_schedule.
+    '''
+    date = str(date)
+    if final_schedules.get(date) is None and not _get_archived_games(date):
+        games, rows, complete = _fetch_scheduled_games(date)
+        if _is_archivable(games, complete):
+            archive_games(date, games, rows)
+        else:
+            store.write_snapshot(f'schedule_{date}', games)
+    return get_schedule(date)
+
+
+def get_schedule(date):
+    '''
+    Returns the schedule of the given date. The schedules of dates whose games have all finished no
+    longer change, and are kept by this process together with their rendered fragments & pages, so
+    that later requests for those dates neither query the database nor render templates.
+    Params:
+        date: Date or string representing the date of the schedule.
+    Returns:
+        Dictionary containing the date's games under 'games', whether they have all finished under
+        'final', and a version identifying the games under 'version'.
+    '''
+    date = str(date)
+    schedule = final_schedules.get(date)
+    if schedule is None:
+        schedule = _build_schedule(date, *_get_scheduled_games(date))
+    return schedule
+
+
+async def aget_schedule(date):
+    '''
+    Asynchronous version of get_schedule.
+    Returns: Dictionary containing the date's schedule, as returned by get_schedule.
+    '''
+    date = str(date)
+    schedule = final_schedules.get(date)
+    if schedule is None:
+        schedule = _build_schedule(date, *(await _aget_scheduled_games(date)))
+    return schedule
+
+
+def _build_schedule(date, games, final):
+    '''
+    Builds the schedule of the given date, which is kept by this process if its games have all finished.
+    Params:
+        date: String representing the date of the schedule.
+        games: List of dictionaries containing information about the date's games.
+        final: Boolean indicating whether every game has finished & was retrieved completely.
+    Returns:
+        Dictionary containing the schedule, as returned by get_schedule. Hidden overlays (see hidden_overlay),
+        rendered fragments & pages are added to it once they have been computed.
+    '''
+    schedule = {
+        'date': date,
+        'games': games,
+        'final': final,
+        'version': hashlib.sha1(json.dumps(games, sort_keys=True, default=str).encode()).hexdigest()[:16],
+        'hide_table': _hide_table(games),
+        'overlays': {},
+        'fragments': {},
+        'pages': {},
+    }
+    if final:
+        final_schedules.set(date, schedule)
+    return schedule
+
+
+def schedule_fragment(schedule, hidden):
+    '''
+    Renders the games of the given schedule, which is done once per combination of hidden games if
+    the schedule's games have all finished.
+    Params:
+        schedule: Schedule returned by get_schedule.
+        hidden: Tuple of booleans indicating whether the score of each game is hidden.
+    Returns:
+        Safe string containing the HTML fragment displaying the games.
+    '''
+    fragment = schedule['fragments'].get(hidden)
+    if fragment is None:
+        games = [dict(game, hidden=game_hidden)
+                 for game, game_hidden in zip(schedule['games'], hidden)]
+        fragment = render_to_string('NBA/schedule_games.html', {'games': games})
+        if schedule['final']:
+            schedule['fragments'][hidden] = fragment
+    return fragment
+
+
+def schedule_etag(schedule, hidden):
+    '''
+    Returns: Quoted string identifying the games of the given schedule & which of their scores are hidden.
+    '''
+    bits = ''.join('1' if game_hidden else '0' for game_hidden in hidden)
+    return f'"{schedule["version"]}-{bits}"'
+
+
+def _get_archived_games(date):
+    '''
+    Returns: List of dictionaries containing information about the archived games of the given date,
+        which is empty if the date has not been archived.
+    '''
+    return [archived_game.data for archived_game in ArchivedGame.objects.filter(date=date).order_by('sequence')]
+
+
+def _is_archivable(games, complete):
+    '''
+    Returns: True if the given games of a date were retrieved completely & have all finished, otherwise False.
+    '''
+    return complete and bool(games) and all(game['gameStatus'] == 3 for game in games)
+
+
+def archive_games(date, games, rows):
+    '''
+    Stores the given finished games of the given date.
+    Params:
+        date: Date or string representing the date of the games.
+        games: List of dictionaries containing information about the games.
+        rows: List of the stats scoreboard's game header rows corresponding to the games.
+    '''
+    # Conflicts occur if another request has archived the same games concurrently
+    ArchivedGame.objects.bulk_create([
+        ArchivedGame(game_id=game['gameId'], date=date,
+                     sequence=row[1], data=game)
+        for game, row in zip(games, rows)], ignore_conflicts=True)
+
+
+def _fetch_scheduled_games(date):
+    '''
+    Queries the NBA API for data corresponding to the given date's games using the nba_api module.
+    The boxscores of started games are queried concurrently, and any boxscore that can not be 
+    retrieved within SCHEDULE_BOXSCORE_TIMEOUT seconds is replaced by the summary data from the scoreboard.
+    Params:
+        date: Date or string representing the date for which the games should be retrieved.
+    Returns:
+        List of dictionaries containing information about the NBA games from the given date, the
+        list of the corresponding stats scoreboard rows, and a boolean indicating whether the
+        boxscore of every started game was retrieved.
+    '''
     # Obtain data
-    game_data = scoreboard_stats.Scoreboard(
-        game_date=str(date)).get_dict()['resultSets'][0]
+    result_sets = {result_set['name']: result_set for result_set in data_source.stats_scoreboard(
+        date, timeout=SCHEDULE_SCOREBOARD_TIMEOUT)['resultSets']}
+
+    # Query the boxscores of started games concurrently
+    futures = {row[2]: schedule_executor.submit(_fetch_boxscore, row[2])
+               for row in result_sets['GameHeader']['rowSet'] if row[3] >= 2}
+    wait(futures.values(), timeout=SCHEDULE_BOXSCORE_TIMEOUT)
+    boxscores = {gameID: future.result() if future.done() and future.exception() is None else None
+                 for gameID, future in futures.items()}
+    return _build_scheduled_games(result_sets, boxscores)
+
+
+async def _afetch_scheduled_games(date):
+    '''
+    Asynchronous version of _fetch_scheduled_games.
+    Returns: List of games, list of stats scoreboard rows & completeness, as returned by _fetch_scheduled_games.
+    '''
+    result_sets = {result_set['name']: result_set for result_set in (await async_data_source.stats_scoreboard(
+        date, timeout=SCHEDULE_SCOREBOARD_TIMEOUT))['resultSets']}
 
-    # Format data
+    # Query the boxscores of started games concurrently
+    tasks = {row[2]: asyncio.ensure_future(async_data_source.boxscore(row[2], timeout=SCHEDULE_BOXSCORE_TIMEOUT))
+             for row in result_sets['GameHeader']['rowSet'] if row[3] >= 2}
+    if tasks:
+        await asyncio.wait(tasks.values(), timeout=SCHEDULE_BOXSCORE_TIMEOUT)
+    boxscores = {}
+    for gameID, task in tasks.items():
+        if task.done() and not task.cancelled() and task.exception() is None:
+            boxscores[gameID] = task.result()
+        else:
+            task.cancel()
+            boxscores[gameID] = None
+    # Formatting may load the teams from the database
+    return await sync_to_async(_build_scheduled_games)(result_sets, boxscores)
+
+
+def _build_scheduled_games(result_sets, boxscores):
+    '''
+    Formats the games of the given stats scoreboard, using the boxscore of each game if available,
+    otherwise the summary data from the scoreboard.
+    Params:
+        result_sets: Dictionary containing the stats scoreboard's result sets keyed by name.
+        boxscores: Dictionary containing the boxscore of each started game keyed by game id, or None
+            if the game's boxscore could not be retrieved.
+    Returns:
+        List of dictionaries containing information about the games, the list of the corresponding
+        stats scoreboard rows, and a boolean indicating whether the boxscore of every started game was retrieved.
+    '''
+    game_data = result_sets['GameHeader']
     games_list = []
+    complete = True
     for row in game_data['rowSet']:
-        game = {}
-        game['gameId'] = row[2]
-        game['gameStatus'] = row[3]
-        if game['gameStatus'] < 2:
-            game['gameStatusText'] = row[4]
-            game.update(
-                homeTeam={'teamName': Team.objects.get(pk=row[6]).team_name})
-            game.update(
-                awayTeam={'teamName': Team.objects.get(pk=row[7]).team_name})
+        boxscore = boxscores.get(row[2])
+        if boxscore is not None:
+            game = boxscore
         else:
-            game = boxscore_live.BoxScore(game['gameId']).get_dict()['game']
+            complete = complete and row[2] not in boxscores
+            game = _parse_scoreboard_row(row, result_sets['LineScore'])
         games_list.append(game)
-    return games_list
+    return games_list, game_data['rowSet'], complete
+
+
+def _fetch_boxscore(gameID):
+    '''
+    Queries the data source for the boxscore of the given game id.
+    Returns: Dictionary containing the boxscore data of the game.
+    '''
+    return data_source.boxscore(gameID, timeout=SCHEDULE_BOXSCORE_TIMEOUT)
+
+
+def _parse_scoreboard_row(row, line_scores):
+    '''
+    Formats the given row of the stats scoreboard's game headers.
+    Params:
+        row: List containing the game header of a single game.
+        line_scores: Dictionary representing the stats scoreboard's line scores result set.
+    Returns:
+        Dictionary containing information about the game.
+    '''
+    game = {}
+    game['gameId'] = row[2]
+    game['gameStatus'] = row[3]
+    game['gameStatusText'] = row[4]
+    game.update(
+        homeTeam={'teamName': teams.get_team(row[6]).team_name})
+    game.update(
+        awayTeam={'teamName': teams.get_team(row[7]).team_name})
+    if game['gameStatus'] >= 2:
+        # Add the scores of started games, whose column is looked up by name, since its position
+        # differs between the stats scoreboard endpoints
+        headers = line_scores['headers']
+        game_id, team_id, pts = headers.index('GAME_ID'), headers.index('TEAM_ID'), headers.index('PTS')
+        points = {line[team_id]: line[pts] for line in line_scores['rowSet']
+                  if line[game_id] == game['gameId']}
+        game['homeTeam']['score'] = points.get(row[6], 0)
+        game['awayTeam']['score'] = points.get(row[7], 0)
+        game['period'] = row[9]
+    return game
 
 
 def update_team_models():
-    from nba_api.stats.static import teams
-    print(teams)
+    '''
+    Creates or updates the Team models using the static team data provided by the nba_api module.
+    Returns: Tuple containing the number of created teams & the number of updated teams.
+    '''
+    from nba_api.stats.static import teams as static_teams
+    team_models = [Team(team_id=team['id'], team_name=team['full_name'], nickname=team['nickname'],
+                        abbreviation=team['abbreviation']) for team in static_teams.get_teams()]
+    with transaction.atomic():
+        existing_ids = set(Team.objects.values_list('team_id', flat=True))
+        new_teams = [team for team in team_models if team.team_id not in existing_ids]
+        existing_teams = [team for team in team_models if team.team_id in existing_ids]
+        Team.objects.bulk_create(new_teams)
+        Team.objects.bulk_update(
+            existing_teams, ['team_name', 'nickname', 'abbreviation'])
+    # Bulk operations do not send the save signals
+    teams.refresh()
+    return len(new_teams), len(existing_teams)
+
+
+def get_preferences(request):
+    '''
+    Returns the hidden game preferences of the user that made the given request without querying the
+    database, unless the preferences are not cached by this process or were changed by the request's
+    session since they were cached.
+    Params:
+        request: Instance representing the HTTP request whose user's preferences should be retrieved.
+    Returns:
+        The user's HiddenGamePreferences, or None if the user is not logged in. The instance is shared
+        between requests, and must not be modified.
+    '''
+    if not request.user.is_authenticated:
+        return None
+    revision = request.session.get(PREFERENCES_REVISION_SESSION_KEY)
+    entry = preferences_cache.get(request.user.pk)
+    if entry is None or (revision is not None and entry[0] != revision):
+        entry = (revision, HiddenGamePreferences.objects.get(user=request.user))
+        preferences_cache.set(request.user.pk, entry)
+    return entry[1]
 
 
-def check_hide_games(games, user):
+def preferences_changed(request):
     '''
-    Used to hide the scores for the given games list, based on the criteria stored in the given user's account.
+    Records that the hidden game preferences of the request's user have changed, so that the
+    preferences cached by any process are no longer used for the request's session.
+    Params:
+        request: Instance representing the HTTP request that changed the preferences.
+    '''
+    request.session[PREFERENCES_REVISION_SESSION_KEY] = uuid.uuid4().hex
+    preferences_cache.invalidate(request.user.pk)
+
+
+def invalidate_preferences(sender, instance, **kwargs):
+    '''
+    Removes the given preferences from this process's cache.
+    Used as a receiver for the HiddenGamePreferences model's save & delete signals.
+    '''
+    preferences_cache.invalidate(instance.user_id)
+
+
+def check_hide_games(games, preferences):
+    '''
+    Used to hide the scores for the given games list, based on the given hidden game preferences.
+    The given games are not modified.
     Params: 
         games : List of dictionaries containing the information about the games that should be inspected.
-        user : User account that should be used to determine whether or not the scores should be hidden.
-    Returns:
-        Modified list of games dictionaries.
-    '''
-    # Check if user is logged in
-    if user.is_authenticated:
-        user_preferences = HiddenGamePreferences.objects.get(user=user)
-        # Check if user has decided to hide games
-        if user_preferences.hide_scores:
-            # Check each game against user's current hidden scores criteria
-            for game in games:
-                if game['gameStatus'] > 1:
-                    score_difference = abs(
-                        game['homeTeam']['score'] - game['awayTeam']['score'])
-                    if (game['period'] >= user_preferences.hide_after_period and score_difference <= user_preferences.max_score_difference):
-                        game['hidden'] = True
-                    else:
-                        game['hidden'] = False
-        else:
-            # Reset hidden game scores key in case user has decided to unhide games
-            for game in games:
-                game['hidden'] = False
+        preferences : HiddenGamePreferences used to determine whether or not the scores should be hidden,
+            or None if the user is not logged in.
+    Returns:
+        List of copies of the games dictionaries, each containing a 'hidden' key.
+    '''
+    hidden = _hide_overlay(_hide_table(games), preferences)
+    return [dict(game, hidden=game_hidden) for game, game_hidden in zip(games, hidden)]
+
+
+def hidden_overlay(scoreboard, preferences):
+    '''
+    Determines which scores of the given scoreboard snapshot are hidden based on the given hidden
+    game preferences. The result is computed once per snapshot for each distinct hidden scores
+    criteria, and shared by every user with the same criteria.
+    Params:
+        scoreboard: Scoreboard snapshot returned by get_scoreboard, or schedule returned by get_schedule.
+        preferences: HiddenGamePreferences used to determine whether or not the scores should be hidden,
+            or None if the user is not logged in.
+    Returns:
+        Tuple of booleans indicating whether the score of each of the snapshot's games is hidden.
+    '''
+    if preferences is None or not preferences.hide_scores:
+        key = None
     else:
-        # Reset hidden game scores key in case user has decided to unhide games
-        for game in games:
-            game['hidden'] = False
-    return games
+        key = (preferences.hide_after_period, preferences.max_score_difference)
+    overlay = scoreboard['overlays'].get(key)
+    if overlay is None:
+        overlay = scoreboard['overlays'][key] = _hide_overlay(
+            scoreboard['hide_table'], preferences)
+    return overlay
+
+
+def _hide_table(games):
+    '''
+    Returns: List of tuples containing the game status, period & score difference of each of the given games.
+    '''
+    return [(game['gameStatus'], game.get('period', 0),
+             abs(game['homeTeam']['score'] - game['awayTeam']['score']) if game['gameStatus'] > 1 else 0)
+            for game in games]
+
+
+def _hide_overlay(hide_table, preferences):
+    '''
+    Determines which scores are hidden by comparing the given hide table to the user's current hidden 
+    scores criteria.
+    Params:
+        hide_table: List of tuples returned by _hide_table.
+        preferences: HiddenGamePreferences, or None if the user is not logged in.
+    Returns:
+        Tuple of booleans indicating whether the score of each game is hidden.
+    '''
+    # Scores are only hidden if the user is logged in & has decided to hide games
+    if preferences is None or not preferences.hide_scores:
+        return (False,) * len(hide_table)
+    # Games that have not started have no scores to hide
+    return tuple(status > 1 and period >= preferences.hide_after_period
+                 and score_difference <= preferences.max_score_difference
+                 for status, period, score_difference in hide_table)
 
 
 def parse_boxscore(boxscore):
@@ -184,9 +1341,31 @@ def parse_boxscore(boxscore):
     return boxscore
 
 
+@lru_cache(maxsize=GAME_CLOCK_CACHE_SIZE)
 def parse_game_clock(gameClock):
     '''
-    Standardizes the given NBA game clock string.
+    Standardizes the given NBA game clock string. Clocks in the usual 'PT05M10.00S' format are
+    converted by slicing, and the results are memoized, since the same clocks are parsed for every
+    action on every poll. Any other clock is converted by _parse_game_clock, with identical output.
+    Params:
+        gameClock: String containing the game clock as presnted by the NBA API
+    Returns:
+        String containing the standardized game clock for displaying.
+    '''
+    if (len(gameClock) == 11 and gameClock.startswith('PT') and gameClock[4] == 'M'
+            and gameClock[7] == '.' and gameClock[10] == 'S'):
+        minutes, seconds, hundredths = gameClock[2:4], gameClock[5:7], gameClock[8:10]
+        digits = minutes + seconds + hundredths
+        if digits.isascii() and digits.isdigit():
+            if minutes != '00':
+                return f"{int(minutes)}:{seconds}"
+            return f"{int(seconds)}.{hundredths}"
+    return _parse_game_clock(gameClock)
+
+
+def _parse_game_clock(gameClock):
+    '''
+    Standardizes the given NBA game clock string in any format accepted by the NBA API.
     Params:
         gameClock: String containing the game clock as presnted by the NBA API
     Returns:
@@ -2,11 +2,58 @@
 const json_data = JSON.parse(document.getElementById('js_data').textContent);
 const gameId = json_data.gameId
 const update_interval = json_data.update_interval
+const stream_url = json_data.stream_url
 
-// Update data as soon as the data is loaded
-update()
-// Update data at regular intervals
-const game_update_interval = setInterval(update, update_interval);
+// State of the game known to this page, used to request only the data that has changed
+let boxscore = null
+let boxscore_version = null
+let last_action = null
+let last_period = 0
+// Validator of the last data received by polling, allowing unchanged data to be skipped
+let game_etag = null
+
+let game_update_timeout = null
+let game_stream = null
+
+// Receive changes as soon as they occur if the server provides an event stream,
+// otherwise update data at regular intervals
+if (window.EventSource) {
+    game_stream = new EventSource(stream_url)
+    game_stream.onmessage = (event) => update_game(JSON.parse(event.data))
+    game_stream.onerror = () => {
+        // Fall back to polling if the event stream is unavailable
+        if (game_stream.readyState == EventSource.CLOSED) {
+            game_stream = null
+            start_polling()
+        }
+    }
+} else {
+    start_polling()
+}
+
+/******************************************************************************
+ * Updates the data as soon as it is loaded, and then at the intervals 
+ * suggested by the server.
+ ******************************************************************************/
+function start_polling() {
+    update()
+}
+
+/******************************************************************************
+ * Schedules the next update after the interval suggested by the server in the
+ * given response, or after the default interval if no interval was suggested.
+ * No update is scheduled once the server indicates that the game has finished.
+ * @param {Response} response   Response to the most recent update request, or
+ *                              null if the request failed
+ ******************************************************************************/
+function schedule_update(response) {
+    clearTimeout(game_update_timeout)
+    const next_poll = response != null ? response.headers.get('X-Next-Poll') : null
+    if (next_poll == 'none') {
+        return
+    }
+    game_update_timeout = setTimeout(update, next_poll != null ? Number(next_poll) : update_interval)
+}
 
 
 /******************************************************************************
@@ -14,7 +61,28 @@ const game_update_interval = setInterval(update, update_interval);
  * allows the data to be displayed in nearly real time without page refreshes.
  ******************************************************************************/
 function update() {
-    fetch(`./update_game/${gameId}`).then(convert_to_json).then(update_game)
+    let url = `./update_game/${gameId}`
+    if (boxscore_version != null) {
+        url += `?since=${last_action != null ? last_action.actionNumber : 0}&version=${boxscore_version}`
+    }
+    const headers = game_etag != null ? {'If-None-Match': game_etag} : {}
+    fetch(url, {headers: headers, cache: 'no-store'}).then(response => {
+        schedule_update(response)
+        return receive_game_response(response)
+    }, () => schedule_update(null))
+}
+
+/******************************************************************************
+ * Displays the game data contained in the given response, unless the data has 
+ * not been modified since the previous update.
+ * @param {Response} response   Response to the most recent update request
+ ******************************************************************************/
+function receive_game_response(response) {
+    if (response.status == 304) {
+        return
+    }
+    game_etag = response.headers.get('ETag')
+    return convert_to_json(response).then(update_game)
 }
 
 
@@ -31,27 +99,38 @@ function convert_to_json(response) {
 /****************************************************************************
  * Displays the data in the given game dictionary that was obtained from the 
  * NBA Scores Web App. 
- * @param {JSON} game_dict  Dictionary containing a boxscore and actions
- *                          list for the game that is to be displayed
+ * @param {JSON} game_dict  Dictionary containing either a boxscore or the 
+ *                          changed boxscore fields, and the list of new 
+ *                          actions for the game that is to be displayed
  ***************************************************************************/
 function update_game(game_dict) {
-    // Get individual dictionaries from the game dictionary
-    let boxscore = game_dict['boxscore']
+    // Update the known boxscore, either completely or with the changed fields only
+    if ('boxscore' in game_dict) {
+        boxscore = game_dict['boxscore']
+    } else {
+        apply_changes(boxscore, game_dict['boxscore_changes'])
+    }
+    boxscore_version = game_dict['version']
     let actions = game_dict['actions']
 
     // Display data relevant to all games
     document.getElementById('game_status_display').textContent = boxscore['gameStatusText'];
     document.getElementById('game_display').innerHTML = generate_game_html(boxscore);
-    get_game_actions_html(actions)
+    append_game_actions_html(actions)
 
     if (boxscore.gameStatus < 3) {
         // Display data specfic to games that are not finished
         document.getElementById('period').textContent = `Period: ${boxscore.period}`;
         document.getElementById('game_clock').textContent = `Game Clock: ${boxscore.gameClock}`;
-        document.getElementById('last_action').textContent = `Last action: ${actions.at(-1).description}`;
+        if (last_action != null) {
+            document.getElementById('last_action').textContent = `Last action: ${last_action.description}`;
+        }
     } else {
         // If the game is finished, stop querying for new data to conserve resources
-        clearInterval(game_update_interval);
+        clearTimeout(game_update_timeout);
+        if (game_stream != null) {
+            game_stream.close()
+        }
     }
 }
 
@@ -105,21 +184,38 @@ function generate_game_html(boxscore) {
     `
 }
 
+/**************************************************************************************
+ * Applies the given changed fields to the given object. Nested objects are updated
+ * recursively, and changed array items are keyed by their index.
+ * @param {JSON} target     Object that is to be updated
+ * @param {JSON} changes    Object containing the fields that have changed
+ **************************************************************************************/
+function apply_changes(target, changes) {
+    for (const [key, value] of Object.entries(changes)) {
+        if (value !== null && typeof value == 'object' && !Array.isArray(value)
+            && target[key] !== null && typeof target[key] == 'object') {
+            apply_changes(target[key], value)
+        } else {
+            target[key] = value
+        }
+    }
+}
+
 /****************************************************************************************************
- * Displays the data from the given game actions list that was obtained from the NBA Scores Web App. 
+ * Appends the data from the given game actions list that was obtained from the NBA Scores Web App
+ * to the actions that are already displayed. 
  * @param {Promise<JSON>[]} actions  List of JSON objects each containing the information regarding an action
  *                          that occured during the game to be displayed.
  ****************************************************************************************************/
-function get_game_actions_html(actions) {
-    let period = 0
+function append_game_actions_html(actions) {
     let links_html = ''
     let actions_html = ''
 
     // Display each action
     actions.forEach(action => {
         // Create new heading & link for new periods
-        if (action.period != period) {
-            period = action.period;
+        if (action.period != last_period) {
+            let period = last_period = action.period;
 
             // Create & append link HTML
             const link = document.createElement("a")
@@ -140,9 +236,10 @@ function get_game_actions_html(actions) {
             p.textContent = `Clock: ${action.clock} | ${action.description} | Score: (${action.scoreAway} - ${action.scoreHome})`
             actions_html += p.outerHTML
         }
+        last_action = action
     });
 
-    // Display actions and links
-    document.getElementById('actions_display').innerHTML = actions_html;
-    document.getElementById('actions_links').innerHTML = links_html;
+    // Display new actions and links after the existing ones
+    document.getElementById('actions_display').insertAdjacentHTML('beforeend', actions_html);
+    document.getElementById('actions_links').insertAdjacentHTML('beforeend', links_html);
 }
\ No newline at end of file
@@ -3,18 +3,94 @@ const json_data = JSON.parse(document.getElementById('js_data').textContent);
 const gameStatus = json_data.gameStatus;
 const game_update_url = json_data.game_update_url;
 const update_interval = json_data.update_interval
+const stream_url = json_data.stream_url
 
-// Update data as soon as the data is loaded
-update()
-// Update data at regular intervals
-const games_update_interval = setInterval(update, update_interval)
+// Games received from the event stream, keyed by game id
+const streamed_games = new Map()
+// Games received by polling, keyed by game id
+const polled_games = new Map()
+// Validator of the last games received by polling, allowing unchanged games to be skipped
+let games_etag = null
+// Token of the last snapshot received by polling, allowing only the changed games to be received
+let games_snapshot = null
+// Timeout of the next scheduled update
+let games_update_timeout = null
+
+// Receive changes as soon as they occur if the server provides an event stream,
+// otherwise update data at regular intervals
+if (window.EventSource) {
+    const games_stream = new EventSource(stream_url)
+    games_stream.onmessage = receive_games
+    games_stream.onerror = () => {
+        // Fall back to polling if the event stream is unavailable
+        if (games_stream.readyState == EventSource.CLOSED) {
+            start_polling()
+        }
+    }
+} else {
+    start_polling()
+}
+
+/********************************************************************************
+ * Updates the data as soon as it is loaded, and then at the intervals suggested
+ * by the server.
+ ********************************************************************************/
+function start_polling() {
+    update()
+}
 
 /********************************************************************************
- * Fetches the JSON data for the current games from the NBA Scores web app. This 
- * allows the data to be displayed in nearly real time without page refreshes.
+ * Schedules the next update after the interval suggested by the server in the
+ * given response, or after the default interval if no interval was suggested.
+ * No update is scheduled once the server indicates that every game has finished.
+ * @param {Response} response   Response to the most recent update request, or
+ *                              null if the request failed
+ ********************************************************************************/
+function schedule_update(response) {
+    clearTimeout(games_update_timeout)
+    const next_poll = response != null ? response.headers.get('X-Next-Poll') : null
+    if (next_poll == 'none') {
+        return
+    }
+    games_update_timeout = setTimeout(update, next_poll != null ? Number(next_poll) : update_interval)
+}
+
+/********************************************************************************
+ * Displays the changed games received from the event stream together with the
+ * games that were received previously.
+ * @param {MessageEvent} event  Event whose data contains the changed games
+ ********************************************************************************/
+function receive_games(event) {
+    const changed = JSON.parse(event.data)['games']
+    changed.forEach(game => streamed_games.set(game.gameId, game))
+    display_games(Array.from(streamed_games.values()), new Set(changed.map(game => game.gameId)))
+}
+
+/********************************************************************************
+ * Fetches the JSON data for the current games from the NBA Scores web app, and
+ * schedules the next update. This allows the data to be displayed in nearly real
+ * time without page refreshes.
  ********************************************************************************/
 function update() {
-    fetch(game_update_url).then(convert_to_json).then(update_games)
+    const headers = games_etag != null ? {'If-None-Match': games_etag} : {}
+    const url = games_snapshot != null ? `${game_update_url}?since=${encodeURIComponent(games_snapshot)}` : game_update_url
+    fetch(url, {headers: headers, cache: 'no-store'}).then(response => {
+        schedule_update(response)
+        return receive_games_response(response)
+    }, () => schedule_update(null))
+}
+
+/********************************************************************************
+ * Displays the games contained in the given response, unless the games have not
+ * been modified since the previous update.
+ * @param {Response} response   Response to the most recent update request
+ ********************************************************************************/
+function receive_games_response(response) {
+    if (response.status == 304) {
+        return
+    }
+    games_etag = response.headers.get('ETag')
+    return convert_to_json(response).then(update_games)
 }
 
 
@@ -29,14 +105,33 @@ function convert_to_json(response) {
 }
 
 /**************************************************************************************
- * Displays the data in the given games dictionary that was obtained from the 
- * NBA Scores Web App. 
- * @param {JSON} game_dict  Dictionary containing a list of game data to be displayed.
- *                          list for the game that is to be displayed
+ * Merges the games in the given games dictionary that was obtained from the NBA Scores
+ * Web App into the games received previously, and displays them.
+ * @param {JSON} games_dict  Dictionary containing the snapshot token, the ids of every
+ *                           current game, and either every game or only the changed games.
  **************************************************************************************/
 function update_games(games_dict) {
-    // Get games list from the games dictionary
-    let games = games_dict['games'];
+    if (games_dict['full']) {
+        polled_games.clear()
+    }
+    games_dict['games'].forEach(game => polled_games.set(game.gameId, game))
+    // Forget games that are no longer current
+    const game_ids = new Set(games_dict['gameIds'])
+    Array.from(polled_games.keys()).filter(gameId => !game_ids.has(gameId)).forEach(gameId => polled_games.delete(gameId))
+    games_snapshot = games_dict['snapshot']
+
+    const changed = games_dict['full'] ? null : new Set(games_dict['games'].map(game => game.gameId))
+    display_games(games_dict['gameIds'].map(gameId => polled_games.get(gameId)), changed)
+}
+
+/**************************************************************************************
+ * Displays the given games, only replacing the elements of the games that changed.
+ * @param {Array} games     List of every current game, in display order.
+ * @param {Set} changed     Set containing the ids of the changed games, or null if
+ *                          every game should be redisplayed.
+ **************************************************************************************/
+function display_games(games, changed) {
+    const games_display = document.getElementById('games_display')
 
     // If gameStatus parsed from the HTML template is not 0
     if (gameStatus != 0) {
@@ -44,12 +139,8 @@ function update_games(games_dict) {
         games = games.filter((game) => game.gameStatus == gameStatus);
     }
 
-    let html = "";
-    // If games list is not empty, display the games
-    if (games.length != 0) {
-        html = games.map(get_game_html).join('');
-        // Otherwise display a message indicatiing that there are no games to display
-    } else {
+    // If games list is empty, display a message indicatiing that there are no games to display
+    if (games.length == 0) {
         let type = ""
         switch (gameStatus) {
             case 1:
@@ -62,9 +153,40 @@ function update_games(games_dict) {
                 type = "No finished games to display yet..."
                 break;
         }
-        html = `<h5>${type}</h5>`;
+        games_display.innerHTML = `<h5>${type}</h5>`;
+        return
     }
-    document.getElementById('games_display').innerHTML = html;
+
+    // Otherwise display the games, replacing the elements of changed games & keeping the others
+    games.forEach((game, index) => {
+        let element = document.getElementById(`game_${game.gameId}`)
+        if (element == null || changed == null || changed.has(game.gameId)) {
+            if (element != null) {
+                element.remove()
+            }
+            element = create_game_element(game)
+        }
+        if (games_display.children[index] !== element) {
+            games_display.insertBefore(element, games_display.children[index] || null)
+        }
+    })
+    // Remove games that are no longer displayed, and any previous message
+    while (games_display.children.length > games.length) {
+        games_display.lastElementChild.remove()
+    }
+}
+
+/***********************************************************************************************
+ * Creates the element representing the given game that is to be displayed.
+ * @param {JSON} game JSON object containing information about the game that is to be displayed
+ * @returns Element representing the game, identified by the game's id.
+ ***********************************************************************************************/
+function create_game_element(game) {
+    const template = document.createElement('template')
+    template.innerHTML = get_game_html(game).trim()
+    const element = template.content.firstElementChild
+    element.id = `game_${game.gameId}`
+    return element
 }
 
 /***********************************************************************************************
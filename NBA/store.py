@@ -0,0 +1,327 @@
+from functools import cached_property
+from pathlib import Path
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+# Backend in which the snapshots are stored, either 'file' (default) or 'redis'
+SNAPSHOT_STORE = getattr(settings, 'NBA_SNAPSHOT_STORE', 'file')
+# Directory in which the file backend stores the snapshots. Every worker of a host reads the same
+# files, which may be placed on a shared memory file system such as /dev/shm.
+SNAPSHOT_DIR = Path(getattr(settings, 'NBA_SNAPSHOT_DIR',
+                            settings.BASE_DIR / 'NBA' / 'snapshots'))
+# Server & key prefix used by the Redis backend, which requires the redis package
+SNAPSHOT_REDIS_URL = getattr(
+    settings, 'NBA_SNAPSHOT_REDIS_URL', 'redis://localhost:6379/0')
+SNAPSHOT_REDIS_PREFIX = getattr(
+    settings, 'NBA_SNAPSHOT_REDIS_PREFIX', 'nba:snapshot:')
+
+
+class Snapshot:
+    '''
+    Published version of a snapshot, consisting of its serialized data & metadata. Readers of the same
+    version share the serialized data, which is decoded at most once per process.
+    '''
+
+    def __init__(self, version, updated, metadata, body):
+        '''
+        Params:
+            version: Integer identifying the version, which increases with every publication.
+            updated: Time at which the version was published, in seconds since the epoch.
+            metadata: JSON serializable data published together with the serialized data.
+            body: Bytes containing the serialized JSON data.
+        '''
+        self.version = version
+        self.updated = updated
+        self.metadata = metadata
+        self.body = body
+
+    @cached_property
+    def data(self):
+        '''
+        Returns: The decoded data, which is shared by the readers of the snapshot & must not be modified.
+        '''
+        return json.loads(self.body)
+
+    def age(self):
+        '''
+        Returns: Number of seconds since the snapshot was published.
+        '''
+        return time.time() - self.updated
+
+    def encode(self):
+        '''
+        Returns: Bytes containing a JSON header line with the version, publication time & metadata, followed
+            by the serialized data.
+        '''
+        header = {'version': self.version, 'updated': self.updated, 'metadata': self.metadata}
+        return json.dumps(header).encode() + b'\n' + self.body
+
+    @classmethod
+    def decode(cls, payload):
+        '''
+        Returns: Snapshot contained in the given bytes, as returned by encode.
+        '''
+        header, _, body = payload.partition(b'\n')
+        header = json.loads(header)
+        return cls(header['version'], header['updated'], header['metadata'], body)
+
+
+def _new_snapshot(body, metadata):
+    '''
+    Returns: New version of a snapshot containing the given serialized data & metadata. Versions are
+        derived from the publication time, so that they increase across processes & hosts.
+    '''
+    return Snapshot(time.time_ns(), time.time(), metadata, body)
+
+
+class FileSnapshotStore:
+    '''
+    Snapshot store keeping each snapshot in a file of a directory shared by the workers of a host. A new
+    version is written to a temporary file which then replaces the previous version, so that readers
+    never observe a partially written snapshot. Each process keeps the snapshots it has read, and only
+    reads a file again once it has been replaced.
+    '''
+
+    def __init__(self, directory=SNAPSHOT_DIR):
+        '''
+        Params:
+            directory: Path of the directory containing the snapshots.
+        '''
+        self.directory = Path(directory)
+        self._snapshots = {}
+        self._lock = threading.Lock()
+
+    def _path(self, name, suffix='.snapshot'):
+        '''
+        Returns: Path of the file storing the snapshot with the given name.
+        '''
+        return self.directory / f"{name}{suffix}"
+
+    def publish(self, name, body, metadata=None):
+        '''
+        Publishes a new version of the snapshot with the given name.
+        Params:
+            name: String identifying the snapshot.
+            body: Bytes containing the serialized JSON data.
+            metadata: Optional JSON serializable data published together with the serialized data.
+        Returns:
+            The published Snapshot.
+        '''
+        snapshot = _new_snapshot(body, metadata)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix='.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(snapshot.encode())
+            os.replace(temp_path, self._path(name))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return snapshot
+
+    def read(self, name):
+        '''
+        Reads the latest version of the snapshot with the given name.
+        Params:
+            name: String identifying the snapshot.
+        Returns:
+            The latest Snapshot, or None if the snapshot has not been published.
+        '''
+        try:
+            with open(self._path(name), 'rb') as file:
+                stat = os.fstat(file.fileno())
+                identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+                with self._lock:
+                    cached = self._snapshots.get(name)
+                if cached is not None and cached[0] == identity:
+                    return cached[1]
+                snapshot = Snapshot.decode(file.read())
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            self._snapshots[name] = (identity, snapshot)
+        return snapshot
+
+    def exists(self, name):
+        '''
+        Returns: True if the snapshot with the given name has been published, otherwise False.
+        '''
+        return self._path(name).exists()
+
+    def acquire(self, name, timeout):
+        '''
+        Acquires the lease for refreshing the snapshot with the given name, unless another process holds it.
+        Params:
+            name: String identifying the snapshot.
+            timeout: Number of seconds after which the lease expires if it is not released.
+        Returns:
+            True if the lease was acquired, otherwise False.
+        '''
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(name, '.lease')
+        for _ in range(2):
+            try:
+                os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return True
+            except FileExistsError:
+                # Take over the lease of a process that failed to release it
+                try:
+                    if time.time() - os.stat(path).st_mtime < timeout:
+                        return False
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+        return False
+
+    def release(self, name):
+        '''
+        Releases the lease for refreshing the snapshot with the given name.
+        '''
+        try:
+            os.unlink(self._path(name, '.lease'))
+        except FileNotFoundError:
+            pass
+
+
+class RedisSnapshotStore:
+    '''
+    Snapshot store keeping each snapshot in a Redis-compatible server shared by every worker of a deployment.
+    A snapshot & its version are stored in two keys which are set atomically, so that each process only
+    retrieves a snapshot again once a new version has been published.
+    '''
+
+    def __init__(self, url=SNAPSHOT_REDIS_URL, prefix=SNAPSHOT_REDIS_PREFIX, client=None):
+        '''
+        Params:
+            url: String representing the URL of the Redis server.
+            prefix: String prepended to the keys of the snapshots.
+            client: Optional Redis client, created from the URL if not given.
+        '''
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise ImproperlyConfigured(
+                    "The redis snapshot store requires the redis package.") from None
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+        self._snapshots = {}
+        self._leases = {}
+        self._lock = threading.Lock()
+
+    def publish(self, name, body, metadata=None):
+        '''
+        Publishes a new version of the snapshot with the given name, as FileSnapshotStore.publish.
+        Returns: The published Snapshot.
+        '''
+        snapshot = _new_snapshot(body, metadata)
+        self.client.mset({self.prefix + name: snapshot.encode(),
+                          f"{self.prefix}{name}:version": snapshot.version})
+        return snapshot
+
+    def read(self, name):
+        '''
+        Reads the latest version of the snapshot with the given name, as FileSnapshotStore.read.
+        Returns: The latest Snapshot, or None if the snapshot has not been published.
+        '''
+        version = self.client.get(f"{self.prefix}{name}:version")
+        if version is None:
+            return None
+        with self._lock:
+            cached = self._snapshots.get(name)
+        if cached is not None and cached.version == int(version):
+            return cached
+        payload = self.client.get(self.prefix + name)
+        if payload is None:
+            return None
+        snapshot = Snapshot.decode(payload)
+        with self._lock:
+            self._snapshots[name] = snapshot
+        return snapshot
+
+    def exists(self, name):
+        '''
+        Returns: True if the snapshot with the given name has been published, otherwise False.
+        '''
+        return bool(self.client.exists(self.prefix + name))
+
+    def acquire(self, name, timeout):
+        '''
+        Acquires the lease for refreshing the snapshot with the given name, as FileSnapshotStore.acquire.
+        Returns: True if the lease was acquired, otherwise False.
+        '''
+        token = uuid.uuid4().hex
+        if not self.client.set(f"{self.prefix}{name}:lease", token, nx=True, px=int(timeout * 1000)):
+            return False
+        with self._lock:
+            self._leases[name] = token
+        return True
+
+    def release(self, name):
+        '''
+        Releases the lease for refreshing the snapshot with the given name, unless it has expired &
+        been acquired by another process.
+        '''
+        with self._lock:
+            token = self._leases.pop(name, None)
+        key = f"{self.prefix}{name}:lease"
+        if token is not None and self.client.get(key) == token.encode():
+            self.client.delete(key)
+
+
+def get_store():
+    '''
+    Creates the snapshot store selected by the NBA_SNAPSHOT_STORE setting, which is either 'file' (default),
+    storing the snapshots in NBA_SNAPSHOT_DIR, or 'redis', storing them in the server at NBA_SNAPSHOT_REDIS_URL.
+    Returns: Snapshot store shared by the workers.
+    '''
+    if SNAPSHOT_STORE == 'file':
+        return FileSnapshotStore()
+    elif SNAPSHOT_STORE == 'redis':
+        return RedisSnapshotStore()
+    raise ImproperlyConfigured(f"Unknown NBA snapshot store: {SNAPSHOT_STORE}")
+
+
+# Snapshot store used by this process
+snapshot_store = get_store()
+
+
+def write_snapshot(name, data):
+    '''
+    Stores the given data as a new version of the snapshot with the given name.
+    Params:
+        name: String identifying the snapshot.
+        data: JSON serializable data that should be stored.
+    '''
+    snapshot_store.publish(name, json.dumps(data).encode())
+
+
+def read_snapshot(name, max_age=None):
+    '''
+    Reads the snapshot with the given name.
+    Params:
+        name: String identifying the snapshot.
+        max_age: Optional number of seconds after which the snapshot is considered outdated.
+    Returns:
+        The stored data, which is shared by every reader & must not be modified, or None if the
+        snapshot does not exist or is outdated.
+    '''
+    snapshot = snapshot_store.read(name)
+    if snapshot is None or (max_age is not None and snapshot.age() > max_age):
+        return None
+    return snapshot.data
+
+
+def snapshot_exists(name):
+    '''
+    Returns: True if a snapshot with the given name has been stored, otherwise False.
+    '''
+    return snapshot_store.exists(name)
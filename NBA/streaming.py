@@ -0,0 +1,321 @@
+from http.cookies import SimpleCookie
+from importlib import import_module
+from functools import lru_cache
+import asyncio
+import json
+import logging
+import re
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.http import HttpRequest
+from django.urls import get_script_prefix, reverse
+
+from . import services
+
+logger = logging.getLogger(__name__)
+
+
+# Number of seconds between polls of the NBA services while clients are connected
+STREAM_POLL_INTERVAL = getattr(settings, 'NBA_STREAM_POLL_INTERVAL', 1)
+# Number of seconds after which a comment is sent to keep idle connections open
+STREAM_KEEPALIVE_INTERVAL = 15
+
+
+class Broadcaster:
+    '''
+    Polls a data source while at least one subscriber is connected, and publishes the
+    entries of the data that have changed since the previous poll to every subscriber.
+    '''
+
+    def __init__(self, fetch, fingerprint):
+        '''
+        Params:
+            fetch: Blocking callable returning a dictionary of the current data entries.
+            fingerprint: Callable returning the parts of an entry whose changes should be published.
+        '''
+        self.fetch = fetch
+        self.fingerprint = fingerprint
+        self.subscribers = set()
+        self.entries = {}
+        self._fingerprints = {}
+        self._task = None
+
+    def subscribe(self):
+        '''
+        Registers a new subscriber, starting to poll the data source if necessary.
+        The subscriber immediately receives every entry that is already known.
+        Returns: Queue receiving dictionaries of the changed entries.
+        '''
+        queue = asyncio.Queue()
+        if self.entries:
+            queue.put_nowait(dict(self.entries))
+        self.subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._poll())
+        return queue
+
+    def unsubscribe(self, queue):
+        '''
+        Removes the given subscriber. Polling stops once no subscribers remain.
+        Params:
+            queue: Queue that was returned when subscribing.
+        '''
+        self.subscribers.discard(queue)
+
+    async def _poll(self):
+        '''
+        Polls the data source until no subscribers remain, publishing any changed entries.
+        '''
+        self.entries = {}
+        self._fingerprints = {}
+        while self.subscribers:
+            try:
+                entries = await sync_to_async(self.fetch, thread_sensitive=False)()
+            except Exception:
+                entries = None
+            if entries is not None:
+                fingerprints = {key: self.fingerprint(entry)
+                                for key, entry in entries.items()}
+                changed = {key: entry for key, entry in entries.items()
+                           if self._fingerprints.get(key) != fingerprints[key]}
+                self.entries = entries
+                self._fingerprints = fingerprints
+                if changed:
+                    for queue in self.subscribers:
+                        queue.put_nowait(changed)
+            await asyncio.sleep(STREAM_POLL_INTERVAL)
+
+
+@lru_cache(maxsize=None)
+def get_stream_paths():
+    '''
+    Returns the paths of the streams, which are configured by the NBA app's urls so that they are
+    mounted below the same prefix as the app.
+    Returns:
+        Tuple containing the path of the scoreboard stream & the path prefix of the game streams,
+        relative to the application's root path.
+    '''
+    prefix = len(get_script_prefix())
+    return ('/' + reverse('NBA:stream_games')[prefix:],
+            '/' + reverse('NBA:stream_game', args=['0'])[prefix:-1])
+
+
+def _scoreboard_entries():
+    '''
+    Returns: Dictionary containing tuples of the current scoreboard snapshot & the index of a game
+        within the snapshot, keyed by game id, so that the hidden scores are computed per snapshot.
+    '''
+    scoreboard = services.get_scoreboard()
+    return {game['gameId']: (scoreboard, index) for index, game in enumerate(scoreboard['games'])}
+
+
+def _scoreboard_fingerprint(entry):
+    '''
+    Returns: Tuple containing the score, clock & status of the game of the given scoreboard entry.
+    '''
+    scoreboard, index = entry
+    game = scoreboard['games'][index]
+    return (game['gameStatus'], game['gameStatusText'], game['period'], game.get('gameClock'),
+            game['homeTeam']['score'], game['awayTeam']['score'])
+
+
+# Broadcaster of the live scoreboard, publishing the entries of changed games keyed by game id
+scoreboard_broadcaster = Broadcaster(_scoreboard_entries, _scoreboard_fingerprint)
+
+# Broadcasters of the detailed game data, keyed by game id
+game_broadcasters = {}
+
+
+def _get_game_broadcaster(gameId):
+    '''
+    Returns: The broadcaster of the detailed data of the given game, created if necessary.
+    '''
+    if gameId not in game_broadcasters:
+        game_broadcasters[gameId] = Broadcaster(
+            lambda: {gameId: services.get_game_version(gameId)}, lambda version: version)
+    return game_broadcasters[gameId]
+
+
+def _load_request(session_key):
+    '''
+    Returns: Request instance containing the session with the given key & the session's user.
+    '''
+    request = HttpRequest()
+    request.session = import_module(
+        settings.SESSION_ENGINE).SessionStore(session_key)
+    request.user = get_user(request)
+    return request
+
+
+async def _get_request(scope):
+    '''
+    Returns: Request instance containing the session & user associated with the session cookie 
+        of the given ASGI connection scope.
+    '''
+    cookies = SimpleCookie()
+    for name, value in scope['headers']:
+        if name == b'cookie':
+            cookies.load(value.decode('latin1'))
+    session = cookies.get(settings.SESSION_COOKIE_NAME)
+    return await sync_to_async(_load_request)(session.value if session else None)
+
+
+def _get_last_event_id(scope):
+    '''
+    Returns: String containing the id of the last event received by a reconnecting client, as sent in
+        the Last-Event-ID header of the given ASGI connection scope, or None if the header is missing.
+    '''
+    for name, value in scope['headers']:
+        if name == b'last-event-id':
+            return value.decode('latin1')
+    return None
+
+
+async def _stream(send, queue, get_message, event_id=None):
+    '''
+    Sends an event to the client for every change published to the given queue.
+    Params:
+        send: ASGI send callable of the connection.
+        queue: Queue of a broadcaster subscription.
+        get_message: Coroutine function taking the changed entries and returning the message
+            to send, or None if no message should be sent.
+        event_id: Optional callable returning the id of the message that was just sent, or None. The
+            id is sent back by the client's EventSource when it reconnects.
+    '''
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ],
+    })
+    while True:
+        try:
+            changed = await asyncio.wait_for(queue.get(), STREAM_KEEPALIVE_INTERVAL)
+        except asyncio.TimeoutError:
+            await send({'type': 'http.response.body', 'body': b': keepalive\n\n', 'more_body': True})
+            continue
+        try:
+            message = await get_message(changed)
+        except Exception:
+            # End the response, so that the client's EventSource reconnects
+            logger.exception("Failed to create a stream message")
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+            return
+        if message is not None:
+            body = f"data: {json.dumps(message)}\n\n"
+            last_id = event_id() if event_id is not None else None
+            if last_id is not None:
+                body = f"id: {last_id}\n" + body
+            body = body.encode()
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+
+
+async def _serve(receive, send, broadcaster, get_message, event_id=None):
+    '''
+    Streams the changes published by the given broadcaster until the client disconnects, or the
+    response is ended because a message could not be created.
+    '''
+    queue = broadcaster.subscribe()
+    sender = asyncio.create_task(_stream(send, queue, get_message, event_id))
+    disconnect = asyncio.create_task(_wait_for_disconnect(receive))
+    try:
+        await asyncio.wait((sender, disconnect), return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        broadcaster.unsubscribe(queue)
+        sender.cancel()
+        disconnect.cancel()
+    if sender.done() and not sender.cancelled():
+        # Raises any error that occurred while sending
+        sender.result()
+
+
+async def _wait_for_disconnect(receive):
+    '''
+    Returns once the client of the connection with the given ASGI receive callable has disconnected.
+    '''
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def stream_games(scope, receive, send):
+    '''
+    Streams the current games whose score, clock or status has changed, with the scores hidden
+    based on the criteria of the connected user. The hidden scores are shared by every connection
+    with the same criteria (see services.hidden_overlay).
+    '''
+    request = await _get_request(scope)
+
+    async def get_message(changed):
+        preferences = await sync_to_async(services.get_preferences)(request)
+        games = []
+        for scoreboard, index in changed.values():
+            hidden = services.hidden_overlay(scoreboard, preferences)
+            games.append(dict(services.project_game(scoreboard['games'][index]), hidden=hidden[index]))
+        return {
+            'schema': services.SCOREBOARD_SCHEMA_VERSION,
+            'games': games,
+        }
+
+    await _serve(receive, send, scoreboard_broadcaster, get_message)
+
+
+async def stream_game(scope, receive, send, gameId):
+    '''
+    Streams the detailed data of the given game whenever it changes. Each message contains only
+    the data that changed since the previous message, in the format returned by update_game, and
+    is identified by the actionNumber of the last action sent. Reconnecting clients resume after
+    that action, receiving the complete boxscore again but no action twice.
+    '''
+    cursor = {'since': None, 'version': None}
+    last_event_id = _get_last_event_id(scope)
+    if last_event_id is not None and last_event_id.isdigit():
+        cursor['since'] = int(last_event_id)
+
+    async def get_message(changed):
+        changes = await sync_to_async(services.get_game_changes, thread_sensitive=False)(
+            gameId, **cursor)
+        if cursor['version'] == changes['version'] and not changes['actions']:
+            return None
+        cursor['version'] = changes['version']
+        if changes['actions']:
+            cursor['since'] = changes['actions'][-1]['actionNumber']
+        return changes
+
+    broadcaster = _get_game_broadcaster(gameId)
+    try:
+        await _serve(receive, send, broadcaster, get_message,
+                     lambda: None if cursor['since'] is None else str(cursor['since']))
+    finally:
+        if not broadcaster.subscribers:
+            game_broadcasters.pop(gameId, None)
+
+
+def sse_application(django_application):
+    '''
+    Wraps the given Django ASGI application, serving the Server-Sent Events streams of the live
+    NBA data directly and passing every other connection on to Django.
+    Params:
+        django_application: ASGI application returned by get_asgi_application.
+    Returns:
+        ASGI application.
+    '''
+    async def application(scope, receive, send):
+        if scope['type'] == 'http':
+            # Paths are matched relative to the root path the application is mounted at
+            path, root_path = scope['path'], scope.get('root_path', '')
+            if root_path and path.startswith(root_path):
+                path = path[len(root_path):]
+            scoreboard_path, game_path = get_stream_paths()
+            if path == scoreboard_path:
+                return await stream_games(scope, receive, send)
+            match = re.fullmatch(re.escape(game_path) + r'([^/]+)', path)
+            if match:
+                return await stream_game(scope, receive, send, match.group(1))
+        return await django_application(scope, receive, send)
+
+    return application
@@ -0,0 +1,66 @@
+import threading
+
+from .models import Team
+
+# In-memory index of the Team models, loaded on first use & cleared whenever a team is saved
+_lock = threading.Lock()
+_teams_by_id = None
+_teams_by_abbreviation = None
+
+
+def _get_indexes():
+    '''
+    Returns the team indexes, loading every Team model with a single query if necessary.
+    Returns: Tuple of dictionaries containing the teams keyed by team id & by abbreviation.
+    '''
+    global _teams_by_id, _teams_by_abbreviation
+    with _lock:
+        if _teams_by_id is None:
+            teams = list(Team.objects.all())
+            _teams_by_id = {team.team_id: team for team in teams}
+            _teams_by_abbreviation = {
+                team.abbreviation: team for team in teams}
+        return _teams_by_id, _teams_by_abbreviation
+
+
+def get_team(team_id):
+    '''
+    Returns the team with the given team id without querying the database.
+    Params:
+        team_id: Integer representing the NBA team id.
+    Returns:
+        Team model with the given team id.
+    Raises:
+        Team.DoesNotExist if no team has the given team id.
+    '''
+    try:
+        return _get_indexes()[0][team_id]
+    except KeyError:
+        raise Team.DoesNotExist(f"Team with team id {team_id} does not exist.")
+
+
+def get_team_by_abbreviation(abbreviation):
+    '''
+    Returns the team with the given abbreviation without querying the database.
+    Params:
+        abbreviation: String representing the team's abbreviation, e.g. 'LAL'.
+    Returns:
+        Team model with the given abbreviation.
+    Raises:
+        Team.DoesNotExist if no team has the given abbreviation.
+    '''
+    try:
+        return _get_indexes()[1][abbreviation]
+    except KeyError:
+        raise Team.DoesNotExist(
+            f"Team with abbreviation {abbreviation} does not exist.")
+
+
+def refresh(**kwargs):
+    '''
+    Clears the team indexes so that they are reloaded on their next use.
+    Used as a receiver for the Team model's save & delete signals.
+    '''
+    global _teams_by_id, _teams_by_abbreviation
+    with _lock:
+        _teams_by_id = _teams_by_abbreviation = None
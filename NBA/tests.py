@@ -1,3 +1,1277 @@
-from django.test import TestCase
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import asyncio
+import copy
+import datetime
+import io
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from django.urls import reverse
+
+from . import recorder, responses, services, store, streaming, teams, upstream, warmer
+from .benchmarks import load_fixture, run_benchmarks
+from .cache import TTLCache
+from .datasources import (AsyncLiveDataSource, AsyncResilientDataSource, LiveDataSource, ReplayDataSource,
+                          ResilientDataSource, SyntheticDataSource, ThreadedAsyncDataSource, get_async_data_source)
+from .loadtest import percentile, run_load_test, use_data_source
+from .models import ArchivedGame, HiddenGamePreferences, Team
+
+
+class TTLCacheTests(SimpleTestCase):
+    '''
+    Tests of the process-local cache coalescing concurrent fetches.
+    '''
+
+    def test_single_flight(self):
+        cache = TTLCache(60)
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 'value'
+
+        results = []
+        fetcher = threading.Thread(target=lambda: results.append(cache.get_or_fetch('key', fetch)))
+        fetcher.start()
+        started.wait(5)
+        waiters = [threading.Thread(target=lambda: results.append(cache.get_or_fetch('key', fetch)))
+                   for _ in range(3)]
+        for waiter in waiters:
+            waiter.start()
+        release.set()
+        for thread in [fetcher, *waiters]:
+            thread.join(5)
+        self.assertEqual(results, ['value'] * 4)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_ttl(self):
+        cache = TTLCache(lambda value: value)
+        with mock.patch.object(time, 'monotonic', return_value=100):
+            cache.set('short', 1)
+            cache.set('long', 10)
+        with mock.patch.object(time, 'monotonic', return_value=105):
+            self.assertIsNone(cache.get('short'))
+            self.assertEqual(cache.get('long'), 10)
+            self.assertEqual(cache.get_or_fetch('short', lambda: 2), 2)
+
+    def test_game_data_ttl(self):
+        cache = services.game_data_cache
+        self.addCleanup(cache.invalidate)
+        live = ([], {'gameId': 'live', 'gameStatus': 2}, 'a')
+        final = ([], {'gameId': 'final', 'gameStatus': 3}, 'b')
+        with mock.patch.object(time, 'monotonic', return_value=100):
+            cache.get_or_fetch('live', lambda: live)
+            cache.get_or_fetch('final', lambda: final)
+        with mock.patch.object(time, 'monotonic', return_value=100 + services.GAME_DATA_CACHE_TTL - 0.1):
+            self.assertIs(cache.get('live'), live)
+        # Live games expire after GAME_DATA_CACHE_TTL seconds, while finished games never change
+        with mock.patch.object(time, 'monotonic', return_value=100 + services.GAME_DATA_CACHE_TTL):
+            self.assertIsNone(cache.get('live'))
+        with mock.patch.object(time, 'monotonic', return_value=10 ** 9):
+            self.assertIs(cache.get('final'), final)
+
+    def test_lru_eviction(self):
+        cache = TTLCache(None, max_size=3, sizeof=len)
+        cache.set('a', 'x')
+        cache.set('b', 'xx')
+        cache.get('a')
+        cache.set('c', 'x')
+        # The least recently used entry is evicted
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 'x')
+        self.assertEqual(cache.stats()['evictions'], 1)
+        self.assertEqual(cache.stats()['size'], 2)
+
+    def test_failed_fetch(self):
+        cache = TTLCache(60, max_size=10, sizeof=lambda value: value['size'])
+        with self.assertRaises(KeyError):
+            cache.get_or_fetch('key', dict)
+        with self.assertRaises(ZeroDivisionError):
+            cache.get_or_fetch('key', lambda: 1 / 0)
+        # Failures are not cached, nor do they leave the key in flight
+        self.assertEqual(cache.get_or_fetch('key', lambda: {'size': 1}), {'size': 1})
+        self.assertEqual(cache._inflight, {})
+
+    def test_cancelled_fetch(self):
+        cache = TTLCache(60)
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.05 if len(calls) == 1 else 0)
+            return 'value'
+
+        async def main():
+            fetcher = asyncio.ensure_future(cache.aget_or_fetch('key', fetch))
+            await asyncio.sleep(0)
+            waiter = asyncio.ensure_future(cache.aget_or_fetch('key', fetch))
+            await asyncio.sleep(0.01)
+            # The fetching request's client disconnects
+            fetcher.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await fetcher
+            return await waiter
+
+        # The waiter takes over the fetch instead of being cancelled
+        self.assertEqual(asyncio.run(main()), 'value')
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(cache._inflight, {})
+
+    def test_async_waiter(self):
+        cache = TTLCache(60)
+
+        async def fetch():
+            await asyncio.sleep(0.01)
+            return 'value'
+
+        async def main():
+            return await asyncio.gather(*(cache.aget_or_fetch('key', fetch) for _ in range(3)))
+
+        self.assertEqual(asyncio.run(main()), ['value'] * 3)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+
+class TeamIndexTests(TestCase):
+    '''
+    Tests of the in-memory index of the Team models.
+    '''
+
+    def setUp(self):
+        teams.refresh()
+        self.addCleanup(teams.refresh)
+        Team.objects.create(team_id=1610612747, team_name='Los Angeles Lakers', nickname='Lakers',
+                            abbreviation='LAL')
+
+    def test_single_query(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(teams.get_team(1610612747).nickname, 'Lakers')
+            self.assertEqual(teams.get_team_by_abbreviation('LAL').team_id, 1610612747)
+            with self.assertRaises(Team.DoesNotExist):
+                teams.get_team(1)
+
+    def test_invalidation(self):
+        team = teams.get_team(1610612747)
+        team.nickname = 'Showtime'
+        team.save()
+        self.assertEqual(teams.get_team(1610612747).nickname, 'Showtime')
+        team.delete()
+        with self.assertRaises(Team.DoesNotExist):
+            teams.get_team_by_abbreviation('LAL')
+
+    def test_update_team_models(self):
+        created, updated = services.update_team_models()
+        self.assertEqual((created, updated), (Team.objects.count() - 1, 1))
+        # Updating the teams again changes nothing
+        self.assertEqual(services.update_team_models(), (0, Team.objects.count()))
+        self.assertEqual(teams.get_team(1610612747).team_name, 'Los Angeles Lakers')
+        self.assertEqual(len({team.abbreviation for team in Team.objects.all()}), Team.objects.count())
+
+
+class LoadTestTests(SimpleTestCase):
+    '''
+    Tests of the load test harness of the polling endpoints.
+    '''
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([3], 95), 3)
+        self.assertIsNone(percentile([], 50))
+
+    def test_run_load_test(self):
+        results = run_load_test(clients=4, duration=1, games=2,
+                                time_scale=60, upstream_latency=0)
+        self.assertGreater(results['requests'], 0)
+        self.assertEqual(results['errors'], 0)
+        self.assertGreater(results['endpoints']['update_games']['requests'], 0)
+        self.assertGreater(results['endpoints']['update_game']['requests'], 0)
+        self.assertEqual(results['db_queries_per_request'], 0)
+        self.assertIn('scoreboard', results['upstream_calls'])
+        self.assertIsNotNone(results['latency_ms']['p99'])
+
+
+def _random_clock(rng):
+    '''
+    Returns: Random game clock string, usually in the NBA API's format, but with fields of varying
+        width & occasionally other characters, so that every branch of the parsers is exercised.
+    '''
+    def field(max_value):
+        value = str(rng.randint(0, max_value))
+        return value.zfill(rng.choice((1, 2, 2, 2, 3)))
+    clock = f"PT{field(12)}M{field(59)}.{field(99)}S"
+    if rng.random() < 0.1:
+        position = rng.randrange(len(clock))
+        clock = clock[:position] + \
+            rng.choice(('', ' ', '+', '_', '0', ':', '.', '\u0661')) + clock[position + 1:]
+    return clock
+
+
+def _outcome(parse, clock):
+    '''
+    Returns: Tuple containing the result of parsing the given clock, or the type of the raised exception.
+    '''
+    try:
+        return ('result', parse(clock))
+    except Exception as error:
+        return ('error', type(error))
+
+
+# Stats scoreboard response of a date with a single finished game, in the format of the
+# stats.endpoints.scoreboard.Scoreboard endpoint used by the live data source
+STATS_SCOREBOARD = {'resultSets': [
+    {'name': 'GameHeader',
+     'headers': ['GAME_DATE_EST', 'GAME_SEQUENCE', 'GAME_ID', 'GAME_STATUS_ID', 'GAME_STATUS_TEXT', 'GAMECODE',
+                 'HOME_TEAM_ID', 'VISITOR_TEAM_ID', 'SEASON', 'LIVE_PERIOD', 'LIVE_PC_TIME',
+                 'NATL_TV_BROADCASTER_ABBREVIATION', 'LIVE_PERIOD_TIME_BCAST', 'WH_STATUS'],
+     'rowSet': [['2022-01-01T00:00:00', 1, '0022100520', 3, 'Final', '20220101/BOSATL',
+                 1610612737, 1610612738, '2021', 4, '     ', None, 'Q4       - ', 1]]},
+    {'name': 'LineScore',
+     'headers': ['GAME_DATE_EST', 'GAME_SEQUENCE', 'GAME_ID', 'TEAM_ID', 'TEAM_ABBREVIATION', 'TEAM_CITY_NAME',
+                 'TEAM_WINS_LOSSES', 'PTS_QTR1', 'PTS_QTR2', 'PTS_QTR3', 'PTS_QTR4', 'PTS_OT1', 'PTS_OT2',
+                 'PTS_OT3', 'PTS_OT4', 'PTS_OT5', 'PTS_OT6', 'PTS_OT7', 'PTS_OT8', 'PTS_OT9', 'PTS_OT10',
+                 'PTS', 'FG_PCT', 'FT_PCT', 'FG3_PCT', 'AST', 'REB', 'TOV'],
+     'rowSet': [['2022-01-01T00:00:00', 1, '0022100520', 1610612737, 'ATL', 'Atlanta', '16-18',
+                 30, 25, 24, 29, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 108, 0.482, 0.8, 0.375, 24, 44, 12],
+                ['2022-01-01T00:00:00', 1, '0022100520', 1610612738, 'BOS', 'Boston', '17-18',
+                 22, 28, 26, 23, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 99, 0.431, 0.75, 0.333, 21, 46, 14]]},
+]}
+
+
+class ScheduledGamesTests(SimpleTestCase):
+    '''
+    Tests of the formatting of scheduled games.
+    '''
+
+    def test_scoreboard_fallback(self):
+        result_sets = {result_set['name']: result_set for result_set in STATS_SCOREBOARD['resultSets']}
+        team = mock.Mock(team_name='Team')
+        # The boxscore of the game could not be retrieved
+        with mock.patch('NBA.teams.get_team', return_value=team):
+            games, rows, complete = services._build_scheduled_games(result_sets, {'0022100520': None})
+        self.assertFalse(complete)
+        self.assertEqual(games[0]['homeTeam']['score'], 108)
+        self.assertEqual(games[0]['awayTeam']['score'], 99)
+        self.assertEqual(games[0]['period'], 4)
+
+
+class PreferencesCacheTests(TestCase):
+    '''
+    Tests of the process-wide cache of the users' hidden game preferences.
+    '''
+
+    def setUp(self):
+        services.preferences_cache.invalidate()
+        self.addCleanup(services.preferences_cache.invalidate)
+        self.user = User.objects.create_user('fan', password='password')
+        self.preferences = HiddenGamePreferences.objects.create(user=self.user)
+
+    def _request(self):
+        '''
+        Returns: Object standing in for a request of the test user with its own session.
+        '''
+        return mock.Mock(user=self.user, session={})
+
+    def test_cached(self):
+        request = self._request()
+        with self.assertNumQueries(1):
+            self.assertEqual(services.get_preferences(request), self.preferences)
+            self.assertEqual(services.get_preferences(self._request()), self.preferences)
+        self.assertIsNone(services.get_preferences(mock.Mock(user=AnonymousUser(), session={})))
+
+    def test_session_revision(self):
+        other_session, changing_session = self._request(), self._request()
+        services.get_preferences(other_session)
+        # Another process changes the preferences, without invalidating this process's cache
+        HiddenGamePreferences.objects.filter(user=self.user).update(hide_scores=True)
+        services.preferences_changed(changing_session)
+        # A process whose cache still holds the old preferences serves the changed preferences to the session
+        services.preferences_cache.set(self.user.pk, (None, self.preferences))
+        self.assertTrue(services.get_preferences(changing_session).hide_scores)
+        # Sessions that did not make the change see it once their cached preferences expire
+        services.preferences_cache.set(self.user.pk, (None, self.preferences))
+        self.assertFalse(services.get_preferences(other_session).hide_scores)
+
+    def test_invalidated_on_save(self):
+        services.get_preferences(self._request())
+        preferences = HiddenGamePreferences.objects.get(user=self.user)
+        preferences.hide_after_period = 2
+        preferences.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(services.get_preferences(self._request()).hide_after_period, 2)
+
+
+class ArchivedGameTests(TestCase):
+    '''
+    Tests of the archive of finished games, from which past dates are served without querying the NBA API.
+    '''
+    games = [{'gameId': game_id, 'gameStatus': 3, 'gameStatusText': 'Final', 'period': 4,
+              'homeTeam': {'teamName': 'Hawks', 'score': 101}, 'awayTeam': {'teamName': 'Celtics', 'score': 99}}
+             for game_id in ('0022100002', '0022100001')]
+    rows = [['2022-01-01T00:00:00', 2], ['2022-01-01T00:00:00', 1]]
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        patcher = mock.patch.object(store, 'snapshot_store', store.FileSnapshotStore(directory.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_round_trip(self):
+        fetch = mock.Mock(return_value=(self.games, self.rows, True))
+        with mock.patch.object(services, '_fetch_scheduled_games', fetch):
+            self.assertEqual(services._get_scheduled_games('2022-01-01'), (self.games, True))
+            with self.assertNumQueries(1):
+                games, final = services._get_scheduled_games('2022-01-01')
+        self.assertEqual(fetch.call_count, 1)
+        self.assertTrue(final)
+        # Archived games are ordered by their sequence
+        self.assertEqual(games, self.games[::-1])
+        # Archiving the same games again is ignored
+        services.archive_games('2022-01-01', self.games, self.rows)
+        self.assertEqual(ArchivedGame.objects.count(), 2)
+
+    def test_unfinished_games(self):
+        games = [dict(self.games[0], gameStatus=2), self.games[1]]
+        fetch = mock.Mock(return_value=(games, self.rows, True))
+        with mock.patch.object(services, '_fetch_scheduled_games', fetch):
+            self.assertEqual(services._get_scheduled_games('2022-01-01'), (games, False))
+        self.assertFalse(ArchivedGame.objects.exists())
+        # Incomplete data is not archived either
+        fetch = mock.Mock(return_value=(self.games, self.rows, False))
+        with mock.patch.object(services, '_fetch_scheduled_games', fetch):
+            self.assertEqual(services._get_scheduled_games('2022-01-01'), (self.games, False))
+        self.assertFalse(ArchivedGame.objects.exists())
+
+
+class ParseGameClockTests(SimpleTestCase):
+    '''
+    Tests that the memoized game clock parser is equivalent to the reference parser.
+    '''
+
+    def setUp(self):
+        services.parse_game_clock.cache_clear()
+
+    def test_standard_clocks(self):
+        for minutes in range(13):
+            for seconds in range(60):
+                for hundredths in range(0, 100, 7):
+                    clock = f"PT{minutes:02d}M{seconds:02d}.{hundredths:02d}S"
+                    self.assertEqual(services.parse_game_clock(clock),
+                                     services._parse_game_clock(clock), clock)
+
+    def test_random_clocks(self):
+        rng = random.Random(2022)
+        for _ in range(20000):
+            clock = _random_clock(rng)
+            # Parse twice, so that both the computed & memoized results are compared
+            for _ in range(2):
+                self.assertEqual(_outcome(services.parse_game_clock, clock),
+                                 _outcome(services._parse_game_clock, clock), clock)
+
+
+class NextPollIntervalTests(SimpleTestCase):
+    '''
+    Tests of the polling intervals suggested to clients based on the states of the games.
+    '''
+    now = datetime.datetime(2022, 1, 1, tzinfo=datetime.timezone.utc)
+
+    def game(self, gameStatus, period=0, gameClock='', tip_off=0):
+        '''
+        Returns: Dictionary representing a game with the given state, tipping off the given number of
+            minutes after the test's current time.
+        '''
+        gameTimeUTC = (self.now + datetime.timedelta(minutes=tip_off)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        return {'gameStatus': gameStatus, 'period': period, 'gameClock': gameClock, 'gameTimeUTC': gameTimeUTC}
+
+    def interval(self, *games):
+        return services.next_poll_interval(list(games), 30000, now=self.now)
+
+    def test_game_states(self):
+        self.assertIsNone(self.interval(self.game(3), self.game(3)))
+        self.assertEqual(self.interval(), services.PREGAME_MAX_UPDATE_INTERVAL)
+        self.assertEqual(self.interval(self.game(3), self.game(2, 2, 'PT01M00.00S')), 30000)
+        self.assertEqual(self.interval(self.game(2, 4, 'PT06M00.00S')), 30000)
+        self.assertEqual(self.interval(self.game(2, 2), self.game(2, 4, 'PT04M59.00S')),
+                         services.CRUNCH_TIME_UPDATE_INTERVAL)
+        self.assertEqual(self.interval(self.game(2, 5, 'PT05M00.00S')), services.CRUNCH_TIME_UPDATE_INTERVAL)
+        # Boxscores contain standardized clocks
+        self.assertEqual(self.interval(self.game(2, 4, '12.30')), services.CRUNCH_TIME_UPDATE_INTERVAL)
+
+    def test_pregame(self):
+        self.assertEqual(self.interval(self.game(1, tip_off=5)), 5 * 60000)
+        self.assertEqual(self.interval(self.game(1, tip_off=180)), services.PREGAME_MAX_UPDATE_INTERVAL)
+        # Delayed tip-offs are polled at the regular interval
+        self.assertEqual(self.interval(self.game(1, tip_off=-5)), 30000)
+        self.assertEqual(self.interval(self.game(1, tip_off=180), self.game(2, 1, 'PT11M00.00S')), 30000)
+
+    def test_game_clock_seconds(self):
+        self.assertEqual(services.game_clock_seconds('PT05M10.50S'), 310.5)
+        self.assertEqual(services.game_clock_seconds('5:10'), 310)
+        self.assertEqual(services.game_clock_seconds('9.80'), 9.8)
+        self.assertIsNone(services.game_clock_seconds(''))
+
+    def test_update_views(self):
+        with use_data_source(SyntheticDataSource(games=2)) as data_source:
+            response = self.client.get(reverse('NBA:update_games'))
+            self.assertEqual(response['X-Next-Poll'], str(services.GAMES_UPDATE_INTERVAL))
+            # Unmodified responses contain the suggestion too
+            response = self.client.get(reverse('NBA:update_games'), HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response['X-Next-Poll'], str(services.GAMES_UPDATE_INTERVAL))
+            response = self.client.get(reverse('NBA:update_game', args=[data_source.game_ids()[0]]))
+            self.assertEqual(response['X-Next-Poll'], str(services.GAME_UPDATE_INTERVAL))
+
+
+class BenchmarkTests(SimpleTestCase):
+    '''
+    Tests of the micro-benchmarks of the NBA services.
+    '''
+
+    def test_run_benchmarks(self):
+        fixture = load_fixture()
+        fixture['games'] = dict(list(fixture['games'].items())[:1])
+        results = run_benchmarks(fixture, repeat=1)
+        self.assertEqual(results['fixture']['boxscores'], 1)
+        for result in results['benchmarks'].values():
+            self.assertGreater(result['microseconds_per_call'], 0)
+
+
+class ScoreboardDeltaTests(SimpleTestCase):
+    '''
+    Tests of the snapshot tokens allowing clients to receive only the games that changed.
+    '''
+
+    def setUp(self):
+        games = SyntheticDataSource(games=3).scoreboard()
+        self.first = self._build(games, None)
+        changed = json.loads(json.dumps(games))
+        changed[1]['homeTeam']['score'] += 2
+        self.second = self._build(changed, self.first['versions'])
+        self.hidden = (False,) * 3
+
+    def _build(self, games, previous):
+        versions = services._version_games(games, [services.project_game(game) for game in games], previous)
+        return dict(services._build_scoreboard(games, versions=versions), versions=versions)
+
+    def _body(self, since):
+        return json.loads(services.encode_scoreboard(self.second, self.hidden, since)['identity'])
+
+    def test_changed_games(self):
+        body = self._body(services.snapshot_token(self.first, self.hidden))
+        self.assertFalse(body['full'])
+        self.assertEqual([game['gameId'] for game in body['games']], [self.second['games'][1]['gameId']])
+        self.assertEqual(body['gameIds'], [game['gameId'] for game in self.second['games']])
+        self.assertEqual(body['snapshot'], services.snapshot_token(self.second, self.hidden))
+
+    def test_memoized_tokens(self):
+        token = services.snapshot_token(self.first, self.hidden)
+        epoch, sequence, bits = token.split('.')
+        for since in (token, f'{epoch}.+{sequence}.{bits}', f'{epoch}.0{sequence}.{bits}', 'garbage', None):
+            services.encode_scoreboard(self.second, self.hidden, since)
+        # Tokens naming the same sequence number, or none, share the memoized bodies
+        self.assertEqual(set(self.second['encoded_tokens']),
+                         {(self.hidden, int(sequence)), (self.hidden, None)})
+        with mock.patch.object(services, 'SCOREBOARD_MAX_ENCODED_TOKENS', 2):
+            services.encode_scoreboard(self.second, self.hidden, f'{epoch}.0.{bits}')
+        self.assertEqual(len(self.second['encoded_tokens']), 2)
+
+    def test_full_response(self):
+        epoch, sequence, bits = services.snapshot_token(self.first, self.hidden).split('.')
+        for since in (None, f'other.{sequence}.{bits}', f'{epoch}.{sequence}.111', f'{epoch}.+{sequence}.{bits}',
+                      f'{epoch}. {sequence}.{bits}', f'{epoch}.0{sequence}.{bits}', f'{epoch}.-1.{bits}',
+                      f'{epoch}.{self.second["sequence"] + 1}.{bits}', 'garbage'):
+            body = self._body(since)
+            self.assertTrue(body['full'], since)
+            self.assertEqual(len(body['games']), 3)
+
+
+class GameChangesTests(SimpleTestCase):
+    '''
+    Tests of the incremental updates of a game's actions & boxscore.
+    '''
+
+    def test_diff_values(self):
+        old = {'status': 'Q1', 'teams': [{'score': 2}, {'score': 0}], 'period': 1}
+        new = {'status': 'Q1', 'teams': [{'score': 2}, {'score': 3}], 'period': 1, 'clock': '11:20'}
+        self.assertEqual(services.diff_values(old, new), {'teams': {'1': {'score': 3}}, 'clock': '11:20'})
+        # Lists of different lengths are replaced as a whole
+        self.assertEqual(services.diff_values({'players': [1]}, {'players': [1, 2]}), {'players': [1, 2]})
+        self.assertEqual(services.diff_values(old, old), {})
+
+    def test_game_changes(self):
+        actions = [{'actionNumber': number} for number in (1, 2, 4, 7)]
+        old_data = services._version_game_data('test_game', actions[:2], {'score': 2, 'period': 1})
+        new_data = services._version_game_data('test_game', actions, {'score': 5, 'period': 1})
+
+        changes = services.game_changes('test_game', new_data, 2, old_data[2])
+        self.assertEqual(changes['actions'], actions[2:])
+        self.assertEqual(changes['boxscore_changes'], {'score': 5})
+        self.assertEqual(changes['version'], new_data[2])
+        # The complete data is returned to clients without a known version
+        changes = services.game_changes('test_game', new_data, None, 'unknown')
+        self.assertEqual(changes['actions'], actions)
+        self.assertEqual(changes['boxscore'], new_data[1])
+        changes = services.game_changes('test_game', new_data, 7, new_data[2])
+        self.assertEqual(changes['actions'], [])
+        self.assertEqual(changes['boxscore_changes'], {})
+
+
+class GameSnapshotTests(SimpleTestCase):
+    '''
+    Tests of the responses of update_game, which must describe a single snapshot of a game's data.
+    '''
+
+    async def test_consistent_response(self):
+        data_source = SyntheticDataSource(games=1, speed=1e9)
+        gameId = data_source.game_ids()[0]
+        actions, boxscore = data_source.game_data(gameId)
+        # The game's data is refreshed between every read
+        snapshots = [(actions[:-1], boxscore, 'first'), (actions, boxscore, 'second')]
+        read = mock.AsyncMock(side_effect=snapshots)
+        with mock.patch.object(services, '_aget_versioned_game_data', read):
+            response = await self.async_client.get(reverse('NBA:update_game', args=[gameId]))
+        body = json.loads(response.content)
+        self.assertEqual(read.await_count, 1)
+        self.assertEqual(response['ETag'], f'"{body["version"]}-{body["actions"][-1]["actionNumber"]}"')
+
+
+class HiddenOverlayTests(SimpleTestCase):
+    '''
+    Tests of the hidden scores computed once per scoreboard snapshot & hidden scores criteria.
+    '''
+
+    def _preferences(self, hide_after_period=4, max_score_difference=0, hide_scores=True):
+        '''
+        Returns: Object standing in for the HiddenGamePreferences of a user with the given criteria.
+        '''
+        return mock.Mock(hide_scores=hide_scores, hide_after_period=hide_after_period,
+                         max_score_difference=max_score_difference)
+
+    def test_once_per_criteria(self):
+        with use_data_source(SyntheticDataSource(games=4, speed=600)):
+            scoreboard = services.get_scoreboard()
+        games = copy.deepcopy(scoreboard['games'])
+        with mock.patch.object(services, '_hide_overlay', wraps=services._hide_overlay) as hide_overlay:
+            first = services.hidden_overlay(scoreboard, self._preferences())
+            self.assertIs(services.hidden_overlay(scoreboard, self._preferences()), first)
+            services.hidden_overlay(scoreboard, self._preferences(max_score_difference=10))
+            # Users that do not hide scores share the same overlay as anonymous users
+            services.hidden_overlay(scoreboard, None)
+            services.hidden_overlay(scoreboard, self._preferences(hide_scores=False))
+        self.assertEqual(hide_overlay.call_count, 3)
+        self.assertEqual(len(first), len(games))
+        # The shared snapshot is not modified
+        self.assertEqual(scoreboard['games'], games)
+
+    async def test_stream_overlay(self):
+        with use_data_source(SyntheticDataSource(games=4, speed=600)):
+            scoreboard = await services.aget_scoreboard()
+            changed = {game['gameId']: (scoreboard, index) for index, game in enumerate(scoreboard['games'])}
+            preferences = self._preferences()
+            with mock.patch.object(services, 'get_preferences', return_value=preferences), \
+                    mock.patch.object(services, '_hide_overlay', wraps=services._hide_overlay) as hide_overlay, \
+                    mock.patch.object(streaming, '_serve') as serve:
+                # Two connections of users with the same criteria
+                for _ in range(2):
+                    await streaming.stream_games({'type': 'http', 'headers': []}, None, None)
+                    get_message = serve.call_args.args[3]
+                    message = await get_message(changed)
+        self.assertEqual(hide_overlay.call_count, 1)
+        self.assertEqual([game['hidden'] for game in message['games']],
+                         list(services.hidden_overlay(scoreboard, preferences)))
+
+
+class AnonymousScoreboardTests(SimpleTestCase):
+    '''
+    Tests of the scoreboard bodies that are serialized once per snapshot & shared by anonymous clients.
+    '''
+
+    async def test_shared_bodies(self):
+        with use_data_source(SyntheticDataSource(games=3)):
+            first = await self.async_client.get(reverse('NBA:update_games'))
+            second = await self.async_client.get(reverse('NBA:update_games'))
+            self.assertEqual(first.content, second.content)
+            scoreboard = await services.aget_scoreboard()
+            hidden = services.hidden_overlay(scoreboard, None)
+            # Every anonymous client is served the same bytes
+            self.assertIs(services.encode_scoreboard(scoreboard, hidden),
+                          services.encode_scoreboard(scoreboard, hidden))
+            self.assertEqual(first['ETag'], services.scoreboard_etag(scoreboard, hidden))
+            token = json.loads(first.content)['snapshot']
+            self.assertIs(services.encode_scoreboard(scoreboard, hidden, token),
+                          services.encode_scoreboard(scoreboard, hidden, token))
+
+    def test_preferred_encoding(self):
+        self.assertEqual(responses.preferred_encoding('gzip, deflate, br'), responses.ENCODINGS[0])
+        self.assertEqual(responses.preferred_encoding('deflate, gzip;q=0.5'), 'gzip')
+        self.assertEqual(responses.preferred_encoding('*'), responses.ENCODINGS[0])
+        for accepted in ('', 'identity', 'gzip;q=0', 'GZIP; q=0.0, br;q=0', '*;q=0', 'gzip;q=invalid'):
+            self.assertIsNone(responses.preferred_encoding(accepted), accepted)
+
+    def test_json_encoders(self):
+        data = {'games': [{'gameId': '1', 'hidden': False, 'score': None}]}
+        for name in responses.JSON_ENCODERS:
+            self.assertEqual(json.loads(responses.get_json_encoder(name)(data)), data)
+        self.assertIs(responses.get_json_encoder('NBA.responses._json_dumps'), responses._json_dumps)
+
+
+class FinalScheduleTests(SimpleTestCase):
+    '''
+    Tests of the cached schedule pages of dates whose games have all finished.
+    '''
+    games = [{'gameId': '0022100001', 'gameStatus': 3, 'gameStatusText': 'Final', 'period': 4,
+              'homeTeam': {'teamName': 'Hawks', 'score': 101}, 'awayTeam': {'teamName': 'Celtics', 'score': 99}}]
+
+    def setUp(self):
+        services.final_schedules.invalidate()
+
+    async def test_immutable_page(self):
+        fetch = mock.AsyncMock(return_value=(self.games, True))
+        url = reverse('NBA:schedule', args=['2022-01-01'])
+        with mock.patch.object(services, '_aget_scheduled_games', fetch):
+            first = await self.async_client.get(url)
+            second = await self.async_client.get(url)
+            # The asynchronous client sends its extra arguments as headers
+            not_modified = await self.async_client.get(url, **{'if-none-match': first['ETag']})
+        self.assertEqual(fetch.await_count, 1)
+        self.assertEqual(first.content, second.content)
+        self.assertIn(b'Celtics', first.content)
+        self.assertIn('immutable', first['Cache-Control'])
+        self.assertIn('Cookie', first['Vary'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    async def test_unfinished_date(self):
+        games = [dict(self.games[0], gameStatus=2)]
+        fetch = mock.AsyncMock(return_value=(games, False))
+        with mock.patch.object(services, '_aget_scheduled_games', fetch):
+            response = await self.async_client.get(reverse('NBA:schedule', args=['2022-01-01']))
+            await self.async_client.get(reverse('NBA:schedule', args=['2022-01-01']))
+        self.assertEqual(fetch.await_count, 2)
+        self.assertNotIn('immutable', response.get('Cache-Control', ''))
+
+
+class SlateWarmerTests(SimpleTestCase):
+    '''
+    Tests of the rolling slate dates & the slate warmer.
+    '''
+
+    def test_relative_schedule(self):
+        today = datetime.date(2022, 3, 1)
+        with mock.patch.object(timezone, 'localdate', return_value=today):
+            response = self.client.get(reverse('NBA:yesterdays_games'))
+        self.assertRedirects(response, reverse('NBA:schedule', args=['2022-02-28']),
+                             fetch_redirect_response=False)
+
+    def test_seconds_until_midnight(self):
+        now = timezone.make_aware(datetime.datetime(2022, 3, 12, 23, 0))
+        self.assertEqual(warmer.seconds_until_midnight(now), 3600)
+        # The night on which daylight saving time starts is one hour shorter
+        now = timezone.make_aware(datetime.datetime(2022, 3, 13, 0, 0))
+        self.assertEqual(warmer.seconds_until_midnight(now), 23 * 3600)
+
+    def test_warm_slates(self):
+        today = datetime.date(2022, 3, 1)
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch.object(store, 'snapshot_store', store.FileSnapshotStore(directory)), \
+                use_data_source(SyntheticDataSource(games=2)) as data_source, \
+                mock.patch.object(services, 'warm_schedule') as warm_schedule:
+            errors = warmer.warm_slates(today)
+            # Another process skips the slates while their leases are held
+            self.assertEqual(warmer.warm_slates(today), {})
+        self.assertEqual(errors, {})
+        self.assertEqual([call.args[0] for call in warm_schedule.call_args_list],
+                         [datetime.date(2022, 2, 28), datetime.date(2022, 3, 2)])
+        self.assertEqual(data_source.calls['game_data'], 2)
+
+    def test_warm_slates_without_live_data(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch.object(store, 'snapshot_store', store.FileSnapshotStore(directory)), \
+                use_data_source(SyntheticDataSource(games=2)) as data_source, \
+                mock.patch.object(services, 'warm_schedule') as warm_schedule:
+            warmer.warm_slates(datetime.date(2022, 3, 1), live=False)
+        self.assertEqual(warm_schedule.call_count, 2)
+        self.assertEqual(data_source.calls['scoreboard'], 0)
+
+
+class StreamTests(SimpleTestCase):
+    '''
+    Tests of the Server-Sent Events streams of the live NBA data.
+    '''
+
+    async def _first_event(self, application, path, headers=(), root_path=''):
+        '''
+        Connects to the given path of the given ASGI application, and disconnects once an event has been received.
+        Returns: List of the ASGI messages sent by the application.
+        '''
+        messages = []
+        received = asyncio.Event()
+
+        async def receive():
+            await received.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            messages.append(message)
+            if message['type'] == 'http.response.body' and message['body'].startswith((b'id:', b'data:')):
+                received.set()
+
+        scope = {'type': 'http', 'path': root_path + path, 'root_path': root_path, 'headers': list(headers)}
+        await asyncio.wait_for(application(scope, receive, send), 5)
+        return messages
+
+    def _event(self, messages):
+        '''
+        Returns: Dictionary containing the fields of the first event contained in the given messages.
+        '''
+        body = next(message['body'] for message in messages
+                    if message['type'] == 'http.response.body' and not message['body'].startswith(b':'))
+        return dict(line.split(': ', 1) for line in body.decode().strip().split('\n'))
+
+    async def test_resume_game_stream(self):
+        application = streaming.sse_application(None)
+        with use_data_source(SyntheticDataSource(games=1, speed=1e9)) as data_source:
+            gameId = data_source.game_ids()[0]
+            path = streaming.get_stream_paths()[1] + gameId
+            event = self._event(await self._first_event(application, path))
+            actions = json.loads(event['data'])['actions']
+            self.assertEqual(event['id'], str(actions[-1]['actionNumber']))
+            # A reconnecting client only receives the actions following the last one it received
+            resumed = self._event(await self._first_event(
+                application, path, [(b'last-event-id', str(actions[-3]['actionNumber']).encode())]))
+            self.assertEqual(json.loads(resumed['data'])['actions'], actions[-2:])
+            self.assertIn('boxscore', json.loads(resumed['data']))
+
+
+    async def test_root_path(self):
+        application = streaming.sse_application(None)
+        with use_data_source(SyntheticDataSource(games=1, speed=1e9)):
+            # The streams follow the prefix of the NBA app's urls below the root path
+            self.assertEqual(streaming.get_stream_paths()[0], reverse('NBA:stream_games'))
+            event = self._event(await self._first_event(
+                application, streaming.get_stream_paths()[0], root_path='/scores'))
+            self.assertEqual(len(json.loads(event['data'])['games']), 1)
+
+    async def test_message_error(self):
+        broadcaster = streaming.Broadcaster(lambda: {'key': 1}, lambda entry: entry)
+        get_message = mock.AsyncMock(side_effect=RuntimeError('session decode failed'))
+        messages = []
+
+        async def receive():
+            await asyncio.Event().wait()
+
+        async def send(message):
+            messages.append(message)
+
+        # The response is ended without waiting for the client to disconnect, so that it reconnects
+        with self.assertLogs('NBA.streaming', 'ERROR'):
+            await asyncio.wait_for(streaming._serve(receive, send, broadcaster, get_message), 5)
+        self.assertFalse(messages[-1]['more_body'])
+        self.assertFalse(broadcaster.subscribers)
+
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    '''
+    Serves the generated games of the server's synthetic data source in the format of the live NBA data.
+    '''
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.connections.add(self.client_address)
+        data_source = self.server.data_source
+        path = self.path.removeprefix('/liveData/')
+        if path == 'slow':
+            time.sleep(1)
+            body = {}
+        elif path == 'scoreboard/todaysScoreboard_00.json':
+            body = {'scoreboard': {'games': data_source.scoreboard()}}
+        elif path.startswith('playbyplay/playbyplay_'):
+            actions, boxscore = data_source.game_data(path[22:-5])
+            body = {'game': {'gameId': boxscore['gameId'], 'actions': actions}}
+        elif path.startswith('boxscore/boxscore_'):
+            body = {'game': data_source.boxscore(path[18:-5])}
+        else:
+            self.send_error(404)
+            return
+        content = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+@skipUnless(upstream.httpx, 'requires the httpx package')
+class AsyncViewTests(SimpleTestCase):
+    '''
+    Tests of the asynchronous views & upstream client against a local fake of the live NBA data.
+    '''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeUpstreamHandler)
+        cls.server.data_source = SyntheticDataSource(games=3, speed=60)
+        cls.server.connections = set()
+        # Clients abort slow requests
+        cls.server.handle_error = lambda request, client_address: None
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}/liveData"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    async def test_update_views(self):
+        self.server.connections.clear()
+        with use_data_source(self.server.data_source):
+            services.async_data_source = AsyncLiveDataSource(self.base_url)
+            response = await self.async_client.get(reverse('NBA:update_games'))
+            self.assertEqual(response.status_code, 200)
+            games = json.loads(response.content)['games']
+            self.assertEqual(len(games), 3)
+
+            gameId = games[0]['gameId']
+            for _ in range(3):
+                services.game_data_cache.invalidate()
+                response = await self.async_client.get(reverse('NBA:update_game', args=[gameId]))
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(json.loads(response.content)['boxscore']['gameId'], gameId)
+        # Requests reuse the pooled connections
+        self.assertLessEqual(len(self.server.connections), 2)
+
+    async def test_upstream_errors(self):
+        client = upstream.AsyncHTTPClient(self.base_url)
+        with self.assertRaises(upstream.UpstreamError):
+            await client.get_json('missing.json')
+        with self.assertRaises(asyncio.TimeoutError):
+            await client.get_json('slow', timeout=0.1)
+        self.assertEqual(len((await client.get_json('scoreboard/todaysScoreboard_00.json'))['scoreboard']['games']), 3)
+
+    def test_pool_closed_with_loop(self):
+        client = upstream.AsyncHTTPClient(self.base_url)
+
+        async def request():
+            await client.get_json('scoreboard/todaysScoreboard_00.json')
+            return await client._get_client()
+
+        # Every request served over WSGI runs its asynchronous view in a new event loop
+        pooled = asyncio.run(request())
+        self.assertTrue(pooled.is_closed)
+
+
+class FlakyDataSource(SyntheticDataSource):
+    '''
+    Synthetic data source whose scoreboard can be made to fail or hang, emulating an NBA API incident.
+    '''
+    mode = 'ok'
+
+    def scoreboard(self):
+        if self.mode == 'fail':
+            self._call('scoreboard')
+            raise ConnectionError('NBA API unavailable')
+        if self.mode == 'slow':
+            time.sleep(0.5)
+        return super().scoreboard()
+
+
+class RecorderTests(SimpleTestCase):
+    '''
+    Tests of the recording of time slots.
+    '''
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = directory.name
+
+    def test_same_time(self):
+        when = datetime.datetime(2022, 3, 1, 19, 45, 0, 250000)
+        first, _ = recorder.record_slot(SyntheticDataSource(games=1), when, root=self.root)
+        second, _ = recorder.record_slot(SyntheticDataSource(games=2), when, root=self.root)
+        self.assertEqual(first.name, '19_45_00_250000')
+        self.assertEqual(second.name, '19_45_00_250000-1')
+        # The existing time slot is kept
+        self.assertEqual(len(recorder.RecordedSlot(first).scoreboard), 1)
+        self.assertEqual(len(recorder.RecordedSlot(second).scoreboard), 2)
+        self.assertEqual(len(ReplayDataSource(first.parent).paths), 2)
+
+    def test_crash_leaves_no_slot(self):
+        when = datetime.datetime(2022, 3, 1, 19, 45)
+        write_json = recorder._write_json
+
+        def crash_on_index(path, data):
+            if path.endswith(recorder.GAMES_INDEX_FILE):
+                raise OSError('Disk full')
+            write_json(path, data)
+
+        with mock.patch.object(recorder, '_write_json', crash_on_index), self.assertRaises(OSError):
+            recorder.record_slot(SyntheticDataSource(games=2, speed=600), when, root=self.root)
+        # Neither the time slot nor its temporary directory remain
+        self.assertEqual(os.listdir(recorder.slot_path(when, self.root).parent), [])
+
+    def test_failed_games(self):
+        data_source = SyntheticDataSource(games=2, speed=600)
+        with mock.patch.object(data_source, 'game_data', side_effect=ConnectionError('NBA API unavailable')):
+            path, errors = recorder.record_slot(data_source, datetime.datetime(2022, 3, 1, 19, 45),
+                                                root=self.root)
+        self.assertEqual(set(errors), set(data_source.game_ids()))
+        # The scoreboards are recorded even if the games could not be
+        slot = recorder.RecordedSlot(path)
+        self.assertEqual(len(slot.scoreboard), 2)
+        with self.assertRaises(KeyError):
+            slot.game(data_source.game_ids()[0])
+
+    def test_seconds_slot_names(self):
+        self.assertEqual(ReplayDataSource._parse_slot_time('19_45_00'), datetime.datetime(1900, 1, 1, 19, 45))
+
+
+class RecordedSlotTests(SimpleTestCase):
+    '''
+    Tests of the lazy reader of recorded time slots.
+    '''
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.data_source = SyntheticDataSource(games=3, speed=1e9)
+        self.path, _ = recorder.record_slot(self.data_source, datetime.datetime(2022, 3, 1, 19, 45),
+                                            root=directory.name)
+
+    def check_slot(self, slot):
+        '''
+        Asserts that the given reader returns the recorded data of every game.
+        '''
+        self.assertEqual(len(slot.scoreboard), 3)
+        for gameId in self.data_source.game_ids():
+            actions, boxscore = slot.game(gameId)
+            self.assertEqual(boxscore['gameId'], gameId)
+            self.assertEqual(len(actions), len(self.data_source.game_data(gameId)[0]))
+        with self.assertRaises(KeyError):
+            slot.game('0000000000')
+
+    def test_indexed(self):
+        slot = recorder.RecordedSlot(self.path)
+        self.assertEqual(set(slot.index), set(self.data_source.game_ids()))
+        # Only the requested game is parsed
+        with mock.patch.object(json, 'loads', wraps=json.loads) as loads:
+            slot.game(self.data_source.game_ids()[1])
+        self.assertEqual(loads.call_count, 1)
+        self.check_slot(slot)
+
+    def test_without_index(self):
+        index = recorder.RecordedSlot(self.path).index
+        # The index is rebuilt from the games file of time slots recorded without one
+        os.remove(os.path.join(self.path, recorder.GAMES_INDEX_FILE))
+        slot = recorder.RecordedSlot(self.path)
+        self.assertEqual(slot.index, index)
+        self.check_slot(slot)
+
+    def test_without_games(self):
+        with mock.patch.object(self.data_source, 'scoreboard', return_value=[]):
+            path, _ = recorder.record_slot(self.data_source, datetime.datetime(2022, 3, 1, 20, 0),
+                                           root=self.path.parent)
+        slot = recorder.RecordedSlot(path)
+        self.assertEqual(slot.index, {})
+        with self.assertRaises(KeyError):
+            slot.game(self.data_source.game_ids()[0])
+
+
+class ReplayDataSourceTests(SimpleTestCase):
+    '''
+    Tests of the replay of recorded time slots on a simulated clock.
+    '''
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        start = datetime.datetime(2022, 3, 1, 19, 0)
+        self.paths = [recorder.record_slot(SyntheticDataSource(games=2, speed=600), start + offset,
+                                           root=directory.name)[0]
+                      for offset in (datetime.timedelta(0), datetime.timedelta(minutes=1),
+                                     datetime.timedelta(minutes=5))]
+        self.day = self.paths[0].parent
+
+    def test_slot_selection(self):
+        with mock.patch.object(time, 'monotonic', return_value=0):
+            data_source = ReplayDataSource(self.day, speed=60)
+        self.assertEqual(data_source.paths, [str(path) for path in self.paths])
+        self.assertEqual(data_source.offsets, [0, 60, 300])
+        # Each slot is served until the simulated clock reaches the next one, and the last slot indefinitely
+        for elapsed, index in ((0, 0), (0.99, 0), (1, 1), (4.9, 1), (5, 2), (100, 2)):
+            with mock.patch.object(time, 'monotonic', return_value=elapsed):
+                slot = data_source.current_slot()
+            self.assertEqual(data_source._slot_index, index)
+        self.assertIsInstance(slot, recorder.RecordedSlot)
+        gameId = slot.scoreboard[0]['gameId']
+        self.assertEqual(data_source.game_data(gameId), slot.game(gameId))
+
+    def test_incomplete_slots_ignored(self):
+        (self.day / '.19_10_00.tmp').mkdir()
+        data_source = ReplayDataSource(self.day)
+        self.assertEqual(len(data_source.paths), 3)
+
+    def test_pickled_slot_names(self):
+        self.assertEqual(ReplayDataSource._parse_slot_time('07_45_PM'), datetime.datetime(1900, 1, 1, 19, 45))
+
+
+class ResilientDataSourceTests(SimpleTestCase):
+    '''
+    Tests of the deadlines, circuit breakers & stale data of the guarded NBA API.
+    '''
+
+    def setUp(self):
+        self.source = FlakyDataSource(games=2)
+        self.resilient = ResilientDataSource(self.source, timeout=0.1, failure_threshold=2, reset_timeout=0.2)
+
+    def test_deadline(self):
+        self.source.mode = 'slow'
+        start = time.monotonic()
+        with self.assertRaises(upstream.UpstreamTimeout):
+            self.resilient.scoreboard()
+        self.assertLess(time.monotonic() - start, 0.4)
+        # The abandoned call refreshes the last good value in the background
+        time.sleep(0.5)
+        self.source.mode = 'fail'
+        self.assertEqual(len(self.resilient.scoreboard()), 2)
+        self.assertIsNotNone(self.resilient.staleness('scoreboard'))
+
+    def test_circuit_breaker(self):
+        games = self.resilient.scoreboard()
+        self.assertIsNone(self.resilient.staleness('scoreboard'))
+        self.source.mode = 'fail'
+        for _ in range(2):
+            self.assertEqual(self.resilient.scoreboard(), games)
+        self.assertEqual(self.resilient.breakers['scoreboard'].state, 'open')
+        self.assertIsNotNone(self.resilient.staleness('scoreboard'))
+        # The open circuit rejects calls without contacting the NBA API
+        calls = self.source.calls['scoreboard']
+        self.assertEqual(self.resilient.scoreboard(), games)
+        self.assertEqual(self.source.calls['scoreboard'], calls)
+        # The other endpoints have their own circuits
+        gameId = self.source.game_ids()[0]
+        self.assertEqual(self.resilient.boxscore(gameId)['gameId'], gameId)
+
+        # Once the reset timeout has passed, the stale data is served while the trial call refreshes it
+        self.source.mode = 'ok'
+        time.sleep(0.25)
+        self.assertEqual(self.resilient.scoreboard(), games)
+        time.sleep(0.05)
+        self.assertEqual(self.resilient.breakers['scoreboard'].state, 'closed')
+        self.assertIsNone(self.resilient.staleness('scoreboard'))
+
+    def test_unknown_game(self):
+        for attempt in range(5):
+            with self.assertRaises(KeyError):
+                self.resilient.game_data(f'bogus{attempt}')
+        # Requests for missing data do not open the circuits, since the NBA API is responding
+        self.assertEqual(self.resilient.breakers['game_data'].state, 'closed')
+        gameId = self.source.game_ids()[0]
+        self.assertEqual(self.resilient.game_data(gameId)[1]['gameId'], gameId)
+
+    def test_server_failures(self):
+        self.assertTrue(upstream.is_server_failure(ConnectionError()))
+        self.assertTrue(upstream.is_server_failure(upstream.UpstreamTimeout('Timed out')))
+        self.assertTrue(upstream.is_server_failure(upstream.UpstreamError('Bad gateway', status=502)))
+        self.assertFalse(upstream.is_server_failure(upstream.UpstreamError('Not found', status=404)))
+        self.assertFalse(upstream.is_server_failure(KeyError('bogus')))
+        # The nba_api module fails to decode the error pages of unknown game ids
+        endpoint = mock.Mock(nba_response=mock.Mock(_status_code=403))
+        endpoint.get_request.side_effect = json.JSONDecodeError('Expecting value', '<Error/>', 0)
+        with self.assertRaises(upstream.UpstreamError) as context:
+            LiveDataSource._request(endpoint)
+        self.assertEqual(context.exception.status, 403)
+
+    async def test_async_data_source(self):
+        async_resilient = AsyncResilientDataSource(ThreadedAsyncDataSource(self.source), self.resilient)
+        games = await async_resilient.scoreboard()
+        self.source.mode = 'slow'
+        start = time.monotonic()
+        self.assertEqual(await async_resilient.scoreboard(), games)
+        self.assertLess(time.monotonic() - start, 0.4)
+        self.assertIsNotNone(self.resilient.staleness('scoreboard'))
+
+    def test_schedule_scoreboard_deadline(self):
+        stats_scoreboard = self.source.stats_scoreboard
+
+        def slow_stats_scoreboard(date, timeout=None):
+            time.sleep(0.3)
+            return stats_scoreboard(date, timeout)
+
+        # The stats scoreboard of a scheduled date may take longer than the default deadline
+        with mock.patch.object(self.source, 'stats_scoreboard', side_effect=slow_stats_scoreboard) as call, \
+                mock.patch.object(services, 'SCHEDULE_SCOREBOARD_TIMEOUT', 1), use_data_source(self.resilient):
+            games, rows, complete = services._fetch_scheduled_games('2022-01-01')
+        self.assertEqual(call.call_args.kwargs['timeout'], 1)
+        self.assertEqual(games, [])
+        self.assertIsNone(self.resilient.staleness('stats_scoreboard', '2022-01-01'))
+
+    def test_threaded_fallback(self):
+        with mock.patch.object(upstream, 'httpx', None):
+            async_data_source = get_async_data_source(LiveDataSource())
+        self.assertIsInstance(async_data_source, ThreadedAsyncDataSource)
+
+
+class FakeRedis:
+    '''
+    In-memory stand-in for the subset of the Redis client used by the Redis snapshot store.
+    '''
+
+    def __init__(self):
+        self.values = {}
+
+    def _encode(self, value):
+        return value if isinstance(value, bytes) else str(value).encode()
+
+    def mset(self, mapping):
+        self.values.update({key: self._encode(value) for key, value in mapping.items()})
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, nx=False, px=None):
+        if nx and key in self.values:
+            return None
+        self.values[key] = self._encode(value)
+        return True
+
+    def exists(self, key):
+        return int(key in self.values)
+
+    def delete(self, key):
+        self.values.pop(key, None)
+
+
+class SnapshotStoreTests(SimpleTestCase):
+    '''
+    Tests of the snapshot store backends & of sharing snapshots between workers.
+    '''
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def check_store(self, snapshot_store, other_store):
+        '''
+        Checks the given snapshot store, using another store with the same backend as another worker.
+        '''
+        self.assertIsNone(snapshot_store.read('games'))
+        published = snapshot_store.publish('games', b'[1, 2]', {'version': 'a'})
+        snapshot = other_store.read('games')
+        self.assertEqual((snapshot.version, snapshot.metadata, snapshot.data), (published.version, {'version': 'a'}, [1, 2]))
+        # Unchanged snapshots are only decoded once
+        self.assertIs(other_store.read('games'), snapshot)
+        snapshot_store.publish('games', b'[3]')
+        self.assertGreater(other_store.read('games').version, snapshot.version)
+        self.assertEqual(other_store.read('games').data, [3])
+        self.assertTrue(other_store.exists('games'))
+
+        # Only one worker holds the lease for refreshing a snapshot
+        self.assertTrue(snapshot_store.acquire('games', 10))
+        self.assertFalse(other_store.acquire('games', 10))
+        snapshot_store.release('games')
+        self.assertTrue(other_store.acquire('games', 10))
+        other_store.release('games')
+
+    def test_file_store(self):
+        self.check_store(store.FileSnapshotStore(self.directory), store.FileSnapshotStore(self.directory))
+        # Leases that were not released expire
+        snapshot_store = store.FileSnapshotStore(self.directory)
+        self.assertTrue(snapshot_store.acquire('games', 0))
+        self.assertTrue(snapshot_store.acquire('games', 0))
+
+    def test_redis_store(self):
+        client = FakeRedis()
+        self.check_store(store.RedisSnapshotStore(client=client), store.RedisSnapshotStore(client=client))
+
+    def test_shared_snapshots(self):
+        snapshot_store = store.FileSnapshotStore(self.directory)
+        with use_data_source(SyntheticDataSource(games=3)) as data_source, \
+                mock.patch.multiple(services, SHARED_SNAPSHOTS=True), \
+                mock.patch.object(store, 'snapshot_store', snapshot_store):
+            scoreboard = services.get_scoreboard()
+            gameId = data_source.game_ids()[0]
+            game_version = services.get_game_version(gameId)
+            # Another worker reads the published snapshots instead of querying the NBA API
+            services.scoreboard_cache.invalidate()
+            services.game_data_cache.invalidate()
+            services.shared_scoreboard['latest'] = (None, None)
+            other_scoreboard = services.get_scoreboard()
+            self.assertEqual(services.get_game_version(gameId), game_version)
+            self.assertEqual(dict(data_source.calls), {'scoreboard': 1, 'game_data': 1})
+            self.assertEqual(other_scoreboard['compact_games'], scoreboard['compact_games'])
+            self.assertEqual(services.snapshot_token(other_scoreboard, (False,) * 3),
+                             services.snapshot_token(scoreboard, (False,) * 3))
+
+
+class IngestLiveTests(SimpleTestCase):
+    '''
+    Tests of the ingest_live management command, which publishes snapshots of the live data.
+    '''
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        patcher = mock.patch.object(store, 'snapshot_store', store.FileSnapshotStore(directory.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.data_source = SyntheticDataSource(games=3, speed=600)
+        # One scheduled game, one game in progress & one finished game
+        self.games = [dict(game, gameStatus=status)
+                      for game, status in zip(self.data_source.scoreboard(), (1, 2, 3))]
+
+    def test_cadence(self):
+        clock = [0]
+
+        def sleep(seconds):
+            clock[0] += seconds
+            if clock[0] > 30:
+                raise InterruptedError
+
+        with use_data_source(self.data_source), \
+                mock.patch.object(self.data_source, 'scoreboard', return_value=self.games) as scoreboard, \
+                mock.patch('NBA.management.commands.ingest_live.time') as time_module, \
+                self.assertRaises(InterruptedError):
+            time_module.monotonic.side_effect = lambda: clock[0]
+            time_module.sleep.side_effect = sleep
+            call_command('ingest_live', scoreboard_interval=20, game_interval=5, stderr=io.StringIO())
+        # The scoreboard is queried at 0 & 20 seconds, the game in progress every 5 seconds from 0 to 30
+        # seconds, and the finished game once
+        self.assertEqual(scoreboard.call_count, 2)
+        self.assertEqual(self.data_source.calls['game_data'], 7 + 1)
+
+    def test_published_snapshots(self):
+        with use_data_source(self.data_source), \
+                mock.patch.object(self.data_source, 'scoreboard', return_value=self.games):
+            call_command('ingest_live', once=True, stderr=io.StringIO())
+            scheduled, live, final = (game['gameId'] for game in self.games)
+            self.assertEqual(store.read_snapshot('scoreboard'), self.games)
+            snapshot = store.read_snapshot(f'game_{live}')
+            self.assertEqual(snapshot['boxscore']['gameId'], live)
+            self.assertTrue(store.snapshot_exists(f'final_{final}'))
+            self.assertFalse(store.snapshot_exists(f'game_{scheduled}'))
+            self.assertFalse(store.snapshot_exists(f'game_{final}'))
+            # The views read the ingested snapshots instead of querying the NBA API
+            calls = dict(self.data_source.calls)
+            with mock.patch.object(services, 'LIVE_INGESTION', True):
+                self.assertEqual(services.get_game_data(live), (snapshot['actions'], snapshot['boxscore']))
+            self.assertEqual(dict(self.data_source.calls), calls)
@@ -0,0 +1,217 @@
+import asyncio
+import json
+import threading
+import time
+import weakref
+
+from django.core.exceptions import ImproperlyConfigured
+
+# The asynchronous HTTP client requires the optional httpx package
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# Headers sent with every request, matching those of the nba_api module
+UPSTREAM_HEADERS = {
+    'Accept': 'application/json, text/plain, */*',
+    'Accept-Encoding': 'gzip',
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/87.0.4280.88 Safari/537.36',
+}
+
+
+class UpstreamError(Exception):
+    '''
+    Raised when an upstream server responds with an unexpected status or a malformed response.
+    '''
+
+    def __init__(self, message, status=None):
+        '''
+        Params:
+            message: String describing the error.
+            status: Optional integer representing the HTTP status of the upstream response.
+        '''
+        super().__init__(message)
+        self.status = status
+
+
+class UpstreamTimeout(UpstreamError):
+    '''
+    Raised when an upstream call does not complete within its deadline.
+    '''
+
+
+class CircuitOpenError(UpstreamError):
+    '''
+    Raised instead of calling an upstream server whose circuit breaker is open.
+    '''
+
+
+def is_server_failure(error):
+    '''
+    Determines whether the given exception raised by an upstream call indicates that the server is
+    unavailable or failing, as opposed to a request for a missing resource, e.g. an unknown game id.
+    Only server failures count towards the consecutive failures of a circuit breaker.
+    Params:
+        error: Exception raised by an upstream call.
+    Returns:
+        True for connection errors, timeouts & responses with a 5xx status, otherwise False.
+    '''
+    if isinstance(error, UpstreamError):
+        return error.status is None or error.status >= 500
+    # Connection errors & timeouts, including those of the requests package
+    return isinstance(error, OSError)
+
+
+class CircuitBreaker:
+    '''
+    Thread-safe circuit breaker protecting an upstream server. The circuit opens after the given number
+    of consecutive failures, after which calls are rejected without contacting the server. Once the reset
+    timeout has passed, a single trial call is allowed, closing the circuit if it succeeds & reopening it
+    if it fails.
+    '''
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        '''
+        Params:
+            failure_threshold: Number of consecutive failures after which the circuit opens.
+            reset_timeout: Number of seconds after which an open circuit allows a trial call.
+        '''
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        '''
+        Returns: String representing the state of the circuit, either 'closed', 'open' or 'half-open'
+            while a trial call is in flight.
+        '''
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            return 'half-open' if self._trial else 'open'
+
+    def allow(self):
+        '''
+        Determines whether a call may be made, starting a trial call if the open circuit's reset timeout
+        has passed.
+        Returns: True if the call may be made, otherwise False.
+        '''
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if not self._trial and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        '''
+        Records a successful call, closing the circuit.
+        '''
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        '''
+        Records a failed call, opening the circuit if the trial call failed or too many calls failed in a row.
+        '''
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._trial = False
+
+
+class AsyncHTTPClient:
+    '''
+    Asynchronous client for JSON APIs based on the optional httpx package, keeping a pool of persistent
+    connections to a single server. Connections are pooled separately for each event loop, since they can
+    only be used by the loop that opened them. Each pool is closed once its event loop shuts down its
+    asynchronous generators, e.g. at the end of asyncio.run, which runs the asynchronous views of a
+    request served over WSGI.
+    '''
+
+    def __init__(self, base_url, headers=None, max_connections=10, timeout=10):
+        '''
+        Params:
+            base_url: String representing the URL below which the requested paths are located.
+            headers: Optional dictionary containing the headers sent with every request.
+            max_connections: Maximum number of concurrent connections per event loop.
+            timeout: Default number of seconds after which a request is aborted.
+        Raises:
+            ImproperlyConfigured: If the httpx package is not installed.
+        '''
+        if httpx is None:
+            raise ImproperlyConfigured("The asynchronous HTTP client requires the httpx package.")
+        self.base_url = base_url.rstrip('/') + '/'
+        self.headers = dict(UPSTREAM_HEADERS if headers is None else headers)
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._pools = weakref.WeakKeyDictionary()
+
+    async def _get_client(self):
+        '''
+        Returns: The httpx client of the running event loop, created if necessary.
+        '''
+        loop = asyncio.get_running_loop()
+        pool = self._pools.get(loop)
+        if pool is None:
+            lifetime = self._client_lifetime()
+            # The generator does not suspend before yielding the client, so that no other coroutine
+            # can create a second client for the same loop in the meantime
+            pool = self._pools[loop] = (await lifetime.__anext__(), lifetime)
+        return pool[0]
+
+    async def _client_lifetime(self):
+        '''
+        Asynchronous generator owning the httpx client of an event loop, which is registered with the loop,
+        so that the client's connections are closed when the loop shuts down its asynchronous generators.
+        '''
+        client = httpx.AsyncClient(
+            base_url=self.base_url, headers=self.headers, timeout=None,
+            limits=httpx.Limits(max_connections=self.max_connections,
+                                max_keepalive_connections=self.max_connections))
+        try:
+            yield client
+        finally:
+            await client.aclose()
+
+    async def get_json(self, path, timeout=None):
+        '''
+        Requests the given path & decodes the JSON response.
+        Params:
+            path: String representing the path of the requested resource, relative to the base URL.
+            timeout: Optional number of seconds after which the request is aborted.
+        Returns:
+            The decoded JSON response.
+        Raises:
+            UpstreamError: If the response's status is not 200, or the request failed.
+            asyncio.TimeoutError: If the request did not complete in time.
+        '''
+        return json.loads(await self.get(path, timeout))
+
+    async def get(self, path, timeout=None):
+        '''
+        Requests the given path using a pooled connection.
+        Params:
+            path: String representing the path of the requested resource, relative to the base URL.
+            timeout: Optional number of seconds after which the request is aborted.
+        Returns:
+            Bytes containing the decoded response body.
+        '''
+        client = await self._get_client()
+        try:
+            response = await asyncio.wait_for(client.get(path.lstrip('/')), timeout or self.timeout)
+        except httpx.HTTPError as error:
+            raise UpstreamError(f"Upstream request for {path} failed: {error!r}") from error
+        if response.status_code != 200:
+            raise UpstreamError(f"Upstream responded with status {response.status_code} for {path}",
+                                status=response.status_code)
+        return response.content
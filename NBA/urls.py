@@ -1,4 +1,3 @@
-import datetime
 from django.urls import path
 from . import views
 
@@ -17,11 +16,15 @@ urlpatterns = [
          views.toggle_hide_scores, name='toggle_hide_scores'),
     path('games/hidden_game_settings', views.hidden_games_settings,
          name='hidden_games_settings'),
+    path('stream/games/', views.stream_unavailable, name='stream_games'),
+    path('stream/game/<str:gameId>', views.stream_unavailable, name='stream_game'),
     path('game/<str:gameId>', views.game, name='game'),
     path('game/update_game/<str:gameId>',
          views.update_game, name='update_game'),
     path('schedule/', views.select_date, name='select_date'),
-    path('schedule/tomorrows_games', views.schedule, name='tomorrows_games', kwargs={'date':(datetime.datetime.today() + datetime.timedelta(days=1)).date()}),
-    path('schedule/yesterdays_games', views.schedule, name='yesterdays_games', kwargs={'date':(datetime.datetime.today() - datetime.timedelta(days=1)).date()}),
+    path('schedule/tomorrows_games', views.relative_schedule,
+         name='tomorrows_games', kwargs={'days': 1}),
+    path('schedule/yesterdays_games', views.relative_schedule,
+         name='yesterdays_games', kwargs={'days': -1}),
     path('schedule/<str:date>', views.schedule, name='schedule'),
 ]
@@ -1,13 +1,20 @@
-from django.http import JsonResponse
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render, redirect
 from django.urls import reverse
 from django.contrib.auth.decorators import login_required
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils import timezone
+from django.utils.http import quote_etag
 
 import datetime
 
 from NBA.forms import DateSelectorForm, HiddenGamePreferencesForm
 from NBA.models import HiddenGamePreferences
 from . import services
+from .responses import encode_body, encoded_response
 
 
 def index(request):
@@ -32,39 +39,57 @@ def games(request, gameStatus):
         HTTP response representing the current NBA games.
     '''
     # Check if user is logged in & has selected to hide scores
-    if request.user.is_authenticated:
-        scores_hidden = HiddenGamePreferences.objects.get(
-            user=request.user).hide_scores
-    else:
-        scores_hidden = False
+    preferences = services.get_preferences(request)
+    scores_hidden = preferences.hide_scores if preferences is not None else False
     context = {
         'scores_hidden': scores_hidden,
         'js_data': {
             'gameStatus': gameStatus,
             'game_update_url': reverse("NBA:update_games"),
+            'stream_url': reverse('NBA:stream_games'),
             'update_interval': services.GAMES_UPDATE_INTERVAL,
         }
     }
     return render(request, 'NBA/games.html', context)
 
 
-def update_games(request):
+async def update_games(request):
     '''
     Retrives the information for and current NBA games from the NBA API using the nba_api 
     module. The information is returned using JSON format. This view acts as an intermediary 
     API between JavaScript and the NBA API that can be queried at regular intervals. This 
     allows the data to be displayed in real time, without the need for full page refreshes.
+    The games are returned using the compact scoreboard schema, serialized & compressed once
+    per scoreboard snapshot & shared by every client with the same hidden games, so that anonymous
+    clients are served the same precomputed bytes. Clients may pass the snapshot token of their
+    last response as the 'since' query parameter, in which case only the games that changed are
+    returned. Responds 
+    with 304 Not Modified if the client's If-None-Match header matches the current data. Every 
+    response suggests when the client should poll next (see _set_poll_interval), and is marked 
+    if it is stale (see _set_staleness). The view is asynchronous, so that waiting for the NBA API
+    does not occupy a worker thread.
     Params:
         request: Instance representing the HTTP request that queried this view.
     Returns:
         Json response representing data for any current NBA games.
     '''
-    games = services.update_games()
-    games = services.check_hide_games(games, request.user)
-    context = {
-        'games': games
-    }
-    return JsonResponse(context)
+    scoreboard = await services.aget_scoreboard()
+    # Requests without a session are anonymous, so the session & user are only loaded, which
+    # requires a synchronous context, if the request has a session
+    if settings.SESSION_COOKIE_NAME in request.COOKIES:
+        preferences = await sync_to_async(services.get_preferences)(request)
+    else:
+        preferences = None
+    # The response depends on both the scoreboard & the games hidden for this user
+    hidden = services.hidden_overlay(scoreboard, preferences)
+    etag = services.scoreboard_etag(scoreboard, hidden)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = encoded_response(
+            request, services.encode_scoreboard(scoreboard, hidden, request.GET.get('since')))
+    _set_poll_interval(response, scoreboard['next_poll'])
+    _set_staleness(response, services.get_staleness('scoreboard'))
+    return _set_validator(response, etag)
 
 
 def game(request, gameId):
@@ -80,31 +105,107 @@ def game(request, gameId):
         'gameId': gameId,
         'js_data': {
             'gameId': gameId,
+            'stream_url': reverse('NBA:stream_game', args=[gameId]),
             'update_interval': services.GAME_UPDATE_INTERVAL,
         }
     }
     return render(request, 'NBA/game.html', context)
 
 
-def update_game(request, gameId):
+async def update_game(request, gameId):
     '''
     Retrives the information for the NBA game with the given game id from the NBA API 
     using the nba_api module. The information is returned using JSON format. This view
     acts as an intermediary API between JavaScript and the NBA API that can be queried at
     regular intervals. This allows the data to be displayed in real time, without the 
-    need for full page refreshes.
+    need for full page refreshes. Clients may pass the actionNumber of the last action they
+    received as the 'since' query parameter, and the boxscore version they received as the 
+    'version' query parameter, in which case only the data that has changed is returned.
+    Responds with 304 Not Modified if the client's If-None-Match header matches the current data.
+    Every response suggests when the client should poll next (see _set_poll_interval), and is marked
+    if it is stale (see _set_staleness). The view is asynchronous, so that waiting for the NBA API
+    does not occupy a worker thread.
     Params:
         request: Instance representing the HTTP request that queried this view.
         gameId: String representing the game id of the game for which the data should be retrieved.
     Returns:
         Json response representing the detailed NBA game data.
     '''
-    actions, boxscore = services.get_game_data(gameId)
-    context = {
-        'actions': actions,
-        'boxscore': boxscore,
-    }
-    return JsonResponse(context)
+    try:
+        since = int(request.GET['since'])
+    except (KeyError, ValueError):
+        since = None
+    # The validator, changes & poll interval are derived from the same snapshot of the game's data
+    game_data = await services.aget_game_snapshot(gameId)
+    # Clients whose last response had the same boxscore version & last action are up to date
+    version, last_action = services.game_version(game_data)
+    etag = quote_etag(f"{version}-{last_action}")
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        context = services.game_changes(
+            gameId, game_data, since=since, version=request.GET.get('version'))
+        response = JsonResponse(context)
+    _set_poll_interval(response, services.game_poll_interval(game_data))
+    _set_staleness(response, services.get_staleness('game_data', gameId))
+    return _set_validator(response, etag)
+
+
+def stream_unavailable(request, gameId=None):
+    '''
+    Responds to requests for the event streams that are not served by the ASGI application wrapped by
+    streaming.sse_application, e.g. when the app is served over WSGI. The streams are configured here, so
+    that their paths follow the prefix of the NBA app's urls.
+    Params:
+        request: Instance representing the HTTP request that queried this view.
+        gameId: String representing the game id of a game's stream.
+    Returns:
+        Empty HTTP response, which stops the client's EventSource so that the client falls back to polling.
+    '''
+    return HttpResponse(status=204)
+
+
+def _set_poll_interval(response, interval):
+    '''
+    Adds the X-Next-Poll header to the given response, containing the number of milliseconds after
+    which the client should poll again, or 'none' if the client should stop polling. The suggestion is
+    sent as a header, so that it is also included in 304 Not Modified responses.
+    Params:
+        response: HTTP response to which the suggestion should be added.
+        interval: Number of milliseconds until the next poll, or None if polling should stop.
+    Returns:
+        The given response.
+    '''
+    response['X-Next-Poll'] = 'none' if interval is None else str(interval)
+    return response
+
+
+def _set_staleness(response, staleness):
+    '''
+    Marks the given response as stale if its data was served from the last good data of a failing
+    NBA API, adding the X-Stale-Seconds header containing the age of the data.
+    Params:
+        response: HTTP response that should be marked.
+        staleness: Number of seconds since the data was retrieved, or None if the data is not stale.
+    Returns:
+        The given response.
+    '''
+    if staleness is not None:
+        response['X-Stale-Seconds'] = str(int(staleness))
+    return response
+
+
+def _set_validator(response, etag):
+    '''
+    Adds the given ETag to the given response, and requires clients to revalidate it before reuse.
+    Params:
+        response: HTTP response to which the validator should be added.
+        etag: Quoted string representing the version of the response's content.
+    Returns:
+        The given response.
+    '''
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'
+    return response
 
 
 def select_date(request):
@@ -132,10 +233,14 @@ def select_date(request):
     return render(request, 'NBA/select_date.html', {})
 
 
-def schedule(request, date):
+async def schedule(request, date):
     '''
     Displays the NBA games associated with the given date using data retrieved
-    from the NBA API using the nba_api module.
+    from the NBA API. The view is asynchronous, so that the boxscores of the date's
+    games are queried concurrently without occupying worker threads. Once every game of
+    the date has finished, the rendered games are reused for every user with the same hidden
+    games, and anonymous clients are served the same precomputed page, which browsers &
+    shared caches may keep indefinitely (see _set_immutable).
     Params:
         request: Instance representing the HTTP request that queried this view.
         date: String representing the date for which the game data should be retreived.
@@ -143,25 +248,74 @@ def schedule(request, date):
         HTTP response representing the NBA games associated with the given date if the current
         date is not selected, otherwise an HTTP redirect to the current games page.
     '''
-    # Check if current date is selected, if so redirect to current game page
-    if date == str(datetime.datetime.now().date()):
+    # Check if current local date is selected, if so redirect to current game page
+    if date == str(timezone.localdate()):
         return redirect('NBA:games')
-    else:
-        # Check if user is logged in & if so, get hide scores preference
-        if request.user.is_authenticated:
-            scores_hidden = HiddenGamePreferences.objects.get(
-                user=request.user).hide_scores
-        else:
-            scores_hidden = False
-        # Get data from given date
-        games = services.get_scheduled_games(date)
-        games = services.check_hide_games(games, request.user)
-        context = {
-            'scores_hidden': scores_hidden,
-            'date': date,
-            'games': games,
-        }
-        return render(request, 'NBA/schedule.html', context)
+    # Get data from given date
+    schedule = await services.aget_schedule(date)
+    # Requests without a session are anonymous, and are served the same page
+    if settings.SESSION_COOKIE_NAME not in request.COOKIES and schedule['final']:
+        hidden = services.hidden_overlay(schedule, None)
+        etag = services.schedule_etag(schedule, hidden)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            bodies = schedule['pages'].get(hidden)
+            if bodies is None:
+                page = await sync_to_async(render_to_string)(
+                    'NBA/schedule.html', _schedule_context(schedule, hidden, False), request)
+                bodies = schedule['pages'][hidden] = encode_body(page.encode())
+            response = encoded_response(request, bodies, content_type='text/html; charset=utf-8')
+        response['ETag'] = etag
+        return _set_immutable(response)
+    # Check if user is logged in & if so, get hide scores preference
+    preferences = await sync_to_async(services.get_preferences)(request)
+    scores_hidden = preferences.hide_scores if preferences is not None else False
+    hidden = services.hidden_overlay(schedule, preferences)
+    context = _schedule_context(schedule, hidden, scores_hidden)
+    # Rendering may access the session & user, which requires a synchronous context
+    return await sync_to_async(render)(request, 'NBA/schedule.html', context)
+
+
+def relative_schedule(request, days):
+    '''
+    Redirects to the schedule of the date the given number of days away from the current date in the
+    TIME_ZONE setting's time zone, so that the date rolls over at local midnight & the page of each
+    date is cached under its own URL.
+    Params:
+        request: Instance representing the HTTP request that queried this view.
+        days: Integer representing the number of days from the current date, e.g. -1 for yesterday.
+    Returns:
+        HTTP redirect to the schedule of the date.
+    '''
+    date = timezone.localdate() + datetime.timedelta(days=days)
+    return redirect('NBA:schedule', str(date))
+
+
+def _schedule_context(schedule, hidden, scores_hidden):
+    '''
+    Returns: Dictionary containing the context of the schedule page displaying the given schedule's
+        games, whose scores are hidden as given.
+    '''
+    return {
+        'scores_hidden': scores_hidden,
+        'date': schedule['date'],
+        'games_html': services.schedule_fragment(schedule, hidden),
+    }
+
+
+def _set_immutable(response):
+    '''
+    Allows browsers & shared caches to reuse the given response without revalidating it, since the
+    content no longer changes. Responses are only shared between clients without cookies, so that
+    clients that log in are no longer served the anonymous response.
+    Params:
+        response: HTTP response that should be cached.
+    Returns:
+        The given response.
+    '''
+    response['Cache-Control'] = f'public, max-age={services.FINAL_SCHEDULE_MAX_AGE}, immutable'
+    patch_vary_headers(response, ('Cookie',))
+    return response
 
 
 @login_required
@@ -196,6 +350,7 @@ def hidden_games_settings(request):
             # Automaticall hide scores anytime the user change's their hidden scores criteria
             preferences_instance.hide_scores = True
             preferences = form.save()
+            services.preferences_changed(request)
             return redirect(reverse('NBA:games'))
         # Form has been submitted but is invalid
         else:
@@ -217,4 +372,5 @@ def toggle_hide_scores(request):
         user_preferences = HiddenGamePreferences.objects.get(user=request.user)
         user_preferences.hide_scores = not user_preferences.hide_scores
         user_preferences.save()
+        services.preferences_changed(request)
     return redirect(request.META.get('HTTP_REFERER'))
@@ -0,0 +1,108 @@
+import datetime
+import threading
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import services, store
+
+# Number of seconds between the prefetches of the slates, which also happen right after local midnight
+SLATE_WARM_INTERVAL = getattr(settings, 'NBA_SLATE_WARM_INTERVAL', 10 * 60)
+# Prefetch the slates in a background thread of every web server process, instead of running the
+# warm_slates management command
+SLATE_WARMER_IN_PROCESS = getattr(settings, 'NBA_SLATE_WARMER_IN_PROCESS', False)
+
+
+def slate_dates(today=None):
+    '''
+    Params:
+        today: Optional date, defaulting to the current date in the TIME_ZONE setting's time zone.
+    Returns:
+        Tuple containing the dates of yesterday's, today's & tomorrow's slates.
+    '''
+    if today is None:
+        today = timezone.localdate()
+    return today - datetime.timedelta(days=1), today, today + datetime.timedelta(days=1)
+
+
+def seconds_until_midnight(now=None):
+    '''
+    Params:
+        now: Optional aware datetime, defaulting to the current time.
+    Returns:
+        Number of seconds until the next local midnight in the TIME_ZONE setting's time zone, taking
+        daylight saving time transitions into account.
+    '''
+    now = timezone.localtime(now)
+    midnight = datetime.datetime.combine(
+        now.date() + datetime.timedelta(days=1), datetime.time(), tzinfo=now.tzinfo)
+    # Timestamps are compared, since subtracting datetimes of the same time zone ignores UTC offset changes
+    return midnight.timestamp() - now.timestamp()
+
+
+def warm_slates(today=None, live=True, lease=SLATE_WARM_INTERVAL):
+    '''
+    Prefetches yesterday's & tomorrow's schedules including their boxscores (see services.warm_schedule),
+    and optionally today's live scoreboard & the detailed data of today's started games, so that the first
+    visitors of the day are not delayed by querying the NBA API.
+    Each slate is only prefetched by the process holding its lease in the snapshot store, which is not
+    released, so that the other processes skip the slate until the lease expires.
+    Params:
+        today: Optional date, defaulting to the current local date.
+        live: Whether today's live data should be prefetched. The live data is cached in the memory of the
+            prefetching process, and only published to the other processes if shared snapshots are enabled.
+        lease: Number of seconds for which the other processes skip a prefetched slate.
+    Returns:
+        Dictionary containing the exception raised while prefetching each slate that failed, keyed by date.
+    '''
+    yesterday, today, tomorrow = slate_dates(today)
+    errors = {}
+    for date in (yesterday, tomorrow):
+        if not store.snapshot_store.acquire(f'slate_{date}', lease):
+            continue
+        try:
+            services.warm_schedule(date)
+        except Exception as error:
+            errors[date] = error
+    if not live or not store.snapshot_store.acquire(f'slate_{today}', lease):
+        return errors
+    try:
+        for game in services.get_scoreboard()['games']:
+            if game['gameStatus'] >= 2:
+                services.get_game_data(game['gameId'])
+    except Exception as error:
+        errors[today] = error
+    return errors
+
+
+def run_warmer(interval=SLATE_WARM_INTERVAL, stop=None, log=None, live=True):
+    '''
+    Prefetches the slates every given number of seconds, and right after every local midnight, so that
+    yesterday's & tomorrow's slates roll over with the date.
+    Params:
+        interval: Number of seconds between prefetches.
+        stop: Optional threading.Event ending the loop once it is set.
+        log: Optional callable taking a message, called with every failed prefetch.
+        live: Whether today's live data should be prefetched (see warm_slates).
+    '''
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        for date, error in warm_slates(live=live, lease=interval).items():
+            if log is not None:
+                log(f"Failed to prefetch the slate of {date}: {error!r}")
+        # Wake up shortly after midnight, once the local date has changed
+        stop.wait(min(interval, seconds_until_midnight() + 1))
+
+
+def start_warmer(interval=SLATE_WARM_INTERVAL):
+    '''
+    Starts prefetching the slates in a background thread of this process.
+    Params:
+        interval: Number of seconds between prefetches.
+    Returns:
+        threading.Event stopping the thread once it is set.
+    '''
+    stop = threading.Event()
+    threading.Thread(target=run_warmer, args=(interval, stop), daemon=True,
+                     name='nba-slate-warmer').start()
+    return stop
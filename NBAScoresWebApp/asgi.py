@@ -13,4 +13,15 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'NBAScoresWebApp.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once Django has been set up, since the streams depend on the NBA app's models
+from NBA.streaming import sse_application  # noqa: E402
+from NBA import warmer  # noqa: E402
+
+application = sse_application(django_application)
+
+# Prefetch the slates in this process, unless the warm_slates management command is used instead.
+# Every process starts a warmer, but the slate leases let only one of them prefetch each slate.
+if warmer.SLATE_WARMER_IN_PROCESS:
+    warmer.start_warmer()
@@ -3,6 +3,7 @@ from django.shortcuts import render, redirect
 from django.contrib.auth import login
 from django.urls import reverse
 
+from NBA import services
 from NBA.models import HiddenGamePreferences
 from .forms import CustomUserCreationForm
 
@@ -16,10 +17,8 @@ def dashboard(request):
     Returns:
         HTTP response representing the user dashboard.
     '''
-    if request.user.is_authenticated:
-        scores_hidden = HiddenGamePreferences.objects.get(user=request.user).hide_scores
-    else:
-        scores_hidden = False
+    preferences = services.get_preferences(request)
+    scores_hidden = preferences.hide_scores if preferences is not None else False
     context = {
         'scores_hidden': scores_hidden,
     }